@@ -0,0 +1,126 @@
+from channels.db import database_sync_to_async
+from django.core.cache import cache
+from django.db.models.signals import post_save, pre_save
+from .models import Player
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+import threading
+import time
+
+class PlayerSummaryCache:
+    """
+    Read-through cache of what the game and tournament screens show about a
+    player: username, tournament_username, avatar URL and t_points.
+
+    Lookups go to a per-process LRU first, then to the shared Redis cache,
+    then to one Player query for whatever is still missing. Updates delete
+    the Redis entry and this process's copy; other processes may serve
+    their local copy for up to LOCAL_TTL seconds longer. Updates come from
+    database threads as well as the event loop, so the LRU is guarded by a
+    lock.
+    """
+
+    LOCAL_SIZE = 4096
+    LOCAL_TTL = 5
+    TTL = 300
+
+    def __init__(self):
+        self.local: 'OrderedDict[str, tuple]' = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def key(self, username: str) -> str:
+        return f"player:summary:{username}"
+
+    @staticmethod
+    def summarize(player: Player) -> dict:
+        return {
+            "username": player.username,
+            "tournament_username": player.tournament_username,
+            "avatar": player.get_avatar_url(),
+            "t_points": player.t_points
+        }
+
+    def get_local(self, usernames: Iterable[str]) -> Dict[str, dict]:
+        now = time.monotonic()
+        found = {}
+        with self.lock:
+            for username in usernames:
+                entry = self.local.get(username)
+                if entry and entry[0] > now:
+                    self.local.move_to_end(username)
+                    found[username] = entry[1]
+            self.hits += len(found)
+        return found
+
+    def set_local(self, summaries: Dict[str, dict]) -> None:
+        expires = time.monotonic() + self.LOCAL_TTL
+        with self.lock:
+            for username, summary in summaries.items():
+                self.local[username] = (expires, summary)
+                self.local.move_to_end(username)
+            while len(self.local) > self.LOCAL_SIZE:
+                self.local.popitem(last=False)
+
+    def load(self, usernames: List[str]) -> Dict[str, dict]:
+        """Fetch from Redis, then the database. Blocking: call from a thread"""
+        shared = cache.get_many([self.key(username) for username in usernames])
+        found = {summary['username']: summary for summary in shared.values()}
+        self.shared_hits += len(found)
+
+        missing = [username for username in usernames if username not in found]
+        if missing:
+            self.misses += len(missing)
+            players = Player.objects.filter(username__in=missing).only(
+                'username', 'tournament_username', 'avatar', 't_points'
+            )
+            loaded = {player.username: self.summarize(player) for player in players}
+            cache.set_many({self.key(username): summary for username, summary in loaded.items()}, self.TTL)
+            found.update(loaded)
+        return found
+
+    async def get_many(self, usernames: Iterable[str]) -> Dict[str, dict]:
+        """Summaries of the given players, keyed by username. Unknown players are left out"""
+        usernames = list(dict.fromkeys(username for username in usernames if username))
+        found = self.get_local(usernames)
+        missing = [username for username in usernames if username not in found]
+        if missing:
+            loaded = await database_sync_to_async(self.load)(missing)
+            self.set_local(loaded)
+            found.update(loaded)
+        return found
+
+    async def get(self, username: str) -> dict:
+        return (await self.get_many([username])).get(username, {})
+
+    def invalidate(self, usernames: Iterable[str]) -> None:
+        usernames = list(usernames)
+        with self.lock:
+            for username in usernames:
+                self.local.pop(username, None)
+        cache.delete_many([self.key(username) for username in usernames])
+
+    def get_metrics(self) -> dict:
+        return {
+            "local_entries": len(self.local),
+            "local_hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses
+        }
+
+player_cache = PlayerSummaryCache()
+
+def remember_username(sender, instance: Player, update_fields=None, **kwargs) -> None:
+    """Note the stored username of a player about to be saved, so a rename invalidates it too"""
+    instance._previous_username = None
+    if instance.pk and (update_fields is None or 'username' in update_fields):
+        instance._previous_username = Player.objects.filter(pk=instance.pk).values_list('username', flat=True).first()
+
+def invalidate_player(sender, instance: Player, **kwargs) -> None:
+    previous = getattr(instance, '_previous_username', None)
+    player_cache.invalidate({instance.username, previous} - {None})
+
+pre_save.connect(remember_username, sender=Player, dispatch_uid='player_summary_cache_rename')
+post_save.connect(invalidate_player, sender=Player, dispatch_uid='player_summary_cache')
@@ -1,7 +1,15 @@
 from channels.generic.websocket import AsyncWebsocketConsumer
+from core.apps.friends.cache import relationship_cache, relationship_group
+from .groups import user_group_name
 import json
 
+ONLINE_GROUP = "online_users_group"
+
+def user_group(username: str) -> str:
+    return user_group_name("online_user_", username)
+
 class OnlineStatusConsumer(AsyncWebsocketConsumer):
+    relationships = relationship_cache
     online_users = set()
     user_status = {}
     game_invites = {}
@@ -11,7 +19,10 @@ class OnlineStatusConsumer(AsyncWebsocketConsumer):
         self.username = self.scope['url_route']['kwargs']['username']
         self.online_users.add(self.username)
         self.user_status[self.username] = "available"
-        await self.channel_layer.group_add("online_users_group", self.channel_name)
+        await self.channel_layer.group_add(ONLINE_GROUP, self.channel_name)
+        await self.channel_layer.group_add(user_group(self.username), self.channel_name)
+        self.relationships.acquire(self.username)
+        await self.channel_layer.group_add(relationship_group(self.username), self.channel_name)
         await self.accept()
         await self.broadcast_online_users()
 
@@ -29,8 +40,8 @@ class OnlineStatusConsumer(AsyncWebsocketConsumer):
         # Cancel each invite
         for invite_id in invites_to_cancel:
             invite = self.game_invites[invite_id]
-            await self.channel_layer.group_send(
-                "online_users_group",
+            await self.send_to_users(
+                (self.username, invite['recipient']),
                 {
                     'type': 'broadcast_invite_response',
                     'invite_id': invite_id,
@@ -42,7 +53,10 @@ class OnlineStatusConsumer(AsyncWebsocketConsumer):
             )
             del self.game_invites[invite_id]
         
-        await self.channel_layer.group_discard("online_users_group", self.channel_name)
+        await self.channel_layer.group_discard(ONLINE_GROUP, self.channel_name)
+        await self.channel_layer.group_discard(user_group(self.username), self.channel_name)
+        await self.channel_layer.group_discard(relationship_group(self.username), self.channel_name)
+        self.relationships.release(self.username)
         await self.broadcast_online_users()
 
     async def receive(self, text_data):
@@ -60,8 +74,8 @@ class OnlineStatusConsumer(AsyncWebsocketConsumer):
             
             for invite_id in invites_to_remove:
                 # Send cancellation notification
-                await self.channel_layer.group_send(
-                    "online_users_group",
+                await self.send_to_users(
+                    (sender, self.game_invites[invite_id]['recipient']),
                     {
                         'type': 'broadcast_invite_response',
                         'invite_id': invite_id,
@@ -72,7 +86,7 @@ class OnlineStatusConsumer(AsyncWebsocketConsumer):
                 )
                 del self.game_invites[invite_id]
             
-            if recipient in self.online_users:
+            if recipient in self.online_users and not await self.blocked_between(sender, recipient):
                 invite_id = f"{sender}_{recipient}"
                 self.game_invites[invite_id] = {
                     'sender': sender,
@@ -80,8 +94,8 @@ class OnlineStatusConsumer(AsyncWebsocketConsumer):
                     'status': 'pending'
                 }
                 
-                await self.channel_layer.group_send(
-                    "online_users_group",
+                await self.send_to_users(
+                    (recipient,),
                     {
                         'type': 'send_game_invite',
                         'invite_id': invite_id,
@@ -97,20 +111,34 @@ class OnlineStatusConsumer(AsyncWebsocketConsumer):
             if invite_id in self.game_invites:
                 await self.handle_invite_response(invite_id, data['response'])
 
+    async def blocked_between(self, sender: str, recipient: str) -> bool:
+        """Whether either user blocked the other, as seen from both of their entries"""
+        return (
+            (await self.relationships.get(sender)).is_blocked(recipient)
+            or (await self.relationships.get(recipient)).is_blocked(sender)
+        )
+
+    async def relationships_changed(self, event):
+        self.relationships.invalidate(event['username'])
+
+    async def send_to_users(self, usernames, event):
+        """Deliver event to every connection of the given users, and to no one else"""
+        for username in dict.fromkeys(usernames):
+            await self.channel_layer.group_send(user_group(username), event)
+
     async def broadcast_invite_response(self, event):
-        if self.username in [event['sender'], event['recipient']]:
-            await self.send(text_data=json.dumps({
-                'type': 'invite_response',
-                'invite_id': event['invite_id'],
-                'response': event['response'],
-                'sender': event['sender'],
-                'recipient': event['recipient']
-            }))
+        await self.send(text_data=json.dumps({
+            'type': 'invite_response',
+            'invite_id': event['invite_id'],
+            'response': event['response'],
+            'sender': event['sender'],
+            'recipient': event['recipient']
+        }))
 
     async def broadcast_online_users(self):
         online_users_list = list(self.online_users)
         await self.channel_layer.group_send(
-            "online_users_group",
+            ONLINE_GROUP,
             {
                 'type': 'send_online_users',
                 'online_users': online_users_list
@@ -123,12 +151,11 @@ class OnlineStatusConsumer(AsyncWebsocketConsumer):
         }))
 
     async def send_game_invite(self, event):
-        if self.username == event['recipient']:
-            await self.send(text_data=json.dumps({
-                'type': 'game_invite',
-                'invite_id': event['invite_id'],
-                'sender': event['sender']
-            }))
+        await self.send(text_data=json.dumps({
+            'type': 'game_invite',
+            'invite_id': event['invite_id'],
+            'sender': event['sender']
+        }))
 
     async def handle_invite_response(self, invite_id: str, response: str):
         if invite_id in self.game_invites:
@@ -136,8 +163,8 @@ class OnlineStatusConsumer(AsyncWebsocketConsumer):
             
             if response == 'accepted':
                 # Notify both players to start game
-                await self.channel_layer.group_send(
-                    "online_users_group",
+                await self.send_to_users(
+                    (invite['sender'], invite['recipient']),
                     {
                         'type': 'start_game',
                         'sender': invite['sender'],
@@ -148,9 +175,8 @@ class OnlineStatusConsumer(AsyncWebsocketConsumer):
             del self.game_invites[invite_id]
 
     async def start_game(self, event):
-        if self.username in [event['sender'], event['recipient']]:
-            await self.send(text_data=json.dumps({
-                'type': 'start_game',
-                'sender': event['sender'],
-                'recipient': event['recipient']
-            }))
\ No newline at end of file
+        await self.send(text_data=json.dumps({
+            'type': 'start_game',
+            'sender': event['sender'],
+            'recipient': event['recipient']
+        }))
\ No newline at end of file
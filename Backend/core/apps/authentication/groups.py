@@ -0,0 +1,17 @@
+from channels.layers import BaseChannelLayer
+import hashlib
+import re
+
+def user_group_name(prefix: str, username: str) -> str:
+    """
+    Channel layer group for one user. Group names only allow ASCII letters,
+    digits, '-', '_' and '.', so any other character of the username, '-'
+    included, is written as -<hex code>-: a@b becomes a-40-b and a-40-b
+    becomes a-2d-40-2d-b, so no two usernames share a group. Names too long
+    for the channel layer use a hash of the username after '-h-' instead,
+    which never appears in an escaped name.
+    """
+    name = prefix + re.sub(r'[^A-Za-z0-9_.]', lambda char: f"-{ord(char.group()):x}-", username)
+    if len(name) < BaseChannelLayer.MAX_NAME_LENGTH:
+        return name
+    return f"{prefix}-h-{hashlib.sha256(username.encode()).hexdigest()}"
@@ -1,3 +1,35 @@
+from channels.layers import BaseChannelLayer
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from .cache import player_cache
+from .groups import user_group_name
+
+class UserGroupNameTests(TestCase):
+    def test_escaped_names_do_not_collide(self):
+        usernames = ["a@b", "a-40-b", "a-b", "a+b", "a.b", "a_b", "é", "-e9-"]
+        names = [user_group_name("user_", username) for username in usernames]
+        self.assertEqual(len(set(names)), len(usernames))
+        self.assertEqual(names[0], "user_a-40-b")
+        self.assertEqual(names[1], "user_a-2d-40-2d-b")
+
+    def test_names_are_valid_groups(self):
+        layer = BaseChannelLayer()
+        for username in ["plain", "a@b+c", "é" * 30, "x" * 150]:
+            self.assertTrue(layer.require_valid_group_name(user_group_name("tournament_player_", username)))
+
+    def test_long_names_are_hashed(self):
+        name = user_group_name("user_", "x" * 150)
+        self.assertTrue(name.startswith("user_-h-"))
+        self.assertNotEqual(name, user_group_name("user_", "x" * 151))
+
+class PlayerSummaryCacheTests(TestCase):
+    def test_rename_invalidates_the_old_name(self):
+        player = get_user_model().objects.create_user(username='old', email='old@example.com', password='x')
+        player_cache.set_local(player_cache.load(['old']))
+        self.assertIn('old', player_cache.get_local(['old']))
+        player.username = 'new'
+        player.save()
+        self.assertEqual(player_cache.get_local(['old']), {})
+        self.assertIsNone(cache.get(player_cache.key('old')))
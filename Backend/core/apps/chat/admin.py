@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Message
+from .models import Conversation, Message
 
 class MessageAdmin(admin.ModelAdmin):
     list_display = ('sender', 'receiver', 'content_snippet', 'timestamp')
@@ -12,3 +12,10 @@ class MessageAdmin(admin.ModelAdmin):
     content_snippet.short_description = 'Message Content'
 
 admin.site.register(Message, MessageAdmin)
+
+class ConversationAdmin(admin.ModelAdmin):
+    list_display = ('user1', 'user2', 'last_activity', 'unread_user1', 'unread_user2')
+    search_fields = ('user1__username', 'user2__username')
+    ordering = ('-last_activity',)
+
+admin.site.register(Conversation, ConversationAdmin)
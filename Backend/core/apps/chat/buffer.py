@@ -0,0 +1,43 @@
+from django.db import transaction
+from core.batch_writer import BatchWriter
+from .models import Conversation, Message
+from .config import CHAT_CONFIG
+from typing import List
+import logging
+
+logger = logging.getLogger(__name__)
+
+class MessageWriter(BatchWriter):
+    """
+    Saves chat messages behind their broadcast. Messages are queued with
+    their send time and written in batches, in one transaction: a bulk
+    insert of the Message rows and one update per conversation they belong
+    to.
+    """
+
+    config = CHAT_CONFIG
+    logger = logger
+
+    def submit(self, message: Message) -> None:
+        self.enqueue(message)
+
+    @staticmethod
+    def write(batch: List[Message]) -> None:
+        with transaction.atomic():
+            Message.objects.bulk_create(batch)
+            Conversation.record(batch)
+
+    def describe(self, message: Message) -> str:
+        return (
+            f"chat message sender={message.sender_id} receiver={message.receiver_id} "
+            f"timestamp={message.timestamp.isoformat()} content={message.content!r}"
+        )
+
+    def retry(self, message: Message) -> None:
+        # The insert was rolled back; let the next one assign the id again
+        message.pk = None
+
+    def get_metrics(self) -> dict:
+        return {"durability": CHAT_CONFIG['DURABILITY'], **super().get_metrics()}
+
+message_writer = MessageWriter()
@@ -0,0 +1,9 @@
+CHAT_CONFIG = {
+    # 'buffered' broadcasts a message first and saves it within
+    # FLUSH_INTERVAL, so a crashed worker loses what it had not flushed yet;
+    # 'sync' saves each message before broadcasting it
+    'DURABILITY': 'buffered',
+    'FLUSH_INTERVAL': 0.1,
+    'BATCH_SIZE': 500,
+    'MAX_ATTEMPTS': 3
+}
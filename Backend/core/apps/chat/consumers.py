@@ -3,13 +3,20 @@ from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from core.apps.authentication.models import Player
 from .models import Message
-from core.apps.friends.models import Friendship
-from django.db.models import Q
+from .buffer import message_writer
+from .config import CHAT_CONFIG
+from core.apps.friends.cache import relationship_cache, relationship_group
+from django.utils import timezone
 
 class Chat(AsyncWebsocketConsumer):
+    writer = message_writer
+    relationships = relationship_cache
+
     async def connect(self):
         self.room_name = self.scope['url_route']['kwargs']['room_name']
         self.room_group_name = f'chat_{self.room_name}'
+        self.username = None
+        self.participants = None
         await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
@@ -21,6 +28,9 @@ class Chat(AsyncWebsocketConsumer):
             self.room_group_name,
             self.channel_name
         )
+        if self.username:
+            await self.channel_layer.group_discard(relationship_group(self.username), self.channel_name)
+            self.relationships.release(self.username)
 
     async def receive(self, text_data):
         text_data_json = json.loads(text_data)
@@ -30,14 +40,15 @@ class Chat(AsyncWebsocketConsumer):
         room_users = self.room_name.split('_')
         receiver_username = room_users[1] if room_users[0] == sender_username else room_users[0]
 
-        sender = await self.get_user(sender_username)
-        receiver = await self.get_user(receiver_username)
-
-        if not await self.friends(sender, receiver):
+        participants = await self.get_participants(sender_username, receiver_username)
+        if participants and self.username != sender_username:
+            await self.track_user(sender_username)
+        if not participants or not (await self.relationships.get(sender_username)).are_friends(receiver_username):
             await self.send(text_data=json.dumps({'error': 'You are not friends with this user.'}))
             return
 
-        await self.save_message(sender, receiver, message)
+        sender, receiver = participants
+        await self.save_message(Message(sender=sender, receiver=receiver, content=message, timestamp=timezone.now()))
 
         await self.channel_layer.group_send(
             self.room_group_name,
@@ -56,18 +67,34 @@ class Chat(AsyncWebsocketConsumer):
             'sender': sender,
         }))
 
-    @database_sync_to_async
-    def save_message(self, sender, receiver, content):
-        return Message.objects.create(sender=sender, receiver=receiver, content=content)
+    async def save_message(self, message: Message) -> None:
+        """Save now, or hand the message to the writer to save after the broadcast"""
+        if CHAT_CONFIG['DURABILITY'] == 'sync':
+            await database_sync_to_async(self.writer.write)([message])
+        else:
+            self.writer.submit(message)
 
-    @database_sync_to_async
-    def get_user(self, username):
-        return Player.objects.get(username=username)
+    async def track_user(self, username):
+        """Keep the relationships of the user sending on this connection cached and up to date"""
+        if self.username:
+            await self.channel_layer.group_discard(relationship_group(self.username), self.channel_name)
+            self.relationships.release(self.username)
+        self.username = username
+        self.relationships.acquire(username)
+        await self.channel_layer.group_add(relationship_group(username), self.channel_name)
+
+    async def relationships_changed(self, event):
+        self.relationships.invalidate(event['username'])
+
+    async def get_participants(self, sender_username, receiver_username):
+        """Sender and receiver, loaded once per connection; None if either does not exist"""
+        if self.participants is None:
+            self.participants = await self.load_players(self.room_name.split('_'))
+        sender, receiver = self.participants.get(sender_username), self.participants.get(receiver_username)
+        if not sender or not receiver:
+            return None
+        return sender, receiver
 
     @database_sync_to_async
-    def friends(self, user1, user2):
-        return Friendship.objects.filter(
-            ((Q(from_user=user1) & Q(to_user=user2)) |
-             (Q(from_user=user2) & Q(to_user=user1))),
-            status='accepted'
-        ).exists()
+    def load_players(self, usernames):
+        return Player.objects.in_bulk(usernames, field_name='username')
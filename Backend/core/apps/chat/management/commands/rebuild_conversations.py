@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from core.apps.chat.models import Conversation, Message
+
+class Command(BaseCommand):
+    help = 'Rebuild the Conversation rows from the Message table, e.g. after upgrading. Unread counts start at 0'
+
+    def handle(self, *args, **options):
+        pairs = {}
+        for sender, receiver, last_id in Message.objects.values_list('sender', 'receiver').annotate(last_id=Max('id')):
+            pair = tuple(sorted((sender, receiver)))
+            pairs[pair] = max(pairs.get(pair, 0), last_id)
+
+        last_messages = Message.objects.in_bulk(list(pairs.values()))
+        conversations = []
+        for (user1_id, user2_id), last_id in pairs.items():
+            message = last_messages[last_id]
+            conversations.append(Conversation(
+                user1_id=user1_id,
+                user2_id=user2_id,
+                last_message=message.content,
+                last_sender_id=message.sender_id,
+                last_activity=message.timestamp
+            ))
+
+        with transaction.atomic():
+            Conversation.objects.all().delete()
+            Conversation.objects.bulk_create(conversations, batch_size=1000)
+        self.stdout.write(f'Rebuilt {len(conversations)} conversations')
@@ -1,14 +1,99 @@
-from django.db import models
+from django.db import models, IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
 from core.apps.authentication.models import Player
+from collections import Counter
+from typing import Dict, Iterable, Tuple
 
 class Message(models.Model):
     sender = models.ForeignKey(Player, related_name='sent_messages', on_delete=models.CASCADE)
     receiver = models.ForeignKey(Player, related_name='received_messages', on_delete=models.CASCADE)
     content = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the message is sent, which may be a little before it is saved
+    timestamp = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ('timestamp',)
+        indexes = [
+            # Keyset pages of one direction of a conversation (see views.room)
+            models.Index(fields=['sender', 'receiver', 'timestamp', 'id'], name='chat_message_pair_idx'),
+        ]
 
     def __str__(self):
         return f'{self.sender} -> {self.receiver}: {self.content[:20]}'
+
+class Conversation(models.Model):
+    """
+    One row per pair of players who have exchanged messages, unique on the
+    pair itself: user1 is the one with the lower id, which a rename cannot
+    change. Keeps what an inbox shows, so listing it never touches Message.
+    """
+    user1 = models.ForeignKey(Player, related_name='conversations_as_user1', on_delete=models.CASCADE)
+    user2 = models.ForeignKey(Player, related_name='conversations_as_user2', on_delete=models.CASCADE)
+    last_message = models.TextField(blank=True)
+    last_sender = models.ForeignKey(Player, related_name='+', null=True, on_delete=models.SET_NULL)
+    last_activity = models.DateTimeField()
+    unread_user1 = models.PositiveIntegerField(default=0)
+    unread_user2 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ('-last_activity',)
+        constraints = [
+            models.UniqueConstraint(fields=['user1', 'user2'], name='chat_conv_pair_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['user1', '-last_activity'], name='chat_conv_user1_idx'),
+            models.Index(fields=['user2', '-last_activity'], name='chat_conv_user2_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user1} <-> {self.user2}'
+
+    @staticmethod
+    def pair(player_id1: int, player_id2: int) -> Tuple[int, int]:
+        """(user1_id, user2_id) of the conversation between two players"""
+        return (player_id1, player_id2) if player_id1 <= player_id2 else (player_id2, player_id1)
+
+    @classmethod
+    def record(cls, messages: Iterable[Message]) -> None:
+        """
+        Make the last of messages the last one of each conversation and count
+        them as unread for their receivers. One UPDATE with F() expressions
+        per conversation, so concurrent writers never lose a count; the row
+        is created on the first message.
+        """
+        latest: Dict[Tuple[int, int], Message] = {}
+        unread: Dict[Tuple[int, int], Counter] = {}
+        for message in messages:
+            pair = cls.pair(message.sender_id, message.receiver_id)
+            latest[pair] = message
+            counts = unread.setdefault(pair, Counter())
+            if message.sender_id != message.receiver_id:
+                counts['unread_user1' if message.receiver_id == pair[0] else 'unread_user2'] += 1
+
+        for (user1_id, user2_id), message in latest.items():
+            changes = {
+                'last_message': message.content,
+                'last_sender_id': message.sender_id,
+                'last_activity': message.timestamp,
+            }
+            counts = unread[(user1_id, user2_id)]
+            increment = {field: F(field) + count for field, count in counts.items()}
+            conversation = cls.objects.filter(user1_id=user1_id, user2_id=user2_id)
+            if conversation.update(**changes, **increment):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(user1_id=user1_id, user2_id=user2_id, **changes, **counts)
+            except IntegrityError:
+                # Created concurrently by another writer
+                conversation.update(**changes, **increment)
+
+    @classmethod
+    def mark_read(cls, player: Player, other: str) -> None:
+        other_id = Player.objects.filter(username=other).values_list('id', flat=True).first()
+        if other_id is None:
+            return
+        user1_id, user2_id = cls.pair(player.id, other_id)
+        unread = 'unread_user1' if player.id == user1_id else 'unread_user2'
+        cls.objects.filter(user1_id=user1_id, user2_id=user2_id).update(**{unread: 0})
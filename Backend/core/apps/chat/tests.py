@@ -1,3 +1,96 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from unittest import mock
+import asyncio
 
-# Create your tests here.
+from core.batch_writer import Pending
+from .buffer import MessageWriter
+from .config import CHAT_CONFIG
+from .models import Conversation, Message
+
+class MessageWriterTests(TestCase):
+    def test_drops_after_max_attempts(self):
+        User = get_user_model()
+        sender = User.objects.create_user(username='alice', email='alice@example.com', password='x')
+        receiver = User.objects.create_user(username='bob', email='bob@example.com', password='x')
+        writer = MessageWriter()
+        writer.queue.append(Pending(Message(sender=sender, receiver=receiver, content='hello')))
+        with mock.patch.object(MessageWriter, 'write', side_effect=RuntimeError('database is down')):
+            with self.assertLogs('core.apps.chat.buffer', level='ERROR') as logs:
+                for _ in range(CHAT_CONFIG['MAX_ATTEMPTS'] + 1):
+                    self.assertEqual(asyncio.run(writer.flush()), 0)
+
+        self.assertEqual(len(writer.queue), 0)
+        self.assertEqual(writer.get_metrics()['dropped'], 1)
+        self.assertEqual(writer.get_metrics()['written'], 0)
+        self.assertIn("'hello'", logs.output[-1])
+
+class ChatMetricsViewTests(TestCase):
+    def test_requires_staff(self):
+        client = APIClient()
+        url = reverse('chat_metrics')
+        self.assertEqual(client.get(url).status_code, 401)
+        client.force_authenticate(get_user_model().objects.create_user(username='player', email='player@example.com', password='x'))
+        self.assertEqual(client.get(url).status_code, 403)
+        client.force_authenticate(get_user_model().objects.create_user(username='admin', email='admin@example.com', password='x', is_staff=True))
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('dropped', response.json()['message_writer'])
+
+class PageParameterTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.alice = User.objects.create_user(username='alice', email='alice@example.com', password='x')
+        User.objects.create_user(username='bob', email='bob@example.com', password='x')
+        self.room = reverse('room', args=['alice', 'bob'])
+
+    def test_room_rejects_bad_limits_and_empty_cursors(self):
+        for query in ({'limit': '0'}, {'limit': '-5'}, {'limit': 'ten'}, {'after': ''}, {'before': ''}, {'after': 'x_1'}):
+            self.assertEqual(self.client.get(self.room, query).status_code, 400, query)
+        self.assertEqual(self.client.get(self.room, {'limit': '5'}).status_code, 200)
+
+    def test_inbox_rejects_bad_limits_like_room(self):
+        client = APIClient()
+        client.force_authenticate(self.alice)
+        for limit in ('0', '-5', 'ten'):
+            self.assertEqual(client.get(reverse('inbox'), {'limit': limit}).status_code, 400, limit)
+        self.assertEqual(client.get(reverse('inbox'), {'limit': '5'}).status_code, 200)
+
+class ConversationTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.users = {
+            name: User.objects.create_user(username=name, email=f'{i}@example.com', password='x')
+            for i, name in enumerate(['a_b', 'c', 'a', 'b_c'])
+        }
+
+    def send(self, sender, receiver, content):
+        message = Message.objects.create(sender=self.users[sender], receiver=self.users[receiver], content=content)
+        Conversation.record([message])
+
+    def conversation(self, name1, name2):
+        user1_id, user2_id = Conversation.pair(self.users[name1].id, self.users[name2].id)
+        return Conversation.objects.get(user1_id=user1_id, user2_id=user2_id)
+
+    def test_pairs_with_underscores_stay_apart(self):
+        self.send('a_b', 'c', 'for c')
+        self.send('a', 'b_c', 'for b_c')
+        self.send('a', 'b_c', 'again')
+        self.assertEqual(Conversation.objects.count(), 2)
+        first, second = self.conversation('a_b', 'c'), self.conversation('a', 'b_c')
+        self.assertEqual((first.last_message, first.last_sender.username), ('for c', 'a_b'))
+        self.assertEqual((second.last_message, second.last_sender.username), ('again', 'a'))
+        self.assertEqual(first.unread_user1 + first.unread_user2, 1)
+        self.assertEqual(second.unread_user1 + second.unread_user2, 2)
+
+    def test_mark_read_clears_only_the_reader(self):
+        self.send('a', 'b_c', 'one')
+        self.send('b_c', 'a', 'two')
+        Conversation.mark_read(self.users['b_c'], 'a')
+        conversation = self.conversation('a', 'b_c')
+        mine = conversation.user1_id == self.users['b_c'].id
+        self.assertEqual(conversation.unread_user1 if mine else conversation.unread_user2, 0)
+        self.assertEqual(conversation.unread_user2 if mine else conversation.unread_user1, 1)
+        self.assertEqual(self.conversation('a', 'b_c').last_message, 'two')
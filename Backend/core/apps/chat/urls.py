@@ -3,4 +3,7 @@ from . import views
 
 urlpatterns = [
     path('room/<str:user1>/<str:user2>/', views.room, name='room'), 
+    path('metrics/', views.MetricsView.as_view(), name='chat_metrics'),
+    path('inbox/', views.InboxView.as_view(), name='inbox'),
+    path('inbox/<str:username>/read/', views.ConversationReadView.as_view(), name='conversation_read'),
 ]
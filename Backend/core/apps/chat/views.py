@@ -1,30 +1,150 @@
 from django.http import JsonResponse
-from .models import Message
+from django.db.models import Q
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from .models import Conversation, Message
+from .buffer import message_writer
+from core.apps.friends.cache import relationship_cache
 from core.apps.authentication.models import Player
+from datetime import datetime, timedelta, timezone
+import heapq
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def encode_cursor(message: dict) -> str:
+    """'<microseconds since the epoch>_<id>' of a message: URL safe and exact"""
+    return f"{(message['timestamp'] - EPOCH) // timedelta(microseconds=1)}_{message['id']}"
+
+def page_limit(params) -> int:
+    """?limit= of a page, capped at MAX_PAGE_SIZE. Raises ValueError with the message for the client"""
+    try:
+        limit = int(params.get('limit', PAGE_SIZE))
+    except ValueError:
+        raise ValueError('limit must be an integer.')
+    if limit < 1:
+        raise ValueError('limit must be positive.')
+    return min(limit, MAX_PAGE_SIZE)
+
+def decode_cursor(cursor: str):
+    """(timestamp, id) of a cursor, or None if it is malformed"""
+    microseconds, _, message_id = cursor.partition('_')
+    if not microseconds.isdigit() or not message_id.isdigit():
+        return None
+    return EPOCH + timedelta(microseconds=int(microseconds)), int(message_id)
+
+class MetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'message_writer': message_writer.get_metrics(),
+            'relationships': relationship_cache.get_metrics(),
+        })
 
 def room(request, user1, user2):
-    room_name = '_'.join(sorted([user1, user2]))
+    """
+    One page of the conversation between two users, oldest first.
 
+    Without a cursor this is the latest page. ?before=<cursor> pages back
+    through older messages, ?after=<cursor> fetches newer ones; the cursors
+    of the first and last message of a page are returned with it. Each
+    direction of the conversation is read with a range scan of the
+    (sender, receiver, timestamp, id) index, so a page costs the same
+    however long the conversation is.
+    """
     try:
-        user1_obj = Player.objects.get(username=user1)
-        user2_obj = Player.objects.get(username=user2)
-    except Player.DoesNotExist:
+        limit = page_limit(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    newer = 'after' in request.GET
+    cursor = request.GET.get('after') if newer else request.GET.get('before')
+    keyset = Q()
+    if cursor is not None:
+        position = decode_cursor(cursor)
+        if position is None:
+            return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+        timestamp, message_id = position
+        if newer:
+            keyset = Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=message_id)
+        else:
+            keyset = Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=message_id)
+
+    players = {player.username: player.id for player in Player.objects.filter(username__in=[user1, user2]).only('id', 'username')}
+    if user1 not in players or user2 not in players:
         return JsonResponse({'error': 'Player not found.'}, status=404)
+    usernames = {player_id: username for username, player_id in players.items()}
 
-    messages = Message.objects.filter(
-        sender__in=[user1_obj, user2_obj],
-        receiver__in=[user1_obj, user2_obj]
-    ).order_by('timestamp')
-
-    messages_list = [
-        {
-            'sender': message.sender.username,
-            'receiver': message.receiver.username,
-            'content': message.content,
-        }
-        for message in messages
+    order = ('timestamp', 'id') if newer else ('-timestamp', '-id')
+    directions = [
+        Message.objects.filter(keyset, sender_id=sender, receiver_id=receiver)
+        .order_by(*order)
+        .values('id', 'sender_id', 'receiver_id', 'content', 'timestamp')[:limit + 1]
+        # A set, so that a conversation with oneself is read once
+        for sender, receiver in {(players[user1], players[user2]), (players[user2], players[user1])}
     ]
+    key = lambda message: (message['timestamp'], message['id'])
+    page = list(heapq.merge(*directions, key=key, reverse=not newer))[:limit + 1]
+    has_more = len(page) > limit
+    page = page[:limit]
+    if not newer:
+        page.reverse()
 
     return JsonResponse({
-        'messages': messages_list,
+        'messages': [
+            {
+                'sender': usernames[message['sender_id']],
+                'receiver': usernames[message['receiver_id']],
+                'content': message['content'],
+                'timestamp': message['timestamp'].isoformat(),
+            }
+            for message in page
+        ],
+        'before': encode_cursor(page[0]) if page else None,
+        'after': encode_cursor(page[-1]) if page else None,
+        'has_more': has_more,
     })
+
+class InboxView(APIView):
+    """The user's conversations, most recently active first"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limit = page_limit(request.GET)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        user = request.user
+        conversations = Conversation.objects.filter(
+            Q(user1=user) | Q(user2=user)
+        ).select_related('user1', 'user2', 'last_sender').order_by('-last_activity')[:limit]
+
+        def get_conversation_data(conversation):
+            mine = conversation.user1_id == user.id
+            other = conversation.user2 if mine else conversation.user1
+            return {
+                'username': other.username,
+                'avatar': other.get_avatar_url(),
+                'last_message': conversation.last_message,
+                'last_sender': conversation.last_sender.username if conversation.last_sender else None,
+                'last_activity': conversation.last_activity.isoformat(),
+                'unread': conversation.unread_user1 if mine else conversation.unread_user2,
+            }
+
+        return Response({
+            'conversations': [get_conversation_data(conversation) for conversation in conversations]
+        }, status=status.HTTP_200_OK)
+
+class ConversationReadView(APIView):
+    """Clear the user's unread count of the conversation with username"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, username):
+        Conversation.mark_read(request.user, username)
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,111 @@
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.db.models import Q
+from core.apps.authentication.groups import user_group_name
+from .models import Friendship
+from dataclasses import dataclass, field
+from typing import Dict, Set
+
+@dataclass(slots=True)
+class Relationships:
+    friends: Set[str] = field(default_factory=set)
+    blocked: Set[str] = field(default_factory=set)
+    blocked_by: Set[str] = field(default_factory=set)
+
+    def are_friends(self, username: str) -> bool:
+        return username in self.friends
+
+    def is_blocked(self, username: str) -> bool:
+        """Whether either user blocked the other"""
+        return username in self.blocked or username in self.blocked_by
+
+class RelationshipCache:
+    """
+    Accepted friends and blocks, in both directions, of the users connected
+    to this process. A user's entry is loaded with one query the first time
+    a connection of theirs needs it and dropped with their last connection.
+
+    ManageFriendshipView announces every change to the relationship_group()
+    of both users; their connections call invalidate() and the next check
+    loads the entry again.
+    """
+
+    def __init__(self):
+        self.entries: Dict[str, Relationships] = {}
+        self.connections: Dict[str, int] = {}
+        self.generations: Dict[str, int] = {}
+        self.hits = 0
+        self.loads = 0
+        self.invalidations = 0
+
+    def acquire(self, username: str) -> None:
+        self.connections[username] = self.connections.get(username, 0) + 1
+
+    def release(self, username: str) -> None:
+        count = self.connections.get(username, 0) - 1
+        if count > 0:
+            self.connections[username] = count
+            return
+        self.connections.pop(username, None)
+        self.entries.pop(username, None)
+        self.generations.pop(username, None)
+
+    @staticmethod
+    def load(username: str) -> Relationships:
+        relationships = Relationships()
+        rows = Friendship.objects.filter(
+            Q(from_user__username=username) | Q(to_user__username=username),
+            status__in=('accepted', 'blocked')
+        ).values_list('from_user__username', 'to_user__username', 'status')
+        for from_user, to_user, status in rows:
+            mine = from_user == username
+            other = to_user if mine else from_user
+            if status == 'accepted':
+                relationships.friends.add(other)
+            else:
+                (relationships.blocked if mine else relationships.blocked_by).add(other)
+        return relationships
+
+    async def get(self, username: str) -> Relationships:
+        entry = self.entries.get(username)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        generation = self.generations.get(username, 0)
+        entry = await database_sync_to_async(self.load)(username)
+        self.loads += 1
+        # Keep it only for connected users, and not if it was invalidated while loading
+        if username in self.connections and self.generations.get(username, 0) == generation:
+            self.entries[username] = entry
+        return entry
+
+    def invalidate(self, username: str) -> None:
+        self.invalidations += 1
+        self.entries.pop(username, None)
+        if username in self.connections:
+            self.generations[username] = self.generations.get(username, 0) + 1
+
+    def get_metrics(self) -> dict:
+        return {
+            "users": len(self.entries),
+            "connections": sum(self.connections.values()),
+            "hits": self.hits,
+            "loads": self.loads,
+            "invalidations": self.invalidations
+        }
+
+relationship_cache = RelationshipCache()
+
+def relationship_group(username: str) -> str:
+    return user_group_name("relationships_", username)
+
+def notify_relationship_change(*usernames: str) -> None:
+    """Tell the connections of each user, in every process, that their relationships changed"""
+    channel_layer = get_channel_layer()
+    for username in usernames:
+        async_to_sync(channel_layer.group_send)(
+            relationship_group(username),
+            {"type": "relationships_changed", "username": username}
+        )
@@ -7,6 +7,10 @@ from django.db.models import Q
 from core.apps.authentication.models import Player
 from .models import Friendship
 from .serializers import FriendshipSerializer
+from .cache import notify_relationship_change
+import logging
+
+logger = logging.getLogger(__name__)
 
 class ManageFriendshipView(APIView):
     permission_classes = [IsAuthenticated]
@@ -51,6 +55,15 @@ class ManageFriendshipView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def post(self, request, action, username, *args, **kwargs):
+        response = self.change_friendship(request, action, username)
+        if status.is_success(response.status_code):
+            try:
+                notify_relationship_change(request.user.username, username)
+            except Exception:
+                logger.exception("Could not announce relationship change")
+        return response
+
+    def change_friendship(self, request, action, username):
         target_user = get_object_or_404(Player, username=username)
         friendship = Friendship.objects.filter(
             (Q(from_user=request.user) & Q(to_user=target_user)) |
@@ -0,0 +1,136 @@
+from .game_models import *
+from .managers import GameManager
+from .config import GAME_CONSTANTS
+from typing import List
+import random
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+LEFT, RIGHT = 0, 1
+
+class BatchPhysicsEngine:
+    """
+    Structure-of-arrays physics for many matches at once.
+
+    Follows the same rules as GameManager.step_ball: wall bounce, paddle box
+    collision (first box hit wins, x flipped and pushed out by BALL_RADIUS)
+    and scoring with a fresh ball from GameManager.start_ball_direction.
+    Column 0 is always the left paddle, column 1 the right one.
+    """
+
+    def __init__(self, capacity: int = 64):
+        if np is None:
+            raise RuntimeError("BatchPhysicsEngine requires numpy")
+        self.count = 0
+        self.capacity = 0
+        self.players: List[tuple] = []
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.ball_pos = np.zeros((capacity, 2))
+        self.ball_dir = np.zeros((capacity, 2))
+        self.paddle_y = np.zeros((capacity, 2))
+        self.paddle_dir = np.zeros((capacity, 2))
+        self.box_min_x = np.zeros((capacity, 2))
+        self.box_max_x = np.zeros((capacity, 2))
+        self.scores = np.zeros((capacity, 2), dtype=np.int64)
+        self.active = np.zeros(capacity, dtype=bool)
+
+    def load(self, games: List[GameState]) -> None:
+        """Copy the state of games into the arrays, in order"""
+        n = len(games)
+        if n > self.capacity:
+            self._allocate(max(n, self.capacity * 2))
+        self.count = n
+        self.players = []
+
+        for i, game in enumerate(games):
+            left, right = sorted(game.paddle_positions, key=lambda p: game.paddle_positions[p].x)
+            self.players.append((left, right))
+            for side, player in ((LEFT, left), (RIGHT, right)):
+                box = game.paddle_boxes[player]
+                self.paddle_y[i, side] = game.paddle_positions[player].y
+                self.paddle_dir[i, side] = game.paddle_directions[player].value
+                self.box_min_x[i, side] = box["min"].x
+                self.box_max_x[i, side] = box["max"].x
+            self.ball_pos[i] = (game.ball_position.x, game.ball_position.y)
+            self.ball_dir[i] = (game.ball_direction.x, game.ball_direction.y)
+            self.scores[i] = (game.score_left, game.score_right)
+            self.active[i] = game.is_running
+
+    def store(self, games: List[GameState]) -> None:
+        """Write the arrays back into the games passed to load()"""
+        C = GAME_CONSTANTS
+        ball_pos = self.ball_pos.tolist()
+        ball_dir = self.ball_dir.tolist()
+        paddle_y = self.paddle_y.tolist()
+        scores = self.scores.tolist()
+
+        for i, game in enumerate(games):
+            game.ball_position.set(ball_pos[i][0], ball_pos[i][1], 0)
+            game.ball_direction.set(ball_dir[i][0], ball_dir[i][1], 0)
+            game.score_left, game.score_right = scores[i]
+            for side, player in enumerate(self.players[i]):
+                y = paddle_y[i][side]
+                position = game.paddle_positions[player]
+                if position.y != y:
+                    position.y = y
+                    game.paddle_boxes[player]["min"].y = y - C['PADDLE_HEIGHT']
+                    game.paddle_boxes[player]["max"].y = y + C['PADDLE_HEIGHT']
+
+    def step(self, delta_time: float, move_paddles: bool = True, rng=random):
+        """Advance every active match by delta_time. Returns indexes that scored"""
+        C = GAME_CONSTANTS
+        n = self.count
+        active = self.active[:n]
+        paddle_y = self.paddle_y[:n]
+
+        if move_paddles:
+            max_y = C['COURT_HEIGHT'] - C['PADDLE_HEIGHT']
+            moved = paddle_y + self.paddle_dir[:n] * (C['PADDLE_SPEED'] * delta_time)
+            np.clip(moved, -max_y, max_y, out=moved)
+            paddle_y[active] = moved[active]
+
+        ball_dir = self.ball_dir[:n]
+        new_pos = self.ball_pos[:n] + ball_dir * delta_time
+        x = new_pos[:, 0]
+        y = new_pos[:, 1]
+
+        wall = (np.abs(y) >= C['COURT_HEIGHT']) & active
+        ball_dir[wall, 1] *= -1
+        y[wall] = np.copysign(C['COURT_HEIGHT'], y[wall])
+
+        in_box = ((self.box_min_x[:n] <= x[:, None]) & (x[:, None] <= self.box_max_x[:n]) &
+                  (paddle_y - C['PADDLE_HEIGHT'] <= y[:, None]) &
+                  (y[:, None] <= paddle_y + C['PADDLE_HEIGHT']))
+        hit = in_box.any(axis=1) & active
+        if hit.any():
+            side = np.where(in_box[:, LEFT], LEFT, RIGHT)
+            ball_dir[hit, 0] *= -1
+            rows = np.nonzero(hit)[0]
+            box_min = self.box_min_x[rows, side[rows]]
+            box_max = self.box_max_x[rows, side[rows]]
+            x[rows] = np.where(ball_dir[rows, 0] > 0,
+                               box_max + C['BALL_RADIUS'],
+                               box_min - C['BALL_RADIUS'])
+
+        goal = (np.abs(x) >= C['COURT_WIDTH']) & active
+        self.ball_pos[:n][active] = new_pos[active]
+
+        scored = np.nonzero(goal)[0]
+        for i in scored:
+            if x[i] > 0:
+                self.scores[i, LEFT] += 1
+            else:
+                self.scores[i, RIGHT] += 1
+            self.ball_pos[i] = (0, 0)
+            direction = GameManager.start_ball_direction(rng)
+            self.ball_dir[i] = (direction.x, direction.y)
+        return scored
+
+    def has_winner(self, i: int) -> bool:
+        return int(self.scores[i].max()) >= GAME_CONSTANTS['WIN_SCORE']
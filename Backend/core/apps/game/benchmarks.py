@@ -0,0 +1,564 @@
+from .game_models import *
+from .managers import GameManager
+from .batch_physics import BatchPhysicsEngine, np
+from .fanout import LocalFanout
+from .protocol import pack_state, unpack_state, state_to_json, shared_frame
+from .simulation import Simulation, SimulationClock
+from .matchmaking import MatchmakingService, LocalQueueStore, QueueEntry
+from .managers import TournamentManager
+from .consumers import TournamentConsumer
+from .tournament_feed import LOBBY_GROUP, TournamentFeed
+from core.apps.authentication.consumers import ONLINE_GROUP, OnlineStatusConsumer
+from core.apps.friends.cache import Relationships
+from .brackets import BRACKETS
+from .config import GAME_CONSTANTS, MATCHMAKING_CONFIG, TOURNAMENT_CONFIG
+from channels.layers import InMemoryChannelLayer
+from channels.consumer import get_handler_name
+import asyncio
+import contextlib
+import copy
+import io
+import json
+import random
+import tracemalloc
+
+def create_games(matches: int, seed: int) -> List[GameState]:
+    random.seed(seed)
+    games = []
+    for i in range(matches):
+        game = GameManager.create_initial_state(f"p{i}a", f"p{i}b")
+        for player, position in game.paddle_positions.items():
+            position.y = random.uniform(-400, 400)
+            game.paddle_boxes[player]["min"].y = position.y - GAME_CONSTANTS['PADDLE_HEIGHT']
+            game.paddle_boxes[player]["max"].y = position.y + GAME_CONSTANTS['PADDLE_HEIGHT']
+        games.append(game)
+    return games
+
+def bench_physics(matches: int = 1000, ticks: int = 600, seed: int = 42) -> dict:
+    """Matches/second of GameManager.step_ball against BatchPhysicsEngine.step"""
+    dt = GAME_CONSTANTS['FRAME_TIME']
+    games = create_games(matches, seed)
+    batch_games = copy.deepcopy(games)
+
+    random.seed(seed)
+    started = time.perf_counter()
+    for _ in range(ticks):
+        for game in games:
+            GameManager.step_ball(game, dt)
+    object_time = time.perf_counter() - started
+
+    result = {
+        "matches": matches,
+        "ticks": ticks,
+        "object": {
+            "seconds": round(object_time, 4),
+            "match_steps_per_sec": int(matches * ticks / object_time)
+        }
+    }
+    if np is None:
+        result["batch"] = "numpy is not installed"
+        return result
+
+    engine = BatchPhysicsEngine(matches)
+    random.seed(seed)
+    started = time.perf_counter()
+    engine.load(batch_games)
+    for _ in range(ticks):
+        engine.step(dt, move_paddles=False)
+    engine.store(batch_games)
+    batch_time = time.perf_counter() - started
+
+    deviation = max(
+        max(abs(a.ball_position.x - b.ball_position.x), abs(a.ball_position.y - b.ball_position.y))
+        for a, b in zip(games, batch_games)
+    )
+    result["batch"] = {
+        "seconds": round(batch_time, 4),
+        "match_steps_per_sec": int(matches * ticks / batch_time)
+    }
+    result["speedup"] = round(object_time / batch_time, 2)
+    result["parity"] = {
+        "max_ball_deviation": deviation,
+        "scores_match": all(
+            (a.score_left, a.score_right) == (b.score_left, b.score_right)
+            for a, b in zip(games, batch_games)
+        )
+    }
+    return result
+
+def run_ticks(games: List[GameState], ticks: int, trace: bool) -> List[tuple]:
+    dt = GAME_CONSTANTS['FRAME_TIME']
+    samples = []
+    for tick in range(ticks):
+        if trace:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        started = time.process_time()
+        for game in games:
+            GameManager.apply_inputs(game)
+            GameManager.update_paddle_positions(game, dt)
+            GameManager.step_ball(game, dt)
+            pack_state(game, tick)
+        elapsed = time.process_time() - started
+        peak = tracemalloc.get_traced_memory()[1] - base if trace else 0
+        samples.append((elapsed, peak))
+    return samples
+
+def bench_tick(matches: int = 1000, ticks: int = 120, seed: int = 42) -> dict:
+    """Per-tick CPU time and transient allocations of the simulation hot path"""
+    tracemalloc.start()
+    games = create_games(matches, seed)
+    state_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    for i, game in enumerate(games):
+        for player in game.paddle_directions:
+            game.paddle_directions[player] = Direction.UP if i % 2 else Direction.DOWN
+
+    cpu = sorted(elapsed for elapsed, _ in run_ticks(games, ticks, trace=False))
+
+    tracemalloc.start()
+    peaks = sorted(peak for _, peak in run_ticks(games, ticks, trace=True))
+    tracemalloc.stop()
+
+    return {
+        "matches": matches,
+        "ticks": ticks,
+        "state_bytes_per_match": state_bytes // matches,
+        "cpu_ms_per_tick": {
+            "avg": round(sum(cpu) / len(cpu) * 1000, 3),
+            "p99": round(cpu[int(len(cpu) * 0.99)] * 1000, 3)
+        },
+        "peak_alloc_bytes_per_tick": {
+            "avg": int(sum(peaks) / len(peaks)),
+            "max": peaks[-1]
+        }
+    }
+
+class CountingChannelLayer:
+    """Wraps a channel layer and counts the operations that would hit Redis"""
+
+    def __init__(self, layer):
+        self.layer = layer
+        self.ops = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self.layer, name)
+        if name in ('send', 'group_send', 'group_add', 'group_discard', 'receive'):
+            async def counted(*args, **kwargs):
+                self.ops += 1
+                return await attr(*args, **kwargs)
+            return counted
+        return attr
+
+class FrameSink:
+    """Stands in for a GameConsumer and records frame delivery latency"""
+
+    def __init__(self, channel_name: str, latencies: list):
+        self.channel_name = channel_name
+        self.latencies = latencies
+
+    async def game_frame(self, event):
+        self.latencies.append(time.perf_counter() - event['sent'])
+
+async def run_fanout(matches: int, ticks: int, local: bool) -> dict:
+    layer = CountingChannelLayer(InMemoryChannelLayer(capacity=10000))
+    fanout = LocalFanout()
+    latencies = []
+    sinks = []
+
+    for i in range(matches):
+        for player in ('a', 'b'):
+            sink = FrameSink(await layer.new_channel(), latencies)
+            sinks.append(sink)
+            if local:
+                fanout.register(sink)
+                await fanout.group_add(layer, f"match{i}", sink.channel_name)
+            else:
+                await layer.group_add(f"match{i}", sink.channel_name)
+
+    async def pump(sink):
+        while True:
+            await sink.game_frame(await layer.receive(sink.channel_name))
+
+    receivers = [] if local else [asyncio.create_task(pump(sink)) for sink in sinks]
+    layer.ops = 0
+
+    started = time.perf_counter()
+    for _ in range(ticks):
+        for i in range(matches):
+            message = {'type': 'game_frame', 'sent': time.perf_counter()}
+            if local:
+                await fanout.group_send(layer, f"match{i}", message)
+            else:
+                await layer.group_send(f"match{i}", message)
+        await asyncio.sleep(0)
+    while len(latencies) < matches * ticks * 2:
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - started
+
+    for task in receivers:
+        task.cancel()
+    latencies.sort()
+    return {
+        "seconds": round(elapsed, 4),
+        "channel_layer_ops": layer.ops,
+        "latency_ms": {
+            "p50": round(latencies[len(latencies) // 2] * 1000, 3),
+            "p99": round(latencies[int(len(latencies) * 0.99)] * 1000, 3)
+        }
+    }
+
+def bench_fanout(matches: int = 200, ticks: int = 60) -> dict:
+    """Frame delivery through channel layer group_send against LocalFanout"""
+    return {
+        "matches": matches,
+        "ticks": ticks,
+        "group_send": asyncio.run(run_fanout(matches, ticks, local=False)),
+        "local_fanout": asyncio.run(run_fanout(matches, ticks, local=True))
+    }
+
+def bench_spectators(matches: int = 1, ticks: int = 600, spectators: int = 500) -> dict:
+    """Frame encoding cost per tick for a watched match, per recipient against shared"""
+    games = create_games(matches, 42)
+    recipients = spectators + 2
+
+    def run(encode) -> float:
+        started = time.perf_counter()
+        for tick in range(ticks):
+            for game in games:
+                GameManager.step_ball(game, GAME_CONSTANTS['FRAME_TIME'])
+                data = pack_state(game, tick)
+                for _ in range(recipients):
+                    encode(data)
+        return (time.perf_counter() - started) / ticks * 1000
+
+    return {
+        "matches": matches,
+        "recipients_per_match": recipients,
+        "ms_per_tick": {
+            "per_recipient_json": round(run(lambda data: json.dumps(state_to_json(unpack_state(data)))), 3),
+            "shared_frame": round(run(lambda data: shared_frame(data).text), 3)
+        }
+    }
+
+def bench_simulation(matches: int = 1000, ticks: int = 3000, seed: int = 42, batch: bool = False) -> dict:
+    """Headless matches with scripted players: tick throughput, tail latency and allocations"""
+    sim = Simulation(matches, seed, batch)
+    durations = []
+    started = time.perf_counter()
+    while sim.running and sim.tick_count < ticks:
+        tick_started = time.perf_counter()
+        sim.step()
+        durations.append(time.perf_counter() - tick_started)
+    elapsed = time.perf_counter() - started
+
+    # Allocations are measured on a second run with the same seed, which
+    # must also end in the same state as the first one.
+    traced = Simulation(matches, seed, batch)
+    peaks = []
+    tracemalloc.start()
+    while traced.running and traced.tick_count < ticks:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        traced.step()
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    durations.sort()
+    return {
+        "matches": matches,
+        "physics": "batch" if sim.scheduler.engine else "object",
+        "ticks": sim.tick_count,
+        "finished_matches": len(sim.finished),
+        "ticks_per_sec": int(sim.tick_count / elapsed),
+        "realtime_factor": round(sim.clock() / elapsed, 1),
+        "tick_ms": {
+            "avg": round(sum(durations) / len(durations) * 1000, 3),
+            "p99": round(durations[int(len(durations) * 0.99)] * 1000, 3),
+            "max": round(durations[-1] * 1000, 3)
+        },
+        "peak_alloc_bytes_per_tick": {
+            "avg": int(sum(peaks) / len(peaks)),
+            "max": max(peaks)
+        },
+        "deterministic": sim.digest() == traced.digest()
+    }
+
+class NullChannelLayer:
+    """Accepts sends and counts them"""
+
+    def __init__(self):
+        self.sent = 0
+
+    async def send(self, channel, message):
+        self.sent += 1
+
+async def run_matchmaking(players: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    clock = SimulationClock()
+    layer = NullChannelLayer()
+    service = MatchmakingService(LocalQueueStore(), clock=clock, channel_layer=layer)
+
+    started = time.perf_counter()
+    for i in range(players):
+        # Arrivals spread over 30 seconds, skill roughly normal around 30 points
+        service.store.add(QueueEntry(f"p{i}", f"c{i}", int(rng.gauss(30, 25)), rng.uniform(0, 30)))
+    enqueue_time = time.perf_counter() - started
+
+    clock.now = 30.0
+    rounds = []
+    while service.store.count() > 1 and len(rounds) < 100:
+        round_started = time.perf_counter()
+        paired = await service.pair_round()
+        rounds.append((time.perf_counter() - round_started, paired))
+        clock.advance(MATCHMAKING_CONFIG['PAIR_INTERVAL'])
+
+    first_time, first_paired = rounds[0]
+    return {
+        "players": players,
+        "enqueue_us_per_player": round(enqueue_time / players * 1e6, 2),
+        "first_round": {
+            "ms": round(first_time * 1000, 2),
+            "pairs": first_paired,
+            "pairs_per_sec": int(first_paired / first_time)
+        },
+        "rounds_to_drain": len(rounds),
+        "left_waiting": service.store.count(),
+        "max_wait_seconds": round(service.max_wait, 1),
+        "announcements": layer.sent
+    }
+
+def bench_matchmaking(players: int = 10000, seed: int = 42) -> dict:
+    """Pairing latency and throughput with a large matchmaking queue"""
+    return asyncio.run(run_matchmaking(players, seed))
+
+def run_tournament(players: int, format: str, rng: random.Random) -> dict:
+    manager = TournamentManager()
+    durations = []
+    # The manager logs every result; keep that out of the timings and the output
+    with contextlib.redirect_stdout(io.StringIO()):
+        tournament = manager.create_tournament([f"p{i}" for i in range(players)], format)
+        pending = list(tournament.matches.values())
+        most_parallel = len(pending)
+        while pending:
+            match = pending.pop(rng.randrange(len(pending)))
+            winner = rng.choice((match.player1, match.player2))
+            started = time.perf_counter()
+            success, opened = manager.handle_match_complete(tournament.id, match.match_id, winner)
+            durations.append(time.perf_counter() - started)
+            pending += opened
+            most_parallel = max(most_parallel, len(pending))
+
+    durations.sort()
+    return {
+        "matches": len(durations),
+        "rounds": len({match.round for match in tournament.bracket.matches if match.index in tournament.match_ids.values()}),
+        "most_parallel_matches": most_parallel,
+        "completed": tournament.state == TournamentState.COMPLETED,
+        "result_us": {
+            "avg": round(sum(durations) / len(durations) * 1e6, 2),
+            "p99": round(durations[int(len(durations) * 0.99)] * 1e6, 2),
+            "max": round(durations[-1] * 1e6, 2)
+        }
+    }
+
+def bench_tournament(players: int = 256, seed: int = 42) -> dict:
+    """Cost of processing one match result, per bracket format, results in random order"""
+    rng = random.Random(seed)
+    return {
+        "players": players,
+        **{format: run_tournament(players, format, rng) for format in BRACKETS}
+    }
+
+class StaticPlayerCache:
+    """Serves made-up player summaries in place of Redis and the database"""
+
+    async def get_many(self, usernames):
+        return {
+            username: {"username": username, "tournament_username": username, "avatar": "", "t_points": 0}
+            for username in usernames if username
+        }
+
+    async def get(self, username):
+        return (await self.get_many([username])).get(username, {})
+
+class DeliveryCountingLayer(CountingChannelLayer):
+    """
+    Counts the messages each group_send delivers, and the messages the same
+    send would have delivered if it had gone to global_group, which every
+    consumer joins
+    """
+
+    def __init__(self, layer, global_group: str):
+        super().__init__(layer)
+        self.global_group = global_group
+        self.deliveries = 0
+        self.global_deliveries = 0
+
+    async def group_send(self, group, message):
+        self.deliveries += len(self.layer.groups.get(group, ()))
+        self.global_deliveries += len(self.layer.groups.get(self.global_group, ()))
+        await self.layer.group_send(group, message)
+
+class GroupHarness:
+    """
+    Consumers of one class on an in-memory DeliveryCountingLayer, each
+    reading its channel in its own task. Nothing reaches a socket: accept()
+    does nothing and send() only counts messages and bytes. attrs replace
+    the class-level state of the consumer class for this run.
+    """
+
+    def __init__(self, consumer_class, global_group: str, **attrs):
+        self.layer = DeliveryCountingLayer(InMemoryChannelLayer(capacity=100000), global_group)
+        self.messages = 0
+        self.bytes = 0
+        self.clients = []
+        self.receivers: List[asyncio.Task] = []
+        harness = self
+
+        async def accept(consumer, subprotocol=None, headers=None):
+            pass
+
+        async def send(consumer, text_data=None, bytes_data=None, close=False):
+            harness.messages += 1
+            harness.bytes += len(text_data or bytes_data or '')
+
+        self.consumer_class = type(consumer_class.__name__, (consumer_class,), {**attrs, 'accept': accept, 'send': send})
+
+    async def add_client(self, scope: Optional[dict] = None):
+        client = self.consumer_class()
+        client.scope = scope or {}
+        client.channel_layer = self.layer
+        client.channel_name = await self.layer.new_channel()
+        self.clients.append(client)
+        self.receivers.append(asyncio.create_task(self.pump(client)))
+        return client
+
+    async def pump(self, client) -> None:
+        while True:
+            message = await self.layer.receive(client.channel_name)
+            await getattr(client, get_handler_name(message))(message)
+
+    async def drain(self) -> None:
+        """Wait until every channel has been read"""
+        while any(not queue.empty() for queue in self.layer.layer.channels.values()):
+            await asyncio.sleep(0.001)
+
+    def reset_counts(self) -> None:
+        self.layer.deliveries = self.layer.global_deliveries = self.messages = self.bytes = 0
+
+    def close(self) -> None:
+        for task in self.receivers:
+            task.cancel()
+
+async def run_tournament_groups(players: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    harness = GroupHarness(
+        TournamentConsumer, LOBBY_GROUP,
+        tournament_manager=TournamentManager(),
+        feed=TournamentFeed(),
+        players=StaticPlayerCache(),
+        connected_players=set()
+    )
+    clients = [await harness.add_client() for _ in range(players)]
+
+    # Only deliveries are measured: the in-memory layer's own cost grows
+    # with the number of channels and says nothing about Redis
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i, client in enumerate(clients):
+            await client.connect()
+            await client.handle_join_tournament(f"p{i}")
+        await harness.drain()
+
+        # Report results of all tournaments interleaved, in random order
+        manager = harness.consumer_class.tournament_manager
+        while manager.tournaments:
+            tournament = rng.choice(list(manager.tournaments.values()))
+            match_id = rng.choice(sorted(tournament.current_round_matches))
+            match = tournament.matches[match_id]
+            await clients[0].handle_game_complete(tournament.id, match_id, rng.choice((match.player1, match.player2)))
+            await asyncio.sleep(0)
+        await harness.drain()
+
+    harness.close()
+    return {
+        "clients": players,
+        "tournaments": players // TOURNAMENT_CONFIG['PLAYERS_PER_TOURNAMENT'],
+        "deliveries": harness.layer.deliveries,
+        "single_group_deliveries": harness.layer.global_deliveries,
+        "per_client": {
+            "messages": round(harness.messages / players, 1),
+            "kbytes": round(harness.bytes / players / 1024, 1)
+        },
+        "feed": harness.consumer_class.feed.get_metrics()
+    }
+
+def bench_tournament_groups(players: int = 256, seed: int = 42) -> dict:
+    """Messages delivered while many tournaments run at once on per-tournament groups"""
+    return asyncio.run(run_tournament_groups(players, seed))
+
+class OpenRelationships:
+    """Stands in for the relationship cache: nobody is blocked"""
+
+    def acquire(self, username):
+        pass
+
+    def release(self, username):
+        pass
+
+    async def get(self, username):
+        return Relationships()
+
+async def run_invites(users: int, invites: int, rng: random.Random) -> dict:
+    harness = GroupHarness(
+        OnlineStatusConsumer, ONLINE_GROUP,
+        relationships=OpenRelationships(),
+        online_users=set(),
+        user_status={},
+        game_invites={}
+    )
+    clients = [
+        await harness.add_client({'url_route': {'kwargs': {'username': f"u{i}"}}})
+        for i in range(users)
+    ]
+    for client in clients:
+        await client.connect()
+    await harness.drain()
+
+    # Only invite traffic from here on: an invite, then its acceptance
+    harness.reset_counts()
+    for _ in range(invites):
+        sender, recipient = rng.sample(clients, 2)
+        await sender.receive(json.dumps({'type': 'game_invite', 'sender': sender.username, 'recipient': recipient.username}))
+        await recipient.receive(json.dumps({
+            'type': 'invite_response', 'sender': sender.username, 'recipient': recipient.username, 'response': 'accepted'
+        }))
+    await harness.drain()
+
+    harness.close()
+    return {
+        "deliveries_per_invite": round(harness.layer.deliveries / invites, 2),
+        "single_group_deliveries_per_invite": round(harness.layer.global_deliveries / invites, 2),
+        "messages_sent_per_invite": round(harness.messages / invites, 2)
+    }
+
+def bench_invites(players: int = 400, invites: int = 200, seed: int = 42) -> dict:
+    """Fan-out of game invite traffic with per-user groups, for growing numbers of online users"""
+    rng = random.Random(seed)
+    return {
+        "invites": invites,
+        **{f"{users}_online": asyncio.run(run_invites(users, invites, rng)) for users in (players // 4, players // 2, players)}
+    }
+
+BENCHMARKS = {
+    'physics': bench_physics,
+    'fanout': bench_fanout,
+    'tick': bench_tick,
+    'spectators': bench_spectators,
+    'simulation': bench_simulation,
+    'matchmaking': bench_matchmaking,
+    'tournament': bench_tournament,
+    'tournament_groups': bench_tournament_groups,
+    'invites': bench_invites,
+}
@@ -0,0 +1,283 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+import math
+
+# Stands in for the missing opponent of a bye. Usernames are never blank.
+BYE = ''
+
+Slot = Tuple[int, int]
+
+@dataclass(slots=True)
+class BracketMatch:
+    index: int
+    round: int
+    position: int
+    label: str
+    players: List[Optional[str]] = field(default_factory=lambda: [None, None])
+    winner: Optional[str] = None
+    loser: Optional[str] = None
+    winner_to: Optional[Slot] = None
+    loser_to: Optional[Slot] = None
+
+def seeding_order(size: int) -> List[int]:
+    """Seed numbers (0-based) in bracket order, so that top seeds meet last: 0, 3, 1, 2 for 4"""
+    order = [0]
+    while len(order) < size:
+        order = [seed for s in order for seed in (s, 2 * len(order) - 1 - s)]
+    return order
+
+class Bracket(ABC):
+    """
+    Matches of one tournament in a flat list, each knowing where its winner
+    (and, in double elimination, its loser) goes next. Reporting a result
+    seats the players in their next matches in O(1). A match is ready as
+    soon as both of its players are known, so different rounds can be
+    played at the same time. Players are given in seed order.
+    """
+
+    def __init__(self, players: List[str]):
+        if len(players) < 2:
+            raise ValueError("A bracket needs at least 2 players")
+        self.players = list(players)
+        self.matches: List[BracketMatch] = []
+        self.active: Set[int] = set()
+        self.champion: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.champion is not None
+
+    def add_match(self, round: int, position: int, label: str) -> BracketMatch:
+        match = BracketMatch(len(self.matches), round, position, label)
+        self.matches.append(match)
+        return match
+
+    @abstractmethod
+    def start(self) -> List[BracketMatch]:
+        """Seat the players and return the matches that can be played now"""
+
+    def report(self, index: int, winner: str) -> List[BracketMatch]:
+        """Record a result. Returns the matches that became ready because of it"""
+        if index not in self.active or winner not in self.matches[index].players:
+            raise ValueError(f"Match {index} is not waiting for a result from {winner}")
+        ready: List[BracketMatch] = []
+        self.resolve(self.matches[index], winner, ready)
+        return ready
+
+    def seat(self, slot: Slot, player: str, ready: List[BracketMatch]) -> None:
+        match = self.matches[slot[0]]
+        match.players[slot[1]] = player
+        if None in match.players:
+            return
+        if BYE in match.players:
+            self.resolve(match, match.players[0] or match.players[1], ready)
+        else:
+            self.active.add(match.index)
+            ready.append(match)
+
+    def resolve(self, match: BracketMatch, winner: str, ready: List[BracketMatch]) -> None:
+        match.winner = winner
+        match.loser = match.players[1] if winner == match.players[0] else match.players[0]
+        self.active.discard(match.index)
+        if match.winner_to:
+            self.seat(match.winner_to, winner, ready)
+        else:
+            self.champion = winner
+        if match.loser_to:
+            self.seat(match.loser_to, match.loser, ready)
+
+    def seat_first_round(self, first_round: List[BracketMatch], size: int) -> List[BracketMatch]:
+        seeds = seeding_order(size)
+        ready: List[BracketMatch] = []
+        for match in first_round:
+            for side in (0, 1):
+                seed = seeds[2 * match.position + side]
+                self.seat((match.index, side), self.players[seed] if seed < len(self.players) else BYE, ready)
+        return ready
+
+def elimination_label(round: int, rounds: int, position: int) -> str:
+    if round == rounds - 1:
+        return 'finals'
+    if round == rounds - 2:
+        return f'semi{position + 1}'
+    return f'r{round + 1}m{position + 1}'
+
+class SingleElimination(Bracket):
+    """Knockout bracket padded to a power of two; the top seeds get the byes"""
+
+    def __init__(self, players: List[str]):
+        super().__init__(players)
+        self.size = 1 << (len(players) - 1).bit_length()
+        self.rounds = self.size.bit_length() - 1
+
+        previous: List[BracketMatch] = []
+        for round in range(self.rounds):
+            current = [
+                self.add_match(round, i, elimination_label(round, self.rounds, i))
+                for i in range(self.size >> (round + 1))
+            ]
+            for i, match in enumerate(previous):
+                match.winner_to = (current[i // 2].index, i % 2)
+            previous = current
+
+    def start(self) -> List[BracketMatch]:
+        return self.seat_first_round(self.matches[:self.size // 2], self.size)
+
+class DoubleElimination(Bracket):
+    """
+    Winners and losers brackets and a grand final between their champions.
+    A player is out after a second loss, so when the losers bracket champion
+    wins the grand final the two play it again in a reset match.
+    """
+
+    def __init__(self, players: List[str]):
+        super().__init__(players)
+        self.size = max(4, 1 << (len(players) - 1).bit_length())
+        k = self.size.bit_length() - 1
+
+        winners: List[List[BracketMatch]] = []
+        for round in range(k):
+            current = [self.add_match(round, i, f'w{round + 1}m{i + 1}') for i in range(self.size >> (round + 1))]
+            for i, match in enumerate(winners[-1] if winners else []):
+                match.winner_to = (current[i // 2].index, i % 2)
+            winners.append(current)
+
+        # Losers round 1 takes the losers of winners round 1 in pairs. After
+        # that, even rounds meet the next batch of winners bracket losers
+        # and odd rounds halve the field.
+        losers: List[List[BracketMatch]] = []
+        for round in range(2 * (k - 1)):
+            count = self.size >> (round // 2 + 2)
+            current = [self.add_match(k + round, i, f'l{round + 1}m{i + 1}') for i in range(count)]
+            if round == 0:
+                for i, match in enumerate(winners[0]):
+                    match.loser_to = (current[i // 2].index, i % 2)
+            elif round % 2:
+                drop = winners[round // 2 + 1]
+                for i, match in enumerate(losers[-1]):
+                    match.winner_to = (current[i].index, 0)
+                for i, match in enumerate(drop):
+                    # Alternate the drop order to keep early rematches apart
+                    target = i if round % 4 == 1 else count - 1 - i
+                    match.loser_to = (current[target].index, 1)
+            else:
+                for i, match in enumerate(losers[-1]):
+                    match.winner_to = (current[i // 2].index, i % 2)
+            losers.append(current)
+
+        self.final = self.add_match(3 * k - 2, 0, 'finals')
+        self.reset = self.add_match(3 * k - 1, 0, 'reset')
+        winners[-1][0].winner_to = (self.final.index, 0)
+        losers[-1][0].winner_to = (self.final.index, 1)
+        self.first_round = winners[0]
+
+    def start(self) -> List[BracketMatch]:
+        return self.seat_first_round(self.first_round, self.size)
+
+    def resolve(self, match: BracketMatch, winner: str, ready: List[BracketMatch]) -> None:
+        if match is not self.final or winner == match.players[0]:
+            super().resolve(match, winner, ready)
+            return
+        # First loss of the winners bracket champion: play the final again
+        match.winner, match.loser = winner, match.players[0]
+        self.active.discard(match.index)
+        self.seat((self.reset.index, 0), match.players[0], ready)
+        self.seat((self.reset.index, 1), winner, ready)
+
+class Swiss(Bracket):
+    """
+    Fixed number of rounds (log2 of the field by default) in which players
+    with the same score meet, avoiding rematches where possible. A result
+    only updates counters; the next round is paired once the current one is
+    complete. An odd player out gets a bye worth a win, at most once.
+    """
+
+    def __init__(self, players: List[str], rounds: Optional[int] = None):
+        super().__init__(players)
+        self.rounds = rounds or max(1, math.ceil(math.log2(len(players))))
+        self.round = 0
+        self.remaining = 0
+        self.seed = {player: i for i, player in enumerate(self.players)}
+        self.points: Dict[str, int] = dict.fromkeys(self.players, 0)
+        self.opponents: Dict[str, Set[str]] = {player: set() for player in self.players}
+        self.byes: Set[str] = set()
+
+    def start(self) -> List[BracketMatch]:
+        return self.pair_round()
+
+    def pair(self, order: List[str]) -> Optional[List[Tuple[str, str]]]:
+        """
+        Pairs each player, top of the order first, with the next one they have
+        not met yet, backtracking when that leaves the rest unpairable.
+        None if every pairing has a rematch.
+        """
+        if not order:
+            return []
+        player, rest = order[0], order[1:]
+        for i, opponent in enumerate(rest):
+            if opponent in self.opponents[player]:
+                continue
+            pairs = self.pair(rest[:i] + rest[i + 1:])
+            if pairs is not None:
+                return [(player, opponent)] + pairs
+        return None
+
+    def pair_round(self) -> List[BracketMatch]:
+        order = sorted(self.players, key=lambda player: (-self.points[player], self.seed[player]))
+        pairs = None
+        if len(order) % 2:
+            # Lowest player without a bye yet whose removal leaves no rematch
+            candidates = [player for player in reversed(order) if player not in self.byes] or [order[-1]]
+            for bye in candidates:
+                pairs = self.pair([player for player in order if player != bye])
+                if pairs is not None:
+                    break
+            else:
+                bye = candidates[0]
+            order.remove(bye)
+            self.byes.add(bye)
+            self.points[bye] += 1
+        else:
+            pairs = self.pair(order)
+        if pairs is None:
+            pairs = list(zip(order[::2], order[1::2]))
+
+        ready = []
+        for pair in pairs:
+            match = self.add_match(self.round, len(ready), f's{self.round + 1}m{len(ready) + 1}')
+            match.players = list(pair)
+            self.active.add(match.index)
+            ready.append(match)
+
+        self.round += 1
+        self.remaining = len(ready)
+        return ready
+
+    def resolve(self, match: BracketMatch, winner: str, ready: List[BracketMatch]) -> None:
+        match.winner = winner
+        match.loser = match.players[1] if winner == match.players[0] else match.players[0]
+        self.active.discard(match.index)
+        self.points[winner] += 1
+        self.opponents[winner].add(match.loser)
+        self.opponents[match.loser].add(winner)
+
+        self.remaining -= 1
+        if self.remaining:
+            return
+        if self.round < self.rounds:
+            ready.extend(self.pair_round())
+        else:
+            self.champion = self.standings()[0]
+
+    def standings(self) -> List[str]:
+        """Players by score, then by the summed score of their opponents (Buchholz)"""
+        def buchholz(player: str) -> int:
+            return sum(self.points[opponent] for opponent in self.opponents[player])
+        return sorted(self.players, key=lambda player: (-self.points[player], -buchholz(player), self.seed[player]))
+
+BRACKETS = {
+    'single_elimination': SingleElimination,
+    'double_elimination': DoubleElimination,
+    'swiss': Swiss
+}
@@ -5,6 +5,8 @@ GAME_CONSTANTS = {
     'WIN_SCORE': 5,
     'PADDLE_SPEED': 1200,
     'PADDLE_HEIGHT': 280,
+    'PADDLE_X': 1300,
+    'PADDLE_HALF_WIDTH': 100,
     'BALL_RADIUS': 60,
     'COURT_HEIGHT': 785,
     'COURT_WIDTH': 1600,
@@ -13,6 +15,83 @@ GAME_CONSTANTS = {
 
 TOURNAMENT_CONFIG = {
     'PLAYERS_PER_TOURNAMENT': 4,
+    # 'single_elimination', 'double_elimination' or 'swiss' (see brackets.py)
+    'FORMAT': 'single_elimination',
+    # Seconds for a tournament's first game to start, and for each match to
+    # start once it is ready, before the tournament expires or the match is
+    # forfeited (see tournament_scheduler.py)
     'WAITING_TIMEOUT': 300,
-    'MATCH_TIMEOUT': 600
-}
\ No newline at end of file
+    'MATCH_TIMEOUT': 600,
+    'TIMER_RESOLUTION': 1.0,
+    'TIMER_SLOTS': 1024
+}
+
+PROTOCOL_CONFIG = {
+    'DELTA_HISTORY': 64,
+    'SHARED_FRAMES': 1024
+}
+
+BROADCAST_CONFIG = {
+    'STALE_FRAME_AGE': 0.1,
+    'MAX_SEND_INTERVAL': 4,
+    'ACK_TIMEOUT': 0.5,
+    'ADAPT_PERIOD': 1.0
+}
+
+REPLAY_CONFIG = {
+    'ENABLED': False,
+    'DIRECTORY': 'replays',
+    'FLUSH_INTERVAL': 0.5,
+    'INDEX_INTERVAL': 60,
+    'QUEUE_SIZE': 100000,
+    'CHUNK_SIZE': 65536
+}
+
+REGISTRY_CONFIG = {
+    # 'local' keeps match ownership in process; 'cache' shares it through
+    # Redis so several workers can host matches
+    'BACKEND': 'local',
+    'OWNERSHIP_TTL': 30,
+    'REFRESH_INTERVAL': 10
+}
+
+MATCHMAKING_CONFIG = {
+    # 'local' queues players per process; 'cache' shares one queue in Redis
+    'BACKEND': 'local',
+    'PAIR_INTERVAL': 1.0,
+    'BUCKET_SIZE': 10,
+    'WIDEN_AFTER': 2.0,
+    'LOCK_TIMEOUT': 5,
+    # Queue entries of a worker silent for this long are dropped
+    'HEARTBEAT_TTL': 5,
+    # A paired player goes back into the queue if the match is not hosted by then
+    'PAIRED_TIMEOUT': 10
+}
+
+SNAPSHOT_CONFIG = {
+    # 'cache' shares snapshots through Redis; 'disk' keeps them on this host
+    'BACKEND': 'cache',
+    'DIRECTORY': 'snapshots',
+    'INTERVAL': 1.0,
+    'STALE_AFTER': 3.0,
+    'RESUME_WINDOW': 120,
+    'RESUME_DELAY': 3
+}
+
+RESULTS_CONFIG = {
+    'FLUSH_INTERVAL': 0.25,
+    'BATCH_SIZE': 200,
+    'MAX_ATTEMPTS': 3
+}
+
+RECONNECT_CONFIG = {
+    'GRACE_PERIOD': 15,
+    'TIMER_RESOLUTION': 0.5,
+    'TIMER_SLOTS': 128
+}
+
+SCHEDULER_CONFIG = {
+    'MAX_CATCHUP_TICKS': 5,
+    'BATCH_PHYSICS': False,
+    'METRICS_WINDOW': 600
+}
@@ -2,19 +2,103 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from .game_models import *
 from .managers import GameManager, TournamentManager
-from .config import GAME_CONSTANTS, TOURNAMENT_CONFIG
-from core.apps.authentication.models import Player, Match
+from .scheduler import game_scheduler
+from .fanout import local_fanout
+from .replay import replay_recorder
+from .registry import match_registry
+from .matchmaking import matchmaking_service
+from .snapshots import snapshot_writer, restore_game
+from .timers import reconnect_timers
+from .results import result_writer
+from .tournament_scheduler import tournament_scheduler
+from .tournament_feed import LOBBY_GROUP, tournament_feed, tournament_entry, tournament_group, player_group
+from .protocol import DeltaEncoder, SharedFrame, input_seq, pack_state, shared_frame
+from .throttle import FrameThrottle
+from .config import GAME_CONSTANTS, TOURNAMENT_CONFIG, SNAPSHOT_CONFIG, RECONNECT_CONFIG, MATCHMAKING_CONFIG
+from core.apps.authentication.cache import player_cache
 import json
 import asyncio
-from dataclasses import asdict
-from typing import Dict, Set
+import logging
+from typing import Dict, Iterable, Set
 
-class GameConsumer(AsyncWebsocketConsumer):
+logger = logging.getLogger(__name__)
+
+class FrameStreamConsumer(AsyncWebsocketConsumer):
+    """Receives the frames of a match group, for players and spectators alike"""
+    fanout = local_fanout
+    games_data = game_scheduler.games
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.frame_encoder: Optional[DeltaEncoder] = None
+        self.throttle = FrameThrottle()
+        self.pending_frame: Optional[SharedFrame] = None
+        self.frame_task: Optional[asyncio.Task] = None
+
+    async def send_rate(self) -> None:
+        await self.send(text_data=json.dumps({
+            'type': 'rate',
+            'interval_ms': self.throttle.interval_ms
+        }))
+
+    async def game_start(self, event):
+        await self.send(text_data=json.dumps(event['data']))
+
+    async def game_update(self, event):
+        await self.send(text_data=json.dumps(event['data']))
+
+    async def game_end(self, event):
+        # Let the last frames go out before the result
+        if self.frame_task and not self.frame_task.done():
+            await asyncio.wait([self.frame_task])
+        await self.send(text_data=json.dumps(event['data']))
+
+    async def game_frame(self, event):
+        frame = shared_frame(event['frame'])
+        if self.throttle.is_stale(frame.state[0]):
+            return
+        if not self.throttle.should_send(frame.state[0]):
+            return
+
+        # Only the newest frame is kept while a send is in flight, so a slow
+        # socket gets fewer frames instead of a growing backlog. Sends run in
+        # their own task: channel layer messages are dispatched one at a time,
+        # so awaiting the send here would queue them up behind it instead.
+        if self.pending_frame:
+            self.throttle.coalesced += 1
+        self.pending_frame = frame
+        if not self.frame_task or self.frame_task.done():
+            self.frame_task = asyncio.create_task(self.send_pending_frames())
+
+    async def send_pending_frames(self) -> None:
+        try:
+            while self.pending_frame:
+                frame, self.pending_frame = self.pending_frame, None
+                await self.send_frame(frame)
+        except Exception:
+            self.pending_frame = None
+            logger.exception("Frame send failed")
+
+    async def send_frame(self, frame: SharedFrame) -> None:
+        if self.frame_encoder:
+            await self.send(bytes_data=self.frame_encoder.encode(frame.state))
+            if self.throttle.adapt():
+                await self.send_rate()
+        else:
+            await self.send(text_data=frame.text)
+
+class GameConsumer(FrameStreamConsumer):
     game_manager = GameManager()
-    waiting_players = {}
+    scheduler = game_scheduler
+    recorder = replay_recorder
+    registry = match_registry
+    matchmaking = matchmaking_service
+    snapshots = snapshot_writer
+    timers = reconnect_timers
+    results = result_writer
+    players = player_cache
     connected_players = {}
     player_groups = {}
-    games_data = {}
     active_invites = {}
 
     def __init__(self, *args, **kwargs):
@@ -23,66 +107,87 @@ class GameConsumer(AsyncWebsocketConsumer):
 
     async def connect(self):
         try:
+            self.fanout.register(self)
+            await self.registry.start(self.channel_layer)
             await self.channel_layer.group_add("game_invites", self.channel_name)
             await self.accept()
         except Exception as e:
             await self.close()
 
     async def disconnect(self, close_code):
+        self.fanout.unregister(self)
         try:
             if self.username:
                 await self.channel_layer.group_discard("game_invites", self.channel_name)
                 
                 group_id = self.player_groups.get(self.username)
-                if group_id:
-                    game = self.games_data.get(group_id)
-                    if game:
-                        if game.is_running:
-                            opponent = next((player for player in game.connected_players if player != self.username), None)
-                            if opponent:
-                                p1 = next(key for key, value in game.player_labels.items() if value == 'player1')
-                                p2 = next(key for key, value in game.player_labels.items() if value == 'player2')
-
-                                score_left = 6 if opponent == p1 else 0
-                                score_right = 0 if opponent == p1 else 6
-
-                                await self.create_match_record(p1, p2, opponent, score_left, score_right)
-                                await self.handle_game_end(opponent)
-
-                                await self.channel_layer.group_send(
-                                    group_id,
-                                    {
-                                        'type': 'game_update',
-                                        'data': {
-                                            "type": "game_end",
-                                            "winner": opponent,
-                                            "score": {
-                                                "player1": {
-                                                    "usr": p1,
-                                                    "avatar": await self.get_player_avatar(p1),
-                                                    "score": score_left
-                                                },
-                                                "player2": {
-                                                    "usr": p2,
-                                                    "avatar": await self.get_player_avatar(p2),
-                                                    "score": score_right
-                                                }
-                                            },
-                                            "reason": "disconnect"
-                                        }
-                                    }
-                                )
-                        game.is_running = False
-
-                    await self.channel_layer.group_discard(group_id, self.channel_name)
+                if group_id in self.games_data:
+                    await self.fanout.group_discard(self.channel_layer, group_id, self.channel_name)
+                    if await self.suspend_player(group_id, self.username):
+                        self.connected_players.pop(self.username, None)
+                        return
+                    await self.forfeit(group_id, self.username)
                     await self.remove_player_from_game(group_id)
+                elif group_id:
+                    await self.fanout.group_discard(self.channel_layer, group_id, self.channel_name)
+                    await self.registry.send_to_owner(group_id, {
+                        'type': 'match.leave',
+                        'username': self.username,
+                        'channel': self.channel_name
+                    })
 
                 self.connected_players.pop(self.username, None)
-                self.waiting_players.pop(self.username, None)
+                await self.matchmaking.leave(self.username)
                 self.player_groups.pop(self.username, None)
         except Exception as e:
             pass
     
+    async def forfeit(self, group_id: str, leaver: str) -> None:
+        """End a running match in favour of the player who did not leave"""
+        game = self.games_data.get(group_id)
+        if game:
+            if game.is_running or game.disconnected:
+                opponent = next((player for player in game.connected_players
+                                 if player != leaver and player not in game.disconnected), None)
+                if opponent:
+                    p1 = next(key for key, value in game.player_labels.items() if value == 'player1')
+                    p2 = next(key for key, value in game.player_labels.items() if value == 'player2')
+
+                    score_left = 6 if opponent == p1 else 0
+                    score_right = 0 if opponent == p1 else 6
+
+                    await self.create_match_record(p1, p2, opponent, score_left, score_right)
+                    await self.handle_game_end(opponent)
+
+                    await self.fanout.group_send(
+                        self.channel_layer,
+                        group_id,
+                        {
+                            'type': 'game_update',
+                            'data': {
+                                "type": "game_end",
+                                "winner": opponent,
+                                "score": {
+                                    "player1": {
+                                        "usr": p1,
+                                        "avatar": await self.get_player_avatar(p1),
+                                        "score": score_left
+                                    },
+                                    "player2": {
+                                        "usr": p2,
+                                        "avatar": await self.get_player_avatar(p2),
+                                        "score": score_right
+                                    }
+                                },
+                                "reason": "disconnect",
+                                "replay": self.recorder.replay_id(group_id)
+                            }
+                        }
+                    )
+            game.is_running = False
+            self.recorder.finish(group_id)
+            self.snapshots.discard(group_id, game)
+
     async def handle_disconnect_win(self, group_id: str) -> None:
         if group_id in self.games_data:
             game = self.games_data[group_id]
@@ -102,7 +207,8 @@ class GameConsumer(AsyncWebsocketConsumer):
                 await self.create_match_record(p1, p2, winner, score_left, score_right)
                 
                 await self.handle_game_end(winner)
-                await self.channel_layer.group_send(
+                await self.fanout.group_send(
+                    self.channel_layer,
                     group_id,
                     {
                         'type': 'game_update',
@@ -121,39 +227,235 @@ class GameConsumer(AsyncWebsocketConsumer):
                                     "score": score_right
                                 }
                             },
-                            "reason": "disconnect"
+                            "reason": "disconnect",
+                            "replay": self.recorder.replay_id(group_id)
                         }
                     }
                 )
                 game.is_running = False
+                self.recorder.finish(group_id)
 
 
-    async def remove_player_from_game(self, group_id: str) -> None:
+    async def remove_player_from_game(self, group_id: str, username: Optional[str] = None) -> None:
+        username = username or self.username
         if group_id in self.games_data:
             game = self.games_data[group_id]
-            if self.username in game.connected_players:
-                game.connected_players.pop(self.username, None)
+            if username in game.connected_players:
+                game.connected_players.pop(username, None)
             if not game.connected_players:
                 del self.games_data[group_id]
+                await self.registry.release(group_id)
+
+    async def suspend_player(self, group_id: str, username: str) -> bool:
+        """
+        Pause a running match whose player dropped and keep their slot for
+        RECONNECT_CONFIG['GRACE_PERIOD'] seconds. False if the match is not
+        in progress, in which case the caller ends it as before.
+        """
+        game = self.games_data.get(group_id)
+        grace = RECONNECT_CONFIG['GRACE_PERIOD']
+        if not game or not grace or not (game.is_running or game.disconnected):
+            return False
+
+        game.is_running = False
+        game.disconnected[username] = time.time()
+        self.timers.schedule((group_id, username), grace, lambda: self.grace_expired(group_id, username))
+        await self.fanout.group_send(
+            self.channel_layer,
+            group_id,
+            {
+                'type': 'game_update',
+                'data': {
+                    "type": "paused",
+                    "player": username,
+                    "grace_period": grace
+                }
+            }
+        )
+        return True
+
+    async def rejoin_player(self, group_id: str, username: str, channel: str) -> None:
+        """Bind a reconnected player to their paused match"""
+        game = self.games_data[group_id]
+        self.timers.cancel((group_id, username))
+        game.disconnected.pop(username, None)
+        game.connected_players[username] = channel
+        self.connected_players[username] = channel
+        self.player_groups[username] = group_id
+        await self.fanout.group_add(self.channel_layer, group_id, channel)
+
+        if not game.disconnected:
+            asyncio.create_task(self.resume_game(group_id))
+
+    async def grace_expired(self, group_id: str, username: str) -> None:
+        """The player did not come back in time: the match is forfeited"""
+        game = self.games_data.get(group_id)
+        if not game or username not in game.disconnected:
+            return
+
+        await self.forfeit(group_id, username)
+        for player in list(game.disconnected):
+            self.timers.cancel((group_id, player))
+            await self.remove_player_from_game(group_id, player)
+            self.player_groups.pop(player, None)
+        game.disconnected.clear()
+
+    async def rejoin_match(self, username: str) -> bool:
+        """Reconnect to a paused match hosted by this worker"""
+        group_id = self.player_groups.get(username)
+        game = self.games_data.get(group_id)
+        if not game or username not in game.disconnected:
+            return False
+        await self.rejoin_player(group_id, username, self.channel_name)
+        if game.disconnected:
+            await self.send_waiting_message()
+        return True
+
+    async def host_match(self, group_id: str, player1: str, player2: str) -> bool:
+        """Create the match on this worker, unless another worker already owns it"""
+        if not await self.registry.claim(group_id, self):
+            return False
+        self.games_data[group_id] = self.game_manager.create_initial_state(player1, player2)
+        self.snapshots.start()
+        return True
+
+    async def resume_match(self, username: str) -> bool:
+        """Rejoin a match whose host worker died, from its last snapshot"""
+        snapshot = await self.snapshots.load_for_player(username)
+        if not snapshot:
+            return False
+
+        group_id = snapshot['group']
+        game = self.games_data.get(group_id)
+        if not game:
+            owner = await self.registry.owner(group_id)
+            if owner and time.time() - snapshot['taken_at'] < SNAPSHOT_CONFIG['STALE_AFTER']:
+                # Still hosted by a live worker, which keeps the snapshot fresh
+                self.player_groups[username] = group_id
+                await self.join_remote_match(group_id)
+                return True
+            await self.registry.take_over(group_id, self)
+            game = self.games_data[group_id] = restore_game(snapshot)
+            self.snapshots.resumed += 1
+            self.snapshots.start()
+        elif username in game.disconnected:
+            self.player_groups[username] = group_id
+            return await self.rejoin_match(username)
+        elif not game.restored:
+            return False
+
+        self.player_groups[username] = group_id
+        self.connected_players[username] = self.channel_name
+        await self.fanout.group_add(self.channel_layer, group_id, self.channel_name)
+        if not await self.start_when_ready(group_id):
+            await self.send_waiting_message()
+        return True
+
+    async def start_when_ready(self, group_id: str) -> bool:
+        """Start or resume the match once both players are connected"""
+        game = self.games_data[group_id]
+        if not all(player in self.connected_players for player in game.player_labels):
+            return False
+
+        if game.restored:
+            asyncio.create_task(self.resume_game(group_id))
+        elif game.tournament_data:
+            asyncio.create_task(self.start_game(group_id))
+        else:
+            p1 = next(key for key, value in game.player_labels.items() if value == 'player1')
+            p2 = next(key for key, value in game.player_labels.items() if value == 'player2')
+            await self.send_game_start(group_id, p1, p2)
+            asyncio.create_task(self.delayed_game_start(group_id))
+        return True
+
+    async def resume_game(self, group_id: str) -> None:
+        game = self.games_data[group_id]
+        p1 = next(key for key, value in game.player_labels.items() if value == 'player1')
+        p2 = next(key for key, value in game.player_labels.items() if value == 'player2')
+        await self.send_game_start(group_id, p1, p2)
+        await self.broadcast_game_state(group_id, game)
+
+        await asyncio.sleep(SNAPSHOT_CONFIG['RESUME_DELAY'])
+        if game.disconnected or self.games_data.get(group_id) is not game:
+            return
+        game.restored = False
+        game.is_running = True
+        self.scheduler.add_match(group_id, self)
+
+    async def join_remote_match(self, group_id: str) -> None:
+        await self.registry.send_to_owner(group_id, {
+            'type': 'match.join',
+            'username': self.username,
+            'channel': self.channel_name
+        })
+        await self.send_waiting_message()
+
+    async def match_join(self, event):
+        """A player of a match hosted here connected to another worker"""
+        group_id, username = event['group'], event['username']
+        game = self.games_data.get(group_id)
+        if not game or username not in game.player_labels:
+            return
+        if username in game.disconnected:
+            await self.rejoin_player(group_id, username, event['channel'])
+            return
+
+        self.connected_players[username] = event['channel']
+        self.player_groups[username] = group_id
+        await self.fanout.group_add(self.channel_layer, group_id, event['channel'])
+        await self.start_when_ready(group_id)
+
+    async def match_spectate(self, event):
+        """A spectator of a match hosted here connected to another worker"""
+        group_id = event['group']
+        game = self.games_data.get(group_id)
+        # The spectate message goes out before the first frame can
+        await self.channel_layer.send(event['channel'], {
+            'type': 'match.spectated',
+            'message': spectate_message(group_id, game) if game else None
+        })
+        if game:
+            await self.fanout.group_add(self.channel_layer, group_id, event['channel'])
+
+    async def match_unspectate(self, event):
+        await self.fanout.group_discard(self.channel_layer, event['group'], event['channel'])
+
+    async def match_input(self, event):
+        game = self.games_data.get(event['group'])
+        if game and event['username'] in game.paddle_directions:
+            self.game_manager.queue_input(game, event['username'], Direction(event['direction']), event['seq'])
+
+    async def match_leave(self, event):
+        group_id, username = event['group'], event['username']
+        self.connected_players.pop(username, None)
+        if group_id in self.games_data:
+            await self.fanout.group_discard(self.channel_layer, group_id, event['channel'])
+            if await self.suspend_player(group_id, username):
+                return
+            await self.forfeit(group_id, username)
+            await self.remove_player_from_game(group_id, username)
+        self.player_groups.pop(username, None)
 
     async def receive(self, text_data=None):
         try:
             data = json.loads(text_data)
             
             if data.get('username'):
+                await self.negotiate_protocol(data.get('protocol'), data.get('snapshot_rate'))
                 if data.get('invite_game'):
                     await self.handle_invite_game(data['username'], data['opponent'])
                 else:
                     await self.handle_new_player(data['username'], data.get('tournament_data'))
             elif data.get('action') in ['move', 'stop_move']:
-                group_id = self.player_groups.get(self.username)
-                if group_id and group_id in self.games_data:
-                    game = self.games_data[group_id]
-                    if self.username in game.paddle_directions:
-                        if data['action'] == 'move':
-                            await self.move_paddle(data['direction'])
-                        else:
-                            await self.stop_paddle()
+                if self.player_groups.get(self.username):
+                    if data['action'] == 'move':
+                        await self.move_paddle(data['direction'], input_seq(data.get('seq', 0)))
+                    else:
+                        await self.stop_paddle(input_seq(data.get('seq', 0)))
+            elif data.get('action') == 'ack':
+                if self.frame_encoder:
+                    self.frame_encoder.ack(int(data['seq']))
+                    self.throttle.on_ack()
 
         except Exception as e:
             await self.send(text_data=json.dumps({
@@ -161,19 +463,35 @@ class GameConsumer(AsyncWebsocketConsumer):
                 'message': 'Internal server error'
             }))
     
+    async def negotiate_protocol(self, protocol: Optional[str], snapshot_rate=None) -> None:
+        if snapshot_rate:
+            self.throttle = FrameThrottle.for_rate(snapshot_rate)
+            await self.send_rate()
+        if protocol == 'binary' and not self.frame_encoder:
+            self.frame_encoder = DeltaEncoder()
+            await self.send(text_data=json.dumps({
+                'type': 'protocol',
+                'protocol': 'binary'
+            }))
+
     async def handle_invite_game(self, username: str, opponent: str):
         self.username = username
+        if await self.rejoin_match(username) or await self.resume_match(username):
+            return
         group_id = f"{opponent}_{username}" if opponent < username else f"{username}_{opponent}"
         
         self.player_groups[username] = group_id
         self.connected_players[username] = self.channel_name
-        await self.channel_layer.group_add(group_id, self.channel_name)
+        await self.fanout.group_add(self.channel_layer, group_id, self.channel_name)
 
         if group_id not in self.games_data:
-            self.games_data[group_id] = self.game_manager.create_initial_state(
+            if not await self.host_match(
+                group_id,
                 username if username < opponent else opponent,
                 opponent if username < opponent else username
-            )
+            ):
+                await self.join_remote_match(group_id)
+                return
         
         game = self.games_data[group_id]
         game.player_labels = {
@@ -182,7 +500,8 @@ class GameConsumer(AsyncWebsocketConsumer):
         }
 
         if len([p for p in self.connected_players if p in [username, opponent]]) == 2:
-            await self.channel_layer.group_send(
+            await self.fanout.group_send(
+                self.channel_layer,
                 group_id,
                 {
                     'type': 'game_update',
@@ -237,14 +556,12 @@ class GameConsumer(AsyncWebsocketConsumer):
                for player in [invite['sender'], invite['recipient']]:
                    self.connected_players[player] = self.channel_name
                    self.player_groups[player] = group_id
-                   await self.channel_layer.group_add(group_id, self.channel_name)
+                   await self.fanout.group_add(self.channel_layer, group_id, self.channel_name)
 
-               self.games_data[group_id] = self.game_manager.create_initial_state(
-                   invite['sender'], 
-                   invite['recipient']
-               )
+               await self.host_match(group_id, invite['sender'], invite['recipient'])
                
-               await self.channel_layer.group_send(
+               await self.fanout.group_send(
+                   self.channel_layer,
                    group_id,
                    {
                        'type': 'game_update',
@@ -298,30 +615,43 @@ class GameConsumer(AsyncWebsocketConsumer):
                'sender': event['sender']
            }))
 
-    @database_sync_to_async
-    def get_player_avatar(self, username: str) -> str:
-        try:
-            player = Player.objects.get(username=username)
-            return player.get_avatar_url()
-        except Player.DoesNotExist:
-            pass
+    async def get_player_points(self, username: str) -> int:
+        return (await self.players.get(username)).get('t_points', 0)
 
-    async def setup_matchmaking_game(self, players):
-        player1, player2 = players
-        group_id = f"{player1}_{player2}"
-        
-        for player in (player1, player2):
-            self.player_groups[player] = group_id
-            await self.channel_layer.group_add(group_id, self.connected_players[player])
-            self.waiting_players.pop(player, None)
+    async def get_player_avatar(self, username: str) -> str:
+        return (await self.players.get(username)).get('avatar')
+
+    async def matchmaking_paired(self, event):
+        """The matchmaking queue paired this player; the host player's consumer sets the match up"""
+        group_id = event['group']
+        player1, player2 = event['players']
+        self.player_groups[self.username] = group_id
+        asyncio.create_task(self.confirm_pairing(group_id))
+        if self.username != event['host']:
+            return
 
-        if self.username == player2:
-            self.games_data[group_id] = self.game_manager.create_initial_state(player1, player2)
+        if await self.host_match(group_id, player1, player2):
+            for player, channel in event['channels'].items():
+                self.connected_players[player] = channel
+                self.player_groups[player] = group_id
+                await self.fanout.group_add(self.channel_layer, group_id, channel)
             await self.send_game_start(group_id, player1, player2)
             asyncio.create_task(self.delayed_game_start(group_id))
 
+    async def confirm_pairing(self, group_id: str) -> None:
+        """Put this player back into the queue if the paired match was never hosted"""
+        await asyncio.sleep(MATCHMAKING_CONFIG['PAIRED_TIMEOUT'])
+        if self.player_groups.get(self.username) != group_id or self.connected_players.get(self.username) != self.channel_name:
+            return
+        if group_id in self.games_data or await self.registry.owner(group_id):
+            return
+        self.player_groups.pop(self.username, None)
+        await self.matchmaking.join(self.username, self.channel_name, await self.get_player_points(self.username))
+        await self.send_waiting_message()
+
     async def send_game_start(self, group_id, player1, player2):
-        await self.channel_layer.group_send(
+        await self.fanout.group_send(
+            self.channel_layer,
             group_id,
             {
                 'type': 'game_update',
@@ -352,7 +682,9 @@ class GameConsumer(AsyncWebsocketConsumer):
         try:
             self.username = username
             
-            if username in self.player_groups:
+            if await self.rejoin_match(username):
+                return
+            if username in self.player_groups or await self.resume_match(username):
                 return
 
             if tournament_data:
@@ -365,13 +697,12 @@ class GameConsumer(AsyncWebsocketConsumer):
                 self.connected_players[username] = self.channel_name
                 
                 if group_id not in self.games_data:
-                    self.games_data[group_id] = self.game_manager.create_initial_state(
-                        tournament_data['player1'],
-                        tournament_data['player2']
-                    )
+                    if not await self.host_match(group_id, tournament_data['player1'], tournament_data['player2']):
+                        await self.join_remote_match(group_id)
+                        return
                     self.games_data[group_id].tournament_data = tournament_data
                 
-                await self.channel_layer.group_add(group_id, self.channel_name)
+                await self.fanout.group_add(self.channel_layer, group_id, self.channel_name)
                 
                 connected_players = [p for p in self.connected_players 
                                 if p in [tournament_data['player1'], tournament_data['player2']]]
@@ -380,61 +711,8 @@ class GameConsumer(AsyncWebsocketConsumer):
                     await self.start_game(group_id)
             else:
                 self.connected_players[username] = self.channel_name
-                self.waiting_players[username] = self.channel_name
-                
-                if len(self.waiting_players) >= 2:
-                    available_players = list(self.waiting_players.keys())
-                    
-                    if len(available_players) >= 2:
-                        player1, player2 = available_players[-2:]
-                        group_id = f"{player1}_{player2}"
-
-                        player1_avatar = await self.get_player_avatar(player1)
-                        player2_avatar = await self.get_player_avatar(player2)
-                        
-                        for player in (player1, player2):
-                            self.player_groups[player] = group_id
-                            await self.channel_layer.group_add(
-                                group_id,
-                                self.connected_players[player]
-                            )
-                            self.waiting_players.pop(player, None)
-
-                        if username == player2:
-                            self.games_data[group_id] = self.game_manager.create_initial_state(player1, player2)
-                            
-                            await self.channel_layer.group_send(
-                                group_id,
-                                {
-                                    'type': 'game_update',
-                                    'data': {
-                                        "type": "game_start",
-                                        "players": {
-                                            "player1": {
-                                                "usr": player1,
-                                                "avatar": player1_avatar
-                                            },
-                                            "player2": {
-                                                "usr": player2,
-                                                "avatar": player2_avatar
-                                            }
-                                        },
-                                        "tournament": False
-                                    }
-                                }
-                            )
-                            
-                            asyncio.create_task(self.delayed_game_start(group_id))
-                    else:
-                        await self.send(text_data=json.dumps({
-                            'type': 'waiting',
-                            'message': 'Waiting for second player...'
-                        }))
-                else:
-                    await self.send(text_data=json.dumps({
-                        'type': 'waiting',
-                        'message': 'Waiting for second player...'
-                    }))
+                await self.matchmaking.join(username, self.channel_name, await self.get_player_points(username))
+                await self.send_waiting_message()
 
         except Exception as e:
             await self.send(text_data=json.dumps({
@@ -448,18 +726,20 @@ class GameConsumer(AsyncWebsocketConsumer):
         game = self.games_data[group_id]
         game.ball_direction = self.game_manager.start_ball_direction()
         game.is_running = True
-        asyncio.create_task(self.run_game_loop(group_id))
+        self.scheduler.add_match(group_id, self)
 
     async def create_game(self) -> None:
         player_list = list(self.connected_players.keys())
         player1, player2 = player_list[-2:]
         group_id = f"{player1}_{player2}"
 
-        self.games_data[group_id] = self.game_manager.create_initial_state(player1, player2)
+        if not await self.host_match(group_id, player1, player2):
+            return
 
         for player in (player1, player2):
             self.player_groups[player] = group_id
-            await self.channel_layer.group_add(
+            await self.fanout.group_add(
+                self.channel_layer,
                 group_id,
                 self.connected_players[player]
             )
@@ -470,7 +750,8 @@ class GameConsumer(AsyncWebsocketConsumer):
         """Start a new game"""
         game = self.games_data[group_id]
         
-        await self.channel_layer.group_send(
+        await self.fanout.group_send(
+            self.channel_layer,
             group_id,
             {
                 'type': 'game_update',
@@ -494,23 +775,26 @@ class GameConsumer(AsyncWebsocketConsumer):
         await asyncio.sleep(5)
         game.ball_direction = self.game_manager.start_ball_direction()
         game.is_running = True
-        asyncio.create_task(self.run_game_loop(group_id))
+        self.scheduler.add_match(group_id, self)
 
     async def create_tournament_game(self, player1: str, player2: str, tournament_data: dict) -> None:
         group_id = f"{player1}_{player2}"
         
-        self.games_data[group_id] = self.game_manager.create_initial_state(player1, player2)
+        if not await self.host_match(group_id, player1, player2):
+            return
         self.games_data[group_id].tournament_data = tournament_data
 
         for player in (player1, player2):
-            await self.channel_layer.group_add(
+            await self.fanout.group_add(
+                self.channel_layer,
                 group_id,
                 self.connected_players[player]
             )
 
         await asyncio.sleep(3)
         
-        await self.channel_layer.group_send(
+        await self.fanout.group_send(
+            self.channel_layer,
             group_id,
             {
                 'type': 'game_start',
@@ -531,110 +815,46 @@ class GameConsumer(AsyncWebsocketConsumer):
             }
         )
         
-        asyncio.create_task(self.run_game_loop(group_id))
-
-    async def run_game_loop(self, group_id: str) -> None:
-        C = GAME_CONSTANTS
-        game = self.games_data[group_id]
-        last_update = time.time()
-
-        while group_id in self.games_data and game.is_running:
-            current_time = time.time()
-            delta_time = current_time - last_update
-            
-            if delta_time < C['FRAME_TIME']:
-                await asyncio.sleep(C['FRAME_TIME'] - delta_time)
-                continue
-
-            try:
-                self.update_paddle_positions(game)
-
-                new_x = game.ball_position.x + (game.ball_direction.x * delta_time)
-                new_y = game.ball_position.y + (game.ball_direction.y * delta_time)
-                new_position = Vector3(new_x, new_y, 0)
-
-                if abs(new_position.y) >= C['COURT_HEIGHT']:
-                    game.ball_direction.y *= -1
-                    new_position.y = math.copysign(C['COURT_HEIGHT'], new_position.y)
-
-                for player_id, paddle_box in game.paddle_boxes.items():
-                    if (paddle_box["min"].x <= new_position.x <= paddle_box["max"].x and
-                        paddle_box["min"].y <= new_position.y <= paddle_box["max"].y):
-                        game.ball_direction.x *= -1
-                        new_position.x = (paddle_box["max"].x + C['BALL_RADIUS']
-                                        if game.ball_direction.x > 0
-                                        else paddle_box["min"].x - C['BALL_RADIUS'])
-                        break
-
-                if abs(new_position.x) >= C['COURT_WIDTH']:
-                    if new_position.x > 0:
-                        game.score_left += 1
-                    else:
-                        game.score_right += 1
-                    game.ball_position = Vector3(0, 0, 0)
-                    game.ball_direction = self.game_manager.start_ball_direction()
-                    if await self.check_win_condition(game, group_id):
-                        break
-                else:
-                    game.ball_position = new_position
-
-                await self.broadcast_game_state(group_id, game)
-                last_update = current_time
+        self.scheduler.add_match(group_id, self)
 
-            except Exception as e:
-                continue
+    async def move_paddle(self, direction: str, seq: int = 0) -> None:
+        await self.queue_input(Direction.from_string(direction), seq)
 
-    async def game_start(self, event):
-        await self.send(text_data=json.dumps(event['data']))
-
-    async def game_update(self, event):
-        await self.send(text_data=json.dumps(event['data']))
-
-    async def game_end(self, event):
-        await self.send(text_data=json.dumps(event['data']))
+    async def stop_paddle(self, seq: int = 0) -> None:
+        await self.queue_input(Direction.NONE, seq)
 
-    async def move_paddle(self, direction: str) -> None:
+    async def queue_input(self, direction: Direction, seq: int) -> None:
+        """Queue input on the local match, or forward it to the worker hosting it"""
         group_id = self.player_groups.get(self.username)
-        if group_id and self.username in self.games_data[group_id].paddle_directions:
-            game = self.games_data[group_id]
-            game.paddle_directions[self.username] = Direction.from_string(direction)
-            self.update_paddle_positions(game)
-
-    async def stop_paddle(self) -> None:
-        group_id = self.player_groups.get(self.username)
-        if group_id and self.username in self.games_data[group_id].paddle_directions:
-            self.games_data[group_id].paddle_directions[self.username] = Direction.NONE
-            asyncio.create_task(self.broadcast_game_state(group_id, self.games_data[group_id]))
+        if not group_id:
+            return
+        game = self.games_data.get(group_id)
+        if game:
+            if self.username in game.paddle_directions:
+                self.game_manager.queue_input(game, self.username, direction, seq)
+        else:
+            await self.registry.send_to_owner(group_id, {
+                'type': 'match.input',
+                'username': self.username,
+                'direction': direction.value,
+                'seq': seq
+            })
 
     async def broadcast_game_state(self, group_id: str, game: GameState) -> None:
         try:
-            await self.channel_layer.group_send(
+            game.frame_seq += 1
+            frame = pack_state(game, game.frame_seq)
+            self.recorder.record(group_id, frame)
+            await self.fanout.group_send(
+                self.channel_layer,
                 group_id,
                 {
-                    'type': 'game_update',
-                    'data': {
-                        "type": "update",
-                        "paddlePositions": [
-                            {
-                                "playerId": game.player_labels[player_id],
-                                "position": asdict(game.paddle_positions[player_id]),
-                                "direction": game.paddle_directions[player_id].value
-                            }
-                            for player_id in game.connected_players
-                        ],
-                        "ballPosition": asdict(game.ball_position),
-                        "ballDirection": asdict(game.ball_direction),
-                        "scoreL": game.score_left,
-                        "scoreR": game.score_right,
-                        "paddleBoxes": {
-                            k: {"min": asdict(v["min"]), "max": asdict(v["max"])}
-                            for k, v in game.paddle_boxes.items()
-                        }
-                    }
+                    'type': 'game_frame',
+                    'frame': frame
                 }
             )
-        except Exception as e:
-            pass
+        except Exception:
+            logger.exception("Failed to broadcast the state of %s", group_id)
 
     async def check_win_condition(self, game: GameState, group_id: str) -> bool:
         winner = None
@@ -645,6 +865,10 @@ class GameConsumer(AsyncWebsocketConsumer):
 
         if winner:
             game.is_running = False
+            game.frame_seq += 1
+            self.recorder.record(group_id, pack_state(game, game.frame_seq))
+            replay_id = self.recorder.finish(group_id)
+            self.snapshots.discard(group_id, game)
             
             p1 = next(key for key, value in game.player_labels.items() if value == 'player1')
             p2 = next(key for key, value in game.player_labels.items() if value == 'player2')
@@ -670,7 +894,8 @@ class GameConsumer(AsyncWebsocketConsumer):
                 except Exception as e:
                     pass
 
-            await self.channel_layer.group_send(
+            await self.fanout.group_send(
+                self.channel_layer,
                 group_id,
                 {
                     'type': 'game_update',
@@ -689,57 +914,17 @@ class GameConsumer(AsyncWebsocketConsumer):
                                 "score": game.score_right
                             }
                         },
-                        "reason": "score"
+                        "reason": "score",
+                        "replay": replay_id
                     }
                 }
             )
             return True
         return False
     
-    @database_sync_to_async
-    def create_match_record(self, player1_username: str, player2_username: str, winner: str, score_player1: int, score_player2: int):
-        try:
-            player1 = Player.objects.get(username=player1_username)
-            player2 = Player.objects.get(username=player2_username)
-
-            winning_player = player1 if winner == player1.username else player2
-            losing_player = player2 if winner == player1.username else player1
-
-            Match.objects.create(
-                player1=player1,
-                player2=player2,
-                winner=winning_player,
-                loser=losing_player,
-                score_player1=score_player1,
-                score_player2=score_player2
-            )
-
-            if winner == player1.username:
-                player1.wins += 1
-                player2.losses += 1
-            else:
-                player1.losses += 1
-                player2.wins += 1
-
-            player1.t_games += 1
-            player1.goals_f += score_player1
-            player1.goals_a += score_player2
-
-            player2.t_games += 1
-            player2.goals_f += score_player2
-            player2.goals_a += score_player1
-
-            player1.t_points += 3 if winner == player1.username else -1
-            player2.t_points += 3 if winner == player2.username else -1
-
-            player1.save()
-            player2.save()
-
-
-        except Player.DoesNotExist as e:
-            pass
-        except Exception as e:
-            pass
+    async def create_match_record(self, player1_username: str, player2_username: str, winner: str, score_player1: int, score_player2: int):
+        """Queue the result; result_writer saves it and updates both players' stats"""
+        self.results.submit(player1_username, player2_username, winner, score_player1, score_player2)
 
     async def handle_game_end(self, winner: str) -> None:
         group_id = self.player_groups.get(self.username)
@@ -766,39 +951,103 @@ class GameConsumer(AsyncWebsocketConsumer):
                 except Exception as e:
                     pass
 
-    def update_paddle_positions(self, game: GameState) -> None:
-        C = GAME_CONSTANTS
-        max_y = C['COURT_HEIGHT'] - C['PADDLE_HEIGHT']
-        current_time = time.time()
-        delta_time = current_time - game.last_update
-        
-        for player_id, direction in game.paddle_directions.items():
-            if direction != Direction.NONE:
-                current_pos = game.paddle_positions[player_id]
-                new_y = max(min(
-                    current_pos.y + (direction.value * C['PADDLE_SPEED'] * delta_time),
-                    max_y
-                ), -max_y)
-                
-                new_pos = Vector3(current_pos.x, new_y, current_pos.z)
-                if self.validate_paddle_movement(current_pos, new_pos, delta_time):
-                    game.paddle_positions[player_id] = new_pos
-                    game.paddle_boxes[player_id]["min"].y = new_y - C['PADDLE_HEIGHT']
-                    game.paddle_boxes[player_id]["max"].y = new_y + C['PADDLE_HEIGHT']
+def spectate_message(group_id: str, game: GameState) -> dict:
+    return {
+        'type': 'spectate',
+        'match': group_id,
+        'players': {label: player for player, label in game.player_labels.items()},
+        'scoreL': game.score_left,
+        'scoreR': game.score_right
+    }
+
+class SpectatorConsumer(FrameStreamConsumer):
+    """
+    Watches a running match. Spectators join the match group but never
+    receive per-connection deltas: binary spectators get the shared keyframe
+    and JSON spectators the shared document, both encoded once per tick.
+    A match hosted by another worker is joined through its host, like
+    remote players do.
+    """
+
+    registry = match_registry
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.group_id: Optional[str] = None
+        self.binary = False
+        self.remote = False
 
-        game.last_update = current_time
+    async def connect(self):
+        self.group_id = self.scope['url_route']['kwargs']['group_id']
+        game = self.games_data.get(self.group_id)
+        if game:
+            self.fanout.register(self)
+            await self.fanout.group_add(self.channel_layer, self.group_id, self.channel_name)
+            await self.accept()
+            await self.send(text_data=json.dumps(spectate_message(self.group_id, game)))
+            return
 
-    def validate_paddle_movement(self, old_pos: Vector3, new_pos: Vector3, delta_time: float) -> bool:
-        C = GAME_CONSTANTS
-        max_movement = C['PADDLE_SPEED'] * delta_time * 1.1
-        movement = math.sqrt((new_pos.y - old_pos.y) ** 2)
-        return movement <= max_movement
+        # Hosted by another worker, which adds this channel to the match
+        # group there and answers with match_spectated
+        await self.registry.start(self.channel_layer)
+        if not await self.registry.owner(self.group_id):
+            await self.close()
+            return
+        await self.accept()
+        self.remote = True
+        await self.registry.send_to_owner(self.group_id, {
+            'type': 'match.spectate',
+            'channel': self.channel_name
+        })
+
+    async def match_spectated(self, event):
+        if not event['message']:
+            await self.close()
+            return
+        await self.send(text_data=json.dumps(event['message']))
+
+    async def disconnect(self, close_code):
+        self.fanout.unregister(self)
+        if self.group_id:
+            await self.fanout.group_discard(self.channel_layer, self.group_id, self.channel_name)
+        if self.remote:
+            await self.registry.send_to_owner(self.group_id, {
+                'type': 'match.unspectate',
+                'channel': self.channel_name
+            })
+
+    async def receive(self, text_data=None):
+        try:
+            data = json.loads(text_data)
+            if data.get('snapshot_rate'):
+                self.throttle = FrameThrottle.for_rate(data['snapshot_rate'])
+                await self.send_rate()
+            if data.get('protocol') == 'binary' and not self.binary:
+                self.binary = True
+                await self.send(text_data=json.dumps({
+                    'type': 'protocol',
+                    'protocol': 'binary'
+                }))
+        except Exception as e:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': 'Internal server error'
+            }))
+
+    async def send_frame(self, frame: SharedFrame) -> None:
+        if self.binary:
+            await self.send(bytes_data=frame.keyframe)
+        else:
+            await self.send(text_data=frame.text)
 
 class TournamentConsumer(AsyncWebsocketConsumer):
     tournament_manager = TournamentManager()
+    players = player_cache
+    feed = tournament_feed
+    scheduler = tournament_scheduler
+    registry = match_registry
     connected_players: Set[str] = set()
     player_channels: Dict[str, str] = {}
-    TOURNAMENT_GROUP = 'tournament_group'
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -809,14 +1058,21 @@ class TournamentConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         await self.accept()
         await self.channel_layer.group_add(
-            self.TOURNAMENT_GROUP,
+            LOBBY_GROUP,
             self.channel_name
         )
 
     async def disconnect(self, close_code):
+        await self.channel_layer.group_discard(LOBBY_GROUP, self.channel_name)
+        if self.tournament_id:
+            await self.channel_layer.group_discard(tournament_group(self.tournament_id), self.channel_name)
+
         if self.username:
+            await self.channel_layer.group_discard(player_group(self.username), self.channel_name)
+            changes = {'connected_remove': [self.username]}
             if self.username in self.tournament_manager.waiting_players:
                 self.tournament_manager.waiting_players.remove(self.username)
+                changes['waiting_remove'] = [self.username]
             
             self.connected_players.discard(self.username)
             
@@ -824,9 +1080,14 @@ class TournamentConsumer(AsyncWebsocketConsumer):
             if tournament and tournament.state == TournamentState.WAITING:
                 tournament.players.remove(self.username)
                 if not tournament.players:
-                    del self.tournament_manager.tournaments[tournament.id]
+                    self.tournament_manager.remove_tournament(tournament.id)
+                    self.scheduler.finish(tournament.id, expired=True)
+                    self.feed.remove_tournament(tournament.id)
+                    changes['tournament_states'] = {tournament.id: None}
+                else:
+                    await self.publish_tournament(tournament, 'player_left')
             
-            await self.broadcast_player_lists()
+            await self.publish('player_left', **changes)
 
     async def receive(self, text_data=None):
         try:
@@ -841,6 +1102,8 @@ class TournamentConsumer(AsyncWebsocketConsumer):
             
             if data.get('type') == 'join_tournament':
                 await self.handle_join_tournament(data['username'])
+            elif data.get('type') == 'sync':
+                await self.send_snapshot(data.get('tournament_id'))
             elif data.get('type') == 'game_complete':
                 await self.handle_game_complete(
                     data['tournament_id'],
@@ -859,85 +1122,110 @@ class TournamentConsumer(AsyncWebsocketConsumer):
                 'message': 'Internal server error'
             }))
 
+    async def send_snapshot(self, tournament_id: Optional[str] = None):
+        """Send the lobby, or this player's tournament when asked for it"""
+        snapshot = None
+        if tournament_id and tournament_id == self.tournament_id:
+            snapshot = self.feed.tournament_snapshot(tournament_id)
+        await self.send(text_data=json.dumps(snapshot or self.feed.snapshot()))
+
     async def handle_join_tournament(self, username: str):
         self.username = username
         self.connected_players.add(username)
+        await self.channel_layer.group_add(player_group(username), self.channel_name)
+        details = [await self.get_player_details(username)]
+        changes = {'connected_add': details}
         
-        if username not in self.tournament_manager.waiting_players and not self.tournament_manager.get_player_tournament(username):
+        current = self.tournament_manager.get_player_tournament(username)
+        if username not in self.tournament_manager.waiting_players and not current:
             self.tournament_manager.waiting_players.append(username)
+            changes['waiting_add'] = details
             
-        await self.broadcast_player_lists()
+        await self.publish('player_joined', **changes)
+        await self.send_snapshot()
+        if current:
+            await self.subscribe(current.id)
         
         if len(self.tournament_manager.waiting_players) >= TOURNAMENT_CONFIG['PLAYERS_PER_TOURNAMENT']:
             tournament_players = self.tournament_manager.waiting_players[:TOURNAMENT_CONFIG['PLAYERS_PER_TOURNAMENT']]
-            tournament = self.tournament_manager.create_tournament(tournament_players)
+            summaries = await self.players.get_many(tournament_players)
+            seeded = sorted(tournament_players, key=lambda player: -summaries.get(player, {}).get('t_points', 0))
+            tournament = self.tournament_manager.create_tournament(seeded)
             
             self.tournament_manager.waiting_players = [p for p in self.tournament_manager.waiting_players 
                                                     if p not in tournament_players]
+            self.scheduler.track(tournament.id, lambda: self.tournament_expired(tournament.id))
             
-            await self.broadcast_player_lists()
+            await self.publish(
+                'tournament_created',
+                waiting_remove=tournament_players,
+                tournament_states={tournament.id: tournament.state.value}
+            )
+            await self.publish_tournament(tournament, 'tournament_created')
             
+            # Every connection of a seated player joins the tournament's group
             for player in tournament_players:
-                if player in self.connected_players:
-                    self.tournament_id = tournament.id
+                await self.channel_layer.group_send(
+                    player_group(player),
+                    {
+                        "type": "tournament_subscribe",
+                        "tournament_id": tournament.id
+                    }
+                )
             
-            await self.start_tournament_matches(tournament)
+            await self.start_tournament_matches(tournament, list(tournament.matches.values()))
 
-    @database_sync_to_async
-    def get_player_details(self, username: str) -> dict:
-        try:
-            player = Player.objects.get(username=username)
-            return {
+    async def subscribe(self, tournament_id: str):
+        self.tournament_id = tournament_id
+        await self.channel_layer.group_add(tournament_group(tournament_id), self.channel_name)
+        await self.send_snapshot(tournament_id)
+
+    async def tournament_subscribe(self, event):
+        await self.subscribe(event["tournament_id"])
+
+    async def tournament_unsubscribe(self, event):
+        if self.tournament_id == event["tournament_id"]:
+            await self.channel_layer.group_discard(tournament_group(self.tournament_id), self.channel_name)
+            self.tournament_id = None
+
+    async def get_players_details(self, usernames: Iterable[str]) -> Dict[str, dict]:
+        summaries = await self.players.get_many(usernames)
+        return {
+            username: {
                 "username": username,
-                "display_name": player.tournament_username,
-                "avatar": player.get_avatar_url()
+                "display_name": summary['tournament_username'],
+                "avatar": summary['avatar']
             }
-        except Player.DoesNotExist:
-            return {}
+            for username, summary in summaries.items()
+        }
 
-    async def broadcast_player_lists(self):
+    async def get_player_details(self, username: str) -> dict:
+        return (await self.get_players_details([username])).get(username, {})
+
+    async def publish(self, event: str, **changes) -> None:
+        """Send one lobby change to every tournament consumer"""
         try:
-            players_in_tournaments = {}
-            for t_id, tournament in self.tournament_manager.tournaments.items():
-                semifinal_matches = {match_id: match for match_id, match in tournament.matches.items() if 'semi' in match_id}
-                
-                semi1_winner = next((match.winner for match_id, match in semifinal_matches.items() if 'semi1' in match_id), None)
-                semi2_winner = next((match.winner for match_id, match in semifinal_matches.items() if 'semi2' in match_id), None)
-                
-                tournament_players = [await self.get_player_details(player) for player in tournament.players]
-                
-                players_in_tournaments[t_id] = {
-                    'matches': {
-                        match_id: {
-                            'player1': await self.get_player_details(match.player1),
-                            'player2': await self.get_player_details(match.player2),
-                            'winner': await self.get_player_details(match.winner) if match.winner else None,
-                            'completed': match.game_completed,
-                            'match_type': 'semi1' if 'semi1' in match_id else 'semi2' if 'semi2' in match_id else 'finals'
-                        }
-                        for match_id, match in tournament.matches.items()
-                    },
-                    'semifinal_winners': {
-                        'semi1': await self.get_player_details(semi1_winner) if semi1_winner else None,
-                        'semi2': await self.get_player_details(semi2_winner) if semi2_winner else None
-                    },
-                    'state': tournament.state.value,
-                    'players': tournament_players
+            await self.channel_layer.group_send(
+                LOBBY_GROUP,
+                {
+                    "type": "tournament_update",
+                    "message": self.feed.diff(event, **changes)
                 }
+            )
+        except Exception as e:
+            pass
 
+    async def publish_tournament(self, tournament: Tournament, event: str, match_ids: Optional[List[str]] = None) -> None:
+        """Send a change of one tournament to its players: everything, or only match_ids"""
+        details = await self.get_players_details(tournament.players)
+        try:
             await self.channel_layer.group_send(
-                self.TOURNAMENT_GROUP,
+                tournament_group(tournament.id),
                 {
                     "type": "tournament_update",
-                    "message": {
-                        "type": "players_update",
-                        "data": {
-                            "waiting_players": [await self.get_player_details(player) for player in self.tournament_manager.waiting_players],
-                            "all_connected_players": [await self.get_player_details(player) for player in self.connected_players],
-                            "tournaments": players_in_tournaments,
-                            "tournament_states": {t_id: t.state.value for t_id, t in self.tournament_manager.tournaments.items()}
-                        }
-                    }
+                    "message": self.feed.tournament_diff(
+                        tournament.id, event, tournament_entry(tournament, details, match_ids)
+                    )
                 }
             )
         except Exception as e:
@@ -945,71 +1233,49 @@ class TournamentConsumer(AsyncWebsocketConsumer):
 
     async def tournament_update(self, event):
         try:
-            message = event['message']
-            if message['type'] == 'players_update':
-                tournament = self.tournament_manager.get_player_tournament(self.username)
-                
-                filtered_data = {
-                    'waiting_players': message['data']['waiting_players'],
-                    'all_connected_players': message['data']['all_connected_players'],
-                    'tournaments': message['data']['tournaments'] or {},
-                    'tournament_states': message['data']['tournament_states'] or {}
-                }
-                
-                if tournament:
-                    tournament_id = tournament.id
-                    if tournament_id in message['data']['tournaments']:
-                        filtered_data['tournaments'][tournament_id] = message['data']['tournaments'][tournament_id]
-                        filtered_data['tournament_states'][tournament_id] = message['data']['tournament_states'][tournament_id]
-
-                message['data'] = filtered_data
-                    
-            await self.send(text_data=json.dumps(message))
+            await self.send(text_data=json.dumps(event['message']))
         except Exception as e:
             pass
 
-    async def start_tournament_matches(self, tournament: Tournament):
-        """Send match notifications to appropriate players"""
-        for match_id in tournament.current_round_matches:
-            match = tournament.matches[match_id]
-            game_group_id = f"{match.player1}_{match.player2}"
-
-            player1_details = await self.get_player_details(match.player1)
-            player2_details = await self.get_player_details(match.player2)
+    async def start_tournament_matches(self, tournament: Tournament, matches: List[TournamentMatch]):
+        """Send match notifications to the two players of each match"""
+        self.scheduler.watch_matches(
+            tournament.id,
+            [match.match_id for match in matches],
+            lambda match_id: self.match_timed_out(tournament.id, match_id)
+        )
+        details = await self.get_players_details(tournament.players)
+        for match in matches:
+            player1_details = details.get(match.player1, {})
+            player2_details = details.get(match.player2, {})
+            match_data = {
+                "type": "match_ready",
+                "player1": match.player1,
+                "player2": match.player2,
+                "display_player1": player1_details.get('display_name', match.player1),
+                "display_player2": player2_details.get('display_name', match.player2),
+                "avatar1": player1_details.get('avatar'),
+                "avatar2": player2_details.get('avatar'),
+                "tournament_id": tournament.id,
+                "match_id": match.match_id,
+                "game_group_id": f"{match.player1}_{match.player2}",
+                "consumer": self.channel_name
+            }
 
-            await self.channel_layer.group_send(
-                self.TOURNAMENT_GROUP,
-                {
-                    "type": "match_notification",
-                    "match_data": {
-                        "type": "match_ready",
-                        "player1": match.player1,
-                        "player2": match.player2,
-                        "player1_details": player1_details,
-                        "player2_details": player2_details,
-                        "avatar1": player1_details.get('avatar'),
-                        "avatar2": player2_details.get('avatar'),
-                        "tournament_id": tournament.id,
-                        "match_id": match_id,
-                        "game_group_id": game_group_id,
-                        "consumer": self.channel_name
+            for player in (match.player1, match.player2):
+                await self.channel_layer.group_send(
+                    player_group(player),
+                    {
+                        "type": "match_notification",
+                        "match_data": match_data
                     }
-                }
-            )
+                )
 
     async def match_notification(self, event):
         """Handle match notifications"""
         match_data = event["match_data"]
-        
-        if self.username in [match_data["player1"], match_data["player2"]]:
-            match_data["opponent"] = (
-                match_data["player2"] 
-                if self.username == match_data["player1"] 
-                else match_data["player1"]
-            )
-            match_data["display_player1"] = match_data.pop("player1_details", {}).get("display_name", match_data["player1"])
-            match_data["display_player2"] = match_data.pop("player2_details", {}).get("display_name", match_data["player2"])
-            await self.send(text_data=json.dumps(match_data))
+        opponent = match_data["player2"] if self.username == match_data["player1"] else match_data["player1"]
+        await self.send(text_data=json.dumps({**match_data, "opponent": opponent}))
 
     async def tournament_match_ready(self, event):
         """Handle match ready messages"""
@@ -1022,124 +1288,95 @@ class TournamentConsumer(AsyncWebsocketConsumer):
         if not tournament:
             return
         
-        success, next_action = self.tournament_manager.handle_match_complete(tournament_id, match_id, winner)
+        previous_state = tournament.state
+        success, opened = self.tournament_manager.handle_match_complete(tournament_id, match_id, winner)
 
         if not success:
             return
-            
-        if next_action == 'finals':
-            finals_match = self.tournament_manager.setup_finals(tournament_id)
-            if finals_match:
-                game_group_id = f"{finals_match.player1}_{finals_match.player2}"
-                player1_details = await self.get_player_details(finals_match.player1)
-                player2_details = await self.get_player_details(finals_match.player2)
-                match_data = {
-                    "type": "match_ready",
-                    "player1": player1_details.get('username'),
-                    "player2": player2_details.get('username'),
-                    "avatar1": player1_details.get('avatar'),
-                    "avatar2": player2_details.get('avatar'),
-                    "tournament_id": tournament_id,
-                    "match_id": finals_match.match_id,
-                    "game_group_id": game_group_id,
-                    "consumer": self.channel_name,
-                    "tournament_data": {
-                        "tournament_id": tournament_id,
-                        "match_id": finals_match.match_id,
-                        "player1": finals_match.player1,
-                        "player2": finals_match.player2
-                    }
-                }
+        self.scheduler.match_done(tournament_id, match_id)
 
-                for player in [finals_match.player1, finals_match.player2]:
-                    try:
-                        await self.channel_layer.group_send(
-                            self.TOURNAMENT_GROUP,
-                            {
-                                "type": "match_notification",
-                                "match_data": {
-                                    **match_data,
-                                    "opponent": finals_match.player2 if player == finals_match.player1 else finals_match.player1
-                                }
-                            }
-                        )
-                    except Exception as e:
-                        pass
-                
-        elif next_action == 'complete':
+        if tournament.state == TournamentState.COMPLETED:
             await self.end_tournament(tournament)
-        
-        await self.broadcast_player_lists()
+            return
 
-    async def start_matches(self, tournament: Tournament):
-        for match_id in tournament.current_round_matches:
-            match = tournament.matches[match_id]
-            game_group_id = f"{match.player1}_{match.player2}"
-            
-            player1_details = await self.get_player_details(match.player1)
-            player2_details = await self.get_player_details(match.player2)
-            for player in [match.player1, match.player2]:
-                try:
-                    message = {
-                        "type": "match_ready",
-                        "opponent": match.player2 if player == match.player1 else match.player1,
-                        "tournament_id": tournament.id,
-                        "match_id": match_id,
-                        "game_group_id": game_group_id,
-                        "consumer": self.channel_name,
-                        "player1": player1_details.get('username'),
-                        "player2": player2_details.get('username'),
-                        "avatar1": player1_details.get('avatar'),
-                        "avatar2": player2_details.get('avatar'),
-                    }
-                    if player in self.active_connections:
-                        await self.active_connections[player].send(text_data=json.dumps(message))
-                except Exception as e:
-                    pass
+        await self.start_tournament_matches(tournament, opened)
+        event = 'finals_ready' if opened and tournament.state == TournamentState.FINALS else 'match_completed'
+        await self.publish_tournament(tournament, event, [match_id] + [match.match_id for match in opened])
+        if tournament.state != previous_state:
+            await self.publish(event, tournament_states={tournament.id: tournament.state.value})
+
+    async def match_timed_out(self, tournament_id: str, match_id: str):
+        """
+        Forfeit a match that never started. A player still connected wins;
+        if both or neither are, the better seed of the two does.
+        """
+        tournament = self.tournament_manager.tournaments.get(tournament_id)
+        match = tournament.matches.get(match_id) if tournament else None
+        if not match or match.game_completed:
+            return
+        if await self.registry.owner(f"{match.player1}_{match.player2}"):
+            # Being played on some worker; its result will come in as usual
+            self.scheduler.match_started(tournament_id, match_id)
+            return
 
-    async def start_finals(self, tournament: Tournament):
-        semifinal_winners = [
-            tournament.matches[match_id].winner
-            for match_id in tournament.current_round_matches
-        ]
-        
-        finals_match_id = f"{tournament.id}_finals"
-        tournament.matches[finals_match_id] = TournamentMatch(
-            finals_match_id,
-            semifinal_winners[0],
-            semifinal_winners[1]
-        )
-        
-        tournament.state = TournamentState.FINALS
-        tournament.current_round_matches = {finals_match_id}
-        
-        await self.start_matches(tournament)
+        seeds = {player: seed for seed, player in enumerate(tournament.players)}
+        players = [match.player1, match.player2]
+        present = [player for player in players if player in self.connected_players]
+        winner = min(present if len(present) == 1 else players, key=lambda player: seeds.get(player, len(seeds)))
+        self.scheduler.match_forfeited(tournament_id, match_id)
+        await self.handle_game_complete(tournament_id, match_id, winner)
 
-    async def end_tournament(self, tournament: Tournament):
-        finals_match = tournament.matches[next(iter(tournament.current_round_matches))]
-        tournament.state = TournamentState.COMPLETED
-        
-        winner = await self.get_player_details(finals_match.winner)
+    async def tournament_expired(self, tournament_id: str):
+        """Called when no game of the tournament started within WAITING_TIMEOUT"""
+        tournament = self.tournament_manager.tournaments.get(tournament_id)
+        if not tournament or tournament.state == TournamentState.COMPLETED:
+            return
+        # A copy: the awaits below let results change the set
+        for match_id in list(tournament.current_round_matches):
+            match = tournament.matches[match_id]
+            if await self.registry.owner(f"{match.player1}_{match.player2}"):
+                self.scheduler.match_started(tournament_id, match_id)
+                return
+        await self.end_tournament(tournament, expired=True)
+
+    async def end_tournament(self, tournament: Tournament, expired: bool = False):
+        champion = None if expired else tournament.bracket.champion
         message = {
             "type": "tournament_complete",
             "tournament_id": tournament.id,
-            "winner": winner
+            "winner": await self.get_player_details(champion) if champion else None,
+            "reason": "expired" if expired else "completed"
         }
         
         await self.channel_layer.group_send(
-            self.TOURNAMENT_GROUP,
+            tournament_group(tournament.id),
             {
                 "type": "tournament_update",
                 "message": message
             }
         )
+        await self.channel_layer.group_send(
+            tournament_group(tournament.id),
+            {
+                "type": "tournament_unsubscribe",
+                "tournament_id": tournament.id
+            }
+        )
         
+        returning = []
         for player in tournament.players:
-            self.tournament_manager.player_to_tournament.pop(player, None)
             if player in self.connected_players:
                 if player not in self.tournament_manager.waiting_players:
                     self.tournament_manager.waiting_players.append(player)
+                    returning.append(player)
         
-        del self.tournament_manager.tournaments[tournament.id]
+        self.tournament_manager.remove_tournament(tournament.id)
+        self.scheduler.finish(tournament.id, expired=expired)
+        self.feed.remove_tournament(tournament.id)
         
-        await self.broadcast_player_lists()
+        details = await self.get_players_details(returning)
+        await self.publish(
+            'tournament_expired' if expired else 'tournament_completed',
+            waiting_add=[details.get(player, {}) for player in returning],
+            tournament_states={tournament.id: None}
+        )
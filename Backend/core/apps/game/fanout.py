@@ -0,0 +1,74 @@
+from typing import Dict, Set
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LocalFanout:
+    """
+    Delivers match group messages straight to consumers living in this
+    process. Only members on other processes go through the channel layer,
+    so co-located players cost no Redis round trip per frame.
+
+    Match groups must be joined and left through group_add/group_discard
+    here for the membership to be known.
+    """
+
+    def __init__(self):
+        self.consumers: Dict[str, object] = {}
+        self.groups: Dict[str, Set[str]] = {}
+        self.local_sends = 0
+        self.layer_sends = 0
+
+    def register(self, consumer) -> None:
+        self.consumers[consumer.channel_name] = consumer
+
+    def unregister(self, consumer) -> None:
+        self.consumers.pop(consumer.channel_name, None)
+
+    async def group_add(self, channel_layer, group: str, channel_name: str) -> None:
+        self.groups.setdefault(group, set()).add(channel_name)
+        await channel_layer.group_add(group, channel_name)
+
+    async def group_discard(self, channel_layer, group: str, channel_name: str) -> None:
+        members = self.groups.get(group)
+        if members is not None:
+            members.discard(channel_name)
+            if not members:
+                del self.groups[group]
+        await channel_layer.group_discard(group, channel_name)
+
+    async def group_send(self, channel_layer, group: str, message: dict) -> None:
+        members = self.groups.get(group)
+        if members is None:
+            self.layer_sends += 1
+            await channel_layer.group_send(group, message)
+            return
+
+        handler_name = message['type'].replace('.', '_')
+        deliveries = []
+        for channel_name in list(members):
+            consumer = self.consumers.get(channel_name)
+            if consumer:
+                self.local_sends += 1
+                deliveries.append(self.deliver(getattr(consumer, handler_name), message))
+            else:
+                self.layer_sends += 1
+                deliveries.append(channel_layer.send(channel_name, message))
+        await asyncio.gather(*deliveries, return_exceptions=True)
+
+    async def deliver(self, handler, message: dict) -> None:
+        try:
+            await handler(message)
+        except Exception:
+            logger.exception("Local fan-out delivery failed")
+
+    def get_metrics(self) -> dict:
+        return {
+            "local_consumers": len(self.consumers),
+            "groups": len(self.groups),
+            "local_sends": self.local_sends,
+            "layer_sends": self.layer_sends
+        }
+
+local_fanout = LocalFanout()
@@ -1,11 +1,12 @@
-from dataclasses import dataclass
-from typing import Dict, List, Set, Optional, Tuple
+from dataclasses import dataclass, field
+from collections import deque
+from typing import Any, Dict, List, Set, Optional, Tuple
 from enum import Enum
 import math
 import time
 import json
 
-@dataclass
+@dataclass(slots=True)
 class Vector3:
     x: float
     y: float
@@ -17,6 +18,27 @@ class Vector3:
     def __mul__(self, scalar: float) -> 'Vector3':
         return Vector3(self.x * scalar, self.y * scalar, self.z * scalar)
 
+    def __iadd__(self, other: 'Vector3') -> 'Vector3':
+        self.x += other.x
+        self.y += other.y
+        self.z += other.z
+        return self
+
+    def __imul__(self, scalar: float) -> 'Vector3':
+        self.x *= scalar
+        self.y *= scalar
+        self.z *= scalar
+        return self
+
+    def set(self, x: float, y: float, z: float = 0) -> 'Vector3':
+        self.x = x
+        self.y = y
+        self.z = z
+        return self
+
+    def to_dict(self) -> dict:
+        return {"x": self.x, "y": self.y, "z": self.z}
+
     def normalize(self) -> 'Vector3':
         magnitude = math.sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
         if magnitude == 0:
@@ -36,7 +58,7 @@ class Direction(Enum):
             return cls.DOWN
         return cls.NONE
 
-@dataclass
+@dataclass(slots=True)
 class GameState:
     connected_players: Dict[str, str]
     player_labels: Dict[str, str]
@@ -50,9 +72,15 @@ class GameState:
     is_running: bool = True
     last_update: float = time.time()
     tournament_data: Optional[dict] = None
+    frame_seq: int = 0
+    input_queue: deque = field(default_factory=deque)
+    last_input_seq: Dict[str, int] = field(default_factory=dict)
+    restored: bool = False
+    disconnected: Dict[str, float] = field(default_factory=dict)
 
 class TournamentState(Enum):
     WAITING = "waiting"
+    ROUNDS = "rounds"
     SEMIFINALS = "semifinals"
     FINALS = "finals"
     COMPLETED = "completed"
@@ -72,4 +100,6 @@ class Tournament:
     state: TournamentState
     matches: Dict[str, TournamentMatch]
     current_round_matches: Set[str]
-    winners: List[str]
\ No newline at end of file
+    winners: List[str]
+    bracket: Any = None
+    match_ids: Dict[str, int] = field(default_factory=dict)
\ No newline at end of file
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from core.apps.game.benchmarks import BENCHMARKS
+import inspect
+import json
+
+class Command(BaseCommand):
+    help = 'Run a game server benchmark and print the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+        parser.add_argument('--matches', type=int)
+        parser.add_argument('--ticks', type=int)
+        parser.add_argument('--seed', type=int)
+        parser.add_argument('--spectators', type=int)
+        parser.add_argument('--players', type=int)
+        parser.add_argument('--invites', type=int)
+        parser.add_argument('--batch', action='store_true', default=None)
+
+    def handle(self, *args, **options):
+        benchmark = BENCHMARKS[options['benchmark']]
+        accepted = inspect.signature(benchmark).parameters
+        kwargs = {
+            name: value for name, value in options.items()
+            if name in accepted and value is not None
+        }
+        self.stdout.write(json.dumps(benchmark(**kwargs), indent=2))
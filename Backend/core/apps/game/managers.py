@@ -1,16 +1,18 @@
 from .game_models import *
-from .config import GAME_CONSTANTS
+from .brackets import BRACKETS, BracketMatch
+from .config import GAME_CONSTANTS, TOURNAMENT_CONFIG
 from typing import Dict, List, Optional, Tuple
 import random
 import uuid
 
 class GameManager:
     @staticmethod
-    def create_initial_state(player1: str, player2: str) -> GameState:
+    def create_initial_state(player1: str, player2: str, rng=random) -> GameState:
         C = GAME_CONSTANTS
         
-        paddle1_pos = Vector3(-1300, 0, 0)
-        paddle2_pos = Vector3(1300, 0, 0)
+        x, half_width = C['PADDLE_X'], C['PADDLE_HALF_WIDTH']
+        paddle1_pos = Vector3(-x, 0, 0)
+        paddle2_pos = Vector3(x, 0, 0)
         
         return GameState(
             connected_players={player1: player1, player2: player2},
@@ -19,23 +21,23 @@ class GameManager:
             paddle_directions={player1: Direction.NONE, player2: Direction.NONE},
             paddle_boxes={
                 player1: {
-                    "min": Vector3(-1400, -C['PADDLE_HEIGHT'], 0),
-                    "max": Vector3(-1200, C['PADDLE_HEIGHT'], 0)
+                    "min": Vector3(-x - half_width, -C['PADDLE_HEIGHT'], 0),
+                    "max": Vector3(-x + half_width, C['PADDLE_HEIGHT'], 0)
                 },
                 player2: {
-                    "min": Vector3(1200, -C['PADDLE_HEIGHT'], 0),
-                    "max": Vector3(1400, C['PADDLE_HEIGHT'], 0)
+                    "min": Vector3(x - half_width, -C['PADDLE_HEIGHT'], 0),
+                    "max": Vector3(x + half_width, C['PADDLE_HEIGHT'], 0)
                 }
             },
             ball_position=Vector3(0, 0, 0),
-            ball_direction=GameManager.start_ball_direction()
+            ball_direction=GameManager.start_ball_direction(rng)
         )
 
     @staticmethod
-    def start_ball_direction() -> Vector3:
+    def start_ball_direction(rng=random) -> Vector3:
         C = GAME_CONSTANTS
-        angle = random.uniform(-math.pi/4, math.pi/4)
-        direction = random.choice([-1, 1])
+        angle = rng.uniform(-math.pi/4, math.pi/4)
+        direction = rng.choice([-1, 1])
         
         x = math.cos(angle) * direction
         y = math.sin(angle)
@@ -56,96 +58,184 @@ class GameManager:
         vector = Vector3(x, y, 0).normalize()
         return vector * (C['VELOCITY'] * C['FACTOR'])
 
+    @staticmethod
+    def step_ball(game: GameState, delta_time: float, rng=random) -> bool:
+        """Advance the ball by delta_time in place. Returns True when a goal was scored"""
+        C = GAME_CONSTANTS
+        position = game.ball_position
+        direction = game.ball_direction
+        new_x = position.x + (direction.x * delta_time)
+        new_y = position.y + (direction.y * delta_time)
+
+        if abs(new_y) >= C['COURT_HEIGHT']:
+            direction.y *= -1
+            new_y = math.copysign(C['COURT_HEIGHT'], new_y)
+
+        for paddle_box in game.paddle_boxes.values():
+            box_min, box_max = paddle_box["min"], paddle_box["max"]
+            if (box_min.x <= new_x <= box_max.x and
+                box_min.y <= new_y <= box_max.y):
+                direction.x *= -1
+                new_x = (box_max.x + C['BALL_RADIUS']
+                        if direction.x > 0
+                        else box_min.x - C['BALL_RADIUS'])
+                break
+
+        if abs(new_x) >= C['COURT_WIDTH']:
+            if new_x > 0:
+                game.score_left += 1
+            else:
+                game.score_right += 1
+            position.set(0, 0, 0)
+            game.ball_direction = GameManager.start_ball_direction(rng)
+            return True
+
+        position.x = new_x
+        position.y = new_y
+        return False
+
+    @staticmethod
+    def has_winner(game: GameState) -> bool:
+        return max(game.score_left, game.score_right) >= GAME_CONSTANTS['WIN_SCORE']
+
+    @staticmethod
+    def queue_input(game: GameState, player: str, direction: Direction, seq: int,
+                    received_at: Optional[float] = None) -> None:
+        if received_at is None:
+            received_at = time.monotonic()
+        game.input_queue.append((received_at, player, direction, seq))
+
+    @staticmethod
+    def apply_inputs(game: GameState) -> None:
+        """Drain the input queue in arrival order at the start of a tick"""
+        queue = game.input_queue
+        while queue:
+            _, player, direction, seq = queue.popleft()
+            if player in game.paddle_directions:
+                game.paddle_directions[player] = direction
+                if seq > game.last_input_seq.get(player, 0):
+                    game.last_input_seq[player] = seq
+
+    @staticmethod
+    def update_paddle_positions(game: GameState, delta_time: float) -> None:
+        C = GAME_CONSTANTS
+        height = C['PADDLE_HEIGHT']
+        max_y = C['COURT_HEIGHT'] - height
+        step = C['PADDLE_SPEED'] * delta_time
+        
+        for player_id, direction in game.paddle_directions.items():
+            if direction is not Direction.NONE:
+                current_pos = game.paddle_positions[player_id]
+                new_y = max(min(current_pos.y + direction.value * step, max_y), -max_y)
+                
+                if GameManager.validate_paddle_movement(current_pos.y, new_y, delta_time):
+                    current_pos.y = new_y
+                    box = game.paddle_boxes[player_id]
+                    box["min"].y = new_y - height
+                    box["max"].y = new_y + height
+
+    @staticmethod
+    def validate_paddle_movement(old_y: float, new_y: float, delta_time: float) -> bool:
+        C = GAME_CONSTANTS
+        max_movement = C['PADDLE_SPEED'] * delta_time * 1.1
+        return abs(new_y - old_y) <= max_movement
+
 class TournamentManager:
+    """
+    Tournaments of this process. The pairing and advancement rules live in
+    the tournament's bracket (see brackets.py); this keeps the string match
+    IDs the consumers and clients use, e.g. "<tournament>_semi1", in step
+    with it.
+    """
+
     def __init__(self):
         self.tournaments: Dict[str, Tournament] = {}
         self.player_to_tournament: Dict[str, str] = {}
         self.waiting_players: List[str] = []
 
-    def create_tournament(self, players: List[str]) -> Tournament:
+    def create_tournament(self, players: List[str], format: Optional[str] = None) -> Tournament:
+        """Create a tournament for players, given in seed order"""
         tournament_id = str(uuid.uuid4())
         
-        match1_id = f"{tournament_id}_semi1"
-        match2_id = f"{tournament_id}_semi2"
-        
-        matches = {
-            match1_id: TournamentMatch(match1_id, players[0], players[1]),
-            match2_id: TournamentMatch(match2_id, players[2], players[3])
-        }
-        
         tournament = Tournament(
             id=tournament_id,
             players=players,
-            state=TournamentState.SEMIFINALS,
-            matches=matches,
-            current_round_matches={match1_id, match2_id},
-            winners=[]
+            state=TournamentState.WAITING,
+            matches={},
+            current_round_matches=set(),
+            winners=[],
+            bracket=BRACKETS[format or TOURNAMENT_CONFIG['FORMAT']](players)
         )
         
         self.tournaments[tournament_id] = tournament
         
         for player in players:
             self.player_to_tournament[player] = tournament_id
-            
+
+        self.open_matches(tournament, tournament.bracket.start())
+        return tournament
+
+    def open_matches(self, tournament: Tournament, ready: List[BracketMatch]) -> List[TournamentMatch]:
+        opened = []
+        for bracket_match in ready:
+            match_id = f"{tournament.id}_{bracket_match.label}"
+            match = TournamentMatch(match_id, *bracket_match.players)
+            tournament.matches[match_id] = match
+            tournament.match_ids[match_id] = bracket_match.index
+            tournament.current_round_matches.add(match_id)
+            opened.append(match)
+        tournament.state = self.stage(tournament)
+        return opened
+
+    @staticmethod
+    def stage(tournament: Tournament) -> TournamentState:
+        if tournament.bracket.finished:
+            return TournamentState.COMPLETED
+        labels = {match_id.rsplit('_', 1)[-1] for match_id in tournament.current_round_matches}
+        if labels in ({'finals'}, {'reset'}):
+            return TournamentState.FINALS
+        if labels and all(label.startswith('semi') for label in labels):
+            return TournamentState.SEMIFINALS
+        return TournamentState.ROUNDS
+
+    def remove_tournament(self, tournament_id: str) -> Optional[Tournament]:
+        """Drop a tournament and the mapping of the players still pointing at it"""
+        tournament = self.tournaments.pop(tournament_id, None)
+        if tournament:
+            for player in tournament.players:
+                if self.player_to_tournament.get(player) == tournament_id:
+                    del self.player_to_tournament[player]
         return tournament
 
     def get_player_tournament(self, player: str) -> Optional[Tournament]:
         tournament_id = self.player_to_tournament.get(player)
         return self.tournaments.get(tournament_id)
 
-    def handle_match_complete(self, tournament_id: str, match_id: str, winner: str) -> Tuple[bool, Optional[str]]:
+    def handle_match_complete(self, tournament_id: str, match_id: str, winner: str) -> Tuple[bool, List[TournamentMatch]]:
         """
-        Handle match completion and return status and next action.
-        Returns: (success, next_action)
-            where next_action can be 'finals' or 'complete' or None
+        Record a match result.
+        Returns: (success, matches that can start now)
+            the tournament is over once tournament.state is COMPLETED
         """
         tournament = self.tournaments.get(tournament_id)
-        if not tournament or match_id not in tournament.matches:
+        index = tournament.match_ids.get(match_id) if tournament else None
+        if index is None:
             print(f"Tournament {tournament_id} or match {match_id} not found")
-            return False, None
-            
+            return False, []
+
+        try:
+            ready = tournament.bracket.report(index, winner)
+        except ValueError as e:
+            print(f"Rejected result for match {match_id}: {e}")
+            return False, []
+
         match = tournament.matches[match_id]
         match.winner = winner
         match.game_completed = True
+        tournament.current_round_matches.discard(match_id)
         print(f"Match {match_id} completed: {winner} won")
-        
-        all_complete = all(
-            tournament.matches[mid].game_completed 
-            for mid in tournament.current_round_matches
-        )
-        
-        if all_complete:
-            if tournament.state == TournamentState.SEMIFINALS:
-                return True, 'finals'
-            elif tournament.state == TournamentState.FINALS:
-                return True, 'complete'
-        
-        return True, None
 
-    def setup_finals(self, tournament_id: str) -> Optional[TournamentMatch]:
-        """Set up finals match and return the new match or None if error"""
-        tournament = self.tournaments.get(tournament_id)
-        if not tournament:
-            return None
-        
-        semifinal_winners = [
-            tournament.matches[match_id].winner
-            for match_id in tournament.current_round_matches
-        ]
-        
-        if len(semifinal_winners) != 2:
-            print("Error: Need exactly 2 semifinal winners")
-            return None
-            
-        finals_match_id = f"{tournament.id}_finals"
-        finals_match = TournamentMatch(
-            finals_match_id,
-            semifinal_winners[0],
-            semifinal_winners[1]
-        )
-        
-        tournament.matches[finals_match_id] = finals_match
-        tournament.state = TournamentState.FINALS
-        tournament.current_round_matches = {finals_match_id}
-        
-        return finals_match
\ No newline at end of file
+        opened = self.open_matches(tournament, ready)
+        if tournament.bracket.finished:
+            tournament.winners.append(tournament.bracket.champion)
+        return True, opened
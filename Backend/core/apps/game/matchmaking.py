@@ -0,0 +1,241 @@
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from .config import MATCHMAKING_CONFIG
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+@dataclass(slots=True)
+class QueueEntry:
+    username: str
+    channel: str
+    points: int
+    joined_at: float
+    worker: str = ''
+
+def pair_entries(entries: List[QueueEntry], now: float) -> List[Tuple[QueueEntry, QueueEntry]]:
+    """
+    Pair waiting players by skill. Players are bucketed by t_points and
+    paired oldest first inside their bucket. Each bucket then has at most
+    one player left over, who may be paired with the leftover of a nearby
+    bucket once both have waited long enough: the allowed distance grows by
+    one bucket every WIDEN_AFTER seconds.
+    """
+    C = MATCHMAKING_CONFIG
+    buckets: Dict[int, List[QueueEntry]] = {}
+    for entry in entries:
+        buckets.setdefault(entry.points // C['BUCKET_SIZE'], []).append(entry)
+
+    pairs = []
+    leftovers = []
+    for bucket in sorted(buckets):
+        members = sorted(buckets[bucket], key=lambda entry: entry.joined_at)
+        for i in range(0, len(members) - 1, 2):
+            pairs.append((members[i], members[i + 1]))
+        if len(members) % 2:
+            leftovers.append((bucket, members[-1]))
+
+    def radius(entry: QueueEntry) -> int:
+        return int((now - entry.joined_at) / C['WIDEN_AFTER'])
+
+    i = 0
+    while i < len(leftovers) - 1:
+        (bucket1, entry1), (bucket2, entry2) = leftovers[i], leftovers[i + 1]
+        if bucket2 - bucket1 <= min(radius(entry1), radius(entry2)):
+            pairs.append((entry1, entry2))
+            i += 2
+        else:
+            i += 1
+    return pairs
+
+class LocalQueueStore:
+    """Waiting players of this process only"""
+    shared = False
+
+    def __init__(self):
+        self.entries: Dict[str, QueueEntry] = {}
+
+    def add(self, entry: QueueEntry) -> None:
+        self.entries[entry.username] = entry
+
+    def remove(self, username: str) -> bool:
+        return self.entries.pop(username, None) is not None
+
+    def snapshot(self) -> List[QueueEntry]:
+        return list(self.entries.values())
+
+    def count(self) -> int:
+        return len(self.entries)
+
+    def heartbeat(self, worker: str) -> None:
+        pass
+
+    def alive(self, workers: List[str]) -> List[str]:
+        return workers
+
+    def acquire(self) -> bool:
+        return True
+
+    def release(self) -> None:
+        pass
+
+class CacheQueueStore:
+    """
+    Waiting players in a Redis hash shared by every worker. Only the worker
+    holding the pairing lock runs a round, so a player is never paired twice.
+    Each worker keeps a heartbeat key alive while it runs; entries of a
+    worker whose heartbeat expired are pruned before pairing, since their
+    players' channels are gone with it.
+    """
+    shared = True
+    KEY = 'game:matchmaking:queue'
+    LOCK = 'game:matchmaking:lock'
+    HEARTBEAT = 'game:matchmaking:worker:'
+
+    def __init__(self):
+        from django_redis import get_redis_connection
+        self.redis = get_redis_connection('default')
+
+    def add(self, entry: QueueEntry) -> None:
+        self.redis.hset(self.KEY, entry.username, json.dumps(asdict(entry)))
+
+    def remove(self, username: str) -> bool:
+        return self.redis.hdel(self.KEY, username) == 1
+
+    def snapshot(self) -> List[QueueEntry]:
+        return [QueueEntry(**json.loads(value)) for value in self.redis.hvals(self.KEY)]
+
+    def count(self) -> int:
+        return self.redis.hlen(self.KEY)
+
+    def heartbeat(self, worker: str) -> None:
+        cache.set(self.HEARTBEAT + worker, 1, MATCHMAKING_CONFIG['HEARTBEAT_TTL'])
+
+    def alive(self, workers: List[str]) -> List[str]:
+        found = cache.get_many([self.HEARTBEAT + worker for worker in workers])
+        return [worker for worker in workers if self.HEARTBEAT + worker in found]
+
+    def acquire(self) -> bool:
+        return cache.add(self.LOCK, 1, MATCHMAKING_CONFIG['LOCK_TIMEOUT'])
+
+    def release(self) -> None:
+        cache.delete(self.LOCK)
+
+class MatchmakingService:
+    """
+    Queue for random matches. Joining is O(1); pairing runs in batches every
+    PAIR_INTERVAL. Each pair is announced to both players' channels with a
+    'matchmaking.paired' event naming the player that hosts the match.
+    """
+
+    def __init__(self, store=None, clock=time.time, channel_layer=None):
+        if store is None:
+            store = CacheQueueStore() if MATCHMAKING_CONFIG['BACKEND'] == 'cache' else LocalQueueStore()
+        self.store = store
+        self.clock = clock
+        self.channel_layer = channel_layer
+        self.worker_id = uuid.uuid4().hex[:12]
+        self.rounds = 0
+        self.paired = 0
+        self.pruned = 0
+        self.last_round_ms = 0.0
+        self.max_wait = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def call(self, method, *args):
+        if self.store.shared:
+            return await sync_to_async(method)(*args)
+        return method(*args)
+
+    async def join(self, username: str, channel: str, points: int) -> None:
+        await self.call(self.store.heartbeat, self.worker_id)
+        await self.call(self.store.add, QueueEntry(username, channel, points, self.clock(), self.worker_id))
+        if not self._task or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def leave(self, username: str) -> None:
+        await self.call(self.store.remove, username)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(MATCHMAKING_CONFIG['PAIR_INTERVAL'])
+            try:
+                await self.call(self.store.heartbeat, self.worker_id)
+                await self.pair_round()
+                if not await self.call(self.store.count):
+                    break
+            except Exception:
+                logger.exception("Matchmaking round failed")
+
+    async def pair_round(self) -> int:
+        """Run one pairing round. Returns the number of pairs announced"""
+        if not await self.call(self.store.acquire):
+            return 0
+        try:
+            entries = await self.prune(await self.call(self.store.snapshot))
+            now = self.clock()
+            started = time.perf_counter()
+            pairs = pair_entries(entries, now)
+            self.last_round_ms = (time.perf_counter() - started) * 1000
+
+            announced = 0
+            for entry1, entry2 in pairs:
+                # A player may have left since the snapshot; the other one
+                # simply goes back into the queue.
+                removed1 = await self.call(self.store.remove, entry1.username)
+                removed2 = await self.call(self.store.remove, entry2.username)
+                if removed1 and removed2:
+                    self.max_wait = max(self.max_wait, now - entry1.joined_at, now - entry2.joined_at)
+                    await self.announce(entry1, entry2)
+                    announced += 1
+                elif removed1 or removed2:
+                    await self.call(self.store.add, entry1 if removed1 else entry2)
+
+            self.rounds += 1
+            self.paired += announced
+            return announced
+        finally:
+            await self.call(self.store.release)
+
+    async def prune(self, entries: List[QueueEntry]) -> List[QueueEntry]:
+        """Remove the entries of workers that stopped sending heartbeats"""
+        alive = set(await self.call(self.store.alive, list({entry.worker for entry in entries})))
+        live = []
+        for entry in entries:
+            if entry.worker in alive:
+                live.append(entry)
+            elif await self.call(self.store.remove, entry.username):
+                self.pruned += 1
+        return live
+
+    async def announce(self, entry1: QueueEntry, entry2: QueueEntry) -> None:
+        channel_layer = self.channel_layer or get_channel_layer()
+        message = {
+            'type': 'matchmaking.paired',
+            'group': f"{entry1.username}_{entry2.username}",
+            'players': [entry1.username, entry2.username],
+            'host': entry2.username,
+            'channels': {entry1.username: entry1.channel, entry2.username: entry2.channel}
+        }
+        for entry in (entry1, entry2):
+            await channel_layer.send(entry.channel, message)
+
+    def get_metrics(self) -> dict:
+        return {
+            "backend": type(self.store).__name__,
+            "queued": self.store.count(),
+            "rounds": self.rounds,
+            "paired": self.paired,
+            "pruned": self.pruned,
+            "last_round_ms": round(self.last_round_ms, 3),
+            "max_wait_seconds": round(self.max_wait, 1)
+        }
+
+matchmaking_service = MatchmakingService()
@@ -0,0 +1,164 @@
+from .game_models import *
+from .config import GAME_CONSTANTS, PROTOCOL_CONFIG
+from collections import OrderedDict
+import struct
+import json
+
+# Compact snapshot of one frame, used on the channel layer and as the
+# baseline for per-connection deltas:
+# seq, paddle1 x/y, paddle2 x/y, paddle directions, ball x/y,
+# ball direction x/y, score left/right, last processed input seq per player
+STATE = struct.Struct('<I4f2b4f2B2I')
+
+# Binary frame sent to clients that negotiated the binary protocol:
+# frame type, seq, base seq (0 for keyframes), field mask, then the fields
+# whose bit is set, in this order.
+FRAME_HEADER = struct.Struct('<BIIB')
+PADDLES = struct.Struct('<2f2b')
+BALL = struct.Struct('<4f')
+SCORE = struct.Struct('<2B')
+INPUTS = struct.Struct('<2I')
+
+MAX_INPUT_SEQ = 0xFFFFFFFF
+
+FRAME_STATE = 1
+FIELD_PADDLES = 1
+FIELD_BALL = 2
+FIELD_SCORE = 4
+FIELD_INPUTS = 8
+
+def input_seq(value) -> int:
+    """Client input seq, which has to fit the unsigned 32-bit input fields of STATE"""
+    seq = int(value)
+    if not 0 <= seq <= MAX_INPUT_SEQ:
+        raise ValueError(f"Input seq {seq} out of range")
+    return seq
+
+def pack_state(game: GameState, seq: int) -> bytes:
+    p1, p2 = sorted(game.player_labels, key=game.player_labels.__getitem__)
+    pos1 = game.paddle_positions[p1]
+    pos2 = game.paddle_positions[p2]
+    return STATE.pack(
+        seq,
+        pos1.x, pos1.y, pos2.x, pos2.y,
+        game.paddle_directions[p1].value, game.paddle_directions[p2].value,
+        game.ball_position.x, game.ball_position.y,
+        game.ball_direction.x, game.ball_direction.y,
+        game.score_left, game.score_right,
+        game.last_input_seq.get(p1, 0), game.last_input_seq.get(p2, 0)
+    )
+
+def unpack_state(data: bytes) -> tuple:
+    return STATE.unpack(data)
+
+def state_to_json(state: tuple) -> dict:
+    """The JSON "update" document for clients without the binary protocol"""
+    C = GAME_CONSTANTS
+    seq, x1, y1, x2, y2, d1, d2, bx, by, bdx, bdy, score_left, score_right, input1, input2 = state
+
+    def box(x, y):
+        return {
+            "min": {"x": x - C['PADDLE_HALF_WIDTH'], "y": y - C['PADDLE_HEIGHT'], "z": 0},
+            "max": {"x": x + C['PADDLE_HALF_WIDTH'], "y": y + C['PADDLE_HEIGHT'], "z": 0}
+        }
+
+    return {
+        "type": "update",
+        "seq": seq,
+        "paddlePositions": [
+            {"playerId": "player1", "position": {"x": x1, "y": y1, "z": 0}, "direction": d1},
+            {"playerId": "player2", "position": {"x": x2, "y": y2, "z": 0}, "direction": d2}
+        ],
+        "ballPosition": {"x": bx, "y": by, "z": 0},
+        "ballDirection": {"x": bdx, "y": bdy, "z": 0},
+        "scoreL": score_left,
+        "scoreR": score_right,
+        "lastInput": {"player1": input1, "player2": input2},
+        "paddleBoxes": {"player1": box(x1, y1), "player2": box(x2, y2)}
+    }
+
+def encode_frame(state: tuple, base: Optional[tuple] = None) -> bytes:
+    """Binary frame for state, carrying only the fields that differ from base"""
+    paddles = state[2:5:2] + state[5:7]
+    ball = state[7:11]
+    score = state[11:13]
+    inputs = state[13:15]
+
+    mask = FIELD_PADDLES | FIELD_BALL | FIELD_SCORE | FIELD_INPUTS
+    if base:
+        base_paddles = base[2:5:2] + base[5:7]
+        mask = ((FIELD_PADDLES if paddles != base_paddles else 0) |
+                (FIELD_BALL if ball != base[7:11] else 0) |
+                (FIELD_SCORE if score != base[11:13] else 0) |
+                (FIELD_INPUTS if inputs != base[13:15] else 0))
+
+    parts = [FRAME_HEADER.pack(FRAME_STATE, state[0], base[0] if base else 0, mask)]
+    if mask & FIELD_PADDLES:
+        parts.append(PADDLES.pack(*paddles))
+    if mask & FIELD_BALL:
+        parts.append(BALL.pack(*ball))
+    if mask & FIELD_SCORE:
+        parts.append(SCORE.pack(*score))
+    if mask & FIELD_INPUTS:
+        parts.append(INPUTS.pack(*inputs))
+    return b''.join(parts)
+
+class SharedFrame:
+    """
+    A broadcast frame shared by every recipient in this process. The JSON
+    document and the binary keyframe are encoded on first use only, so
+    adding spectators does not add encoding work.
+    """
+
+    __slots__ = ('state', '_text', '_keyframe')
+
+    def __init__(self, state: tuple):
+        self.state = state
+        self._text: Optional[str] = None
+        self._keyframe: Optional[bytes] = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = json.dumps(state_to_json(self.state))
+        return self._text
+
+    @property
+    def keyframe(self) -> bytes:
+        if self._keyframe is None:
+            self._keyframe = encode_frame(self.state)
+        return self._keyframe
+
+_shared_frames: OrderedDict = OrderedDict()
+
+def shared_frame(data: bytes) -> SharedFrame:
+    """The SharedFrame for a packed state, decoded once per process"""
+    frame = _shared_frames.get(data)
+    if frame is None:
+        frame = _shared_frames[data] = SharedFrame(unpack_state(data))
+        if len(_shared_frames) > PROTOCOL_CONFIG['SHARED_FRAMES']:
+            _shared_frames.popitem(last=False)
+    return frame
+
+class DeltaEncoder:
+    """
+    Per-connection binary encoder. Each frame only carries the fields that
+    differ from the last frame the client acknowledged; without a usable
+    ack a keyframe with every field is sent.
+    """
+
+    def __init__(self, history: int = PROTOCOL_CONFIG['DELTA_HISTORY']):
+        self.history = history
+        self.sent: OrderedDict = OrderedDict()
+        self.acked_seq: Optional[int] = None
+
+    def ack(self, seq: int) -> None:
+        if seq in self.sent:
+            self.acked_seq = seq
+
+    def encode(self, state: tuple) -> bytes:
+        frame = encode_frame(state, self.sent.get(self.acked_seq))
+        self.sent[state[0]] = state
+        while len(self.sent) > self.history:
+            self.sent.popitem(last=False)
+        return frame
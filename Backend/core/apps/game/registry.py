@@ -0,0 +1,165 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from .config import REGISTRY_CONFIG
+from typing import Any, Dict, Optional
+import asyncio
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+class LocalOwnershipStore:
+    """Ownership kept in this process. Enough while a single worker hosts every match"""
+
+    def __init__(self):
+        self.owners: Dict[str, str] = {}
+
+    def add(self, group_id: str, worker: str) -> bool:
+        return self.owners.setdefault(group_id, worker) == worker
+
+    def get(self, group_id: str) -> Optional[str]:
+        return self.owners.get(group_id)
+
+    def set(self, group_id: str, worker: str) -> None:
+        self.owners[group_id] = worker
+
+    def touch(self, group_id: str) -> None:
+        pass
+
+    def delete(self, group_id: str) -> None:
+        self.owners.pop(group_id, None)
+
+class CacheOwnershipStore:
+    """
+    Ownership in the Django cache (Redis), shared by every worker. cache.add
+    is atomic, so exactly one worker wins a match; the key expires after
+    OWNERSHIP_TTL unless the owner keeps touching it.
+    """
+
+    def __init__(self, timeout: int = REGISTRY_CONFIG['OWNERSHIP_TTL']):
+        self.timeout = timeout
+
+    def key(self, group_id: str) -> str:
+        return f"game:owner:{group_id}"
+
+    def add(self, group_id: str, worker: str) -> bool:
+        return cache.add(self.key(group_id), worker, self.timeout) or cache.get(self.key(group_id)) == worker
+
+    def get(self, group_id: str) -> Optional[str]:
+        return cache.get(self.key(group_id))
+
+    def set(self, group_id: str, worker: str) -> None:
+        cache.set(self.key(group_id), worker, self.timeout)
+
+    def touch(self, group_id: str) -> None:
+        cache.touch(self.key(group_id), self.timeout)
+
+    def delete(self, group_id: str) -> None:
+        cache.delete(self.key(group_id))
+
+class MatchRegistry:
+    """
+    Assigns every match to exactly one worker process.
+
+    Each worker listens on its own channel. The worker that claims a match
+    hosts its GameState and scheduler slot; consumers on other workers send
+    their player's join, input and leave messages to the owner's channel,
+    where they are dispatched to the hosting consumer like channel layer
+    events ('match.input' calls host.match_input(message)).
+    """
+
+    def __init__(self, store=None):
+        if store is None:
+            store = CacheOwnershipStore() if REGISTRY_CONFIG['BACKEND'] == 'cache' else LocalOwnershipStore()
+        self.store = store
+        self.worker_id = uuid.uuid4().hex[:12]
+        self.worker_channel: Optional[str] = None
+        self.channel_layer = None
+        self.hosts: Dict[str, Any] = {}
+        self.forwarded = 0
+        self.received = 0
+        self._listener: Optional[asyncio.Task] = None
+        self._refresher: Optional[asyncio.Task] = None
+
+    async def start(self, channel_layer) -> None:
+        if self._listener and not self._listener.done():
+            return
+        self.channel_layer = channel_layer
+        self.worker_channel = await channel_layer.new_channel()
+        self._listener = asyncio.create_task(self.listen())
+        self._refresher = asyncio.create_task(self.refresh())
+
+    @property
+    def worker(self) -> str:
+        return self.worker_channel or self.worker_id
+
+    async def claim(self, group_id: str, host) -> bool:
+        """Take ownership of group_id for host. False if another worker owns it"""
+        if not await sync_to_async(self.store.add)(group_id, self.worker):
+            return False
+        self.hosts[group_id] = host
+        return True
+
+    async def take_over(self, group_id: str, host) -> None:
+        """Become the owner of group_id regardless of the current one, whose worker is gone"""
+        await sync_to_async(self.store.set)(group_id, self.worker)
+        self.hosts[group_id] = host
+
+    async def owner(self, group_id: str) -> Optional[str]:
+        if group_id in self.hosts:
+            return self.worker
+        return await sync_to_async(self.store.get)(group_id)
+
+    async def release(self, group_id: str) -> None:
+        if self.hosts.pop(group_id, None) is not None:
+            await sync_to_async(self.store.delete)(group_id)
+
+    async def send_to_owner(self, group_id: str, message: dict) -> bool:
+        """Deliver message to the worker hosting group_id"""
+        owner = await self.owner(group_id)
+        if not owner:
+            return False
+        message = {**message, 'group': group_id}
+        if owner == self.worker:
+            await self.dispatch(message)
+        else:
+            self.forwarded += 1
+            await self.channel_layer.send(owner, message)
+        return True
+
+    async def dispatch(self, message: dict) -> None:
+        host = self.hosts.get(message.get('group'))
+        if not host:
+            return
+        handler = getattr(host, message['type'].replace('.', '_'), None)
+        if handler:
+            await handler(message)
+
+    async def listen(self) -> None:
+        while True:
+            message = await self.channel_layer.receive(self.worker_channel)
+            self.received += 1
+            try:
+                await self.dispatch(message)
+            except Exception:
+                logger.exception("Match registry dispatch failed")
+
+    async def refresh(self) -> None:
+        while True:
+            await asyncio.sleep(REGISTRY_CONFIG['REFRESH_INTERVAL'])
+            for group_id in list(self.hosts):
+                try:
+                    await sync_to_async(self.store.touch)(group_id)
+                except Exception:
+                    logger.exception("Match ownership refresh failed")
+
+    def get_metrics(self) -> dict:
+        return {
+            "worker": self.worker_id,
+            "backend": type(self.store).__name__,
+            "owned_matches": len(self.hosts),
+            "forwarded_messages": self.forwarded,
+            "received_messages": self.received
+        }
+
+match_registry = MatchRegistry()
@@ -0,0 +1,187 @@
+from django.conf import settings
+from .protocol import unpack_state, encode_frame
+from .config import REPLAY_CONFIG
+from collections import deque
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import struct
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# A replay is a sequence of binary frames (see protocol.encode_frame), each
+# prefixed with its length. Every INDEX_INTERVAL-th frame is a keyframe and
+# the others are deltas against the previous frame, so playback can start at
+# any keyframe listed in the index.
+RECORD_LENGTH = struct.Struct('<B')
+
+# Index entry: frame seq and file offset of a keyframe
+INDEX_ENTRY = struct.Struct('<IQ')
+
+class ReplayWriter:
+    """New replay and index files of one match. Used from the writer thread only"""
+
+    def __init__(self, path: Path):
+        self.data = open(path, 'xb')
+        self.index = open(path.with_suffix('.index'), 'xb')
+        self.offset = 0
+        self.previous: Optional[tuple] = None
+        self.count = 0
+
+    def append(self, packed: bytes) -> int:
+        state = unpack_state(packed)
+        if self.count % REPLAY_CONFIG['INDEX_INTERVAL'] == 0:
+            self.index.write(INDEX_ENTRY.pack(state[0], self.offset))
+            frame = encode_frame(state)
+        else:
+            frame = encode_frame(state, self.previous)
+
+        self.data.write(RECORD_LENGTH.pack(len(frame)))
+        self.data.write(frame)
+        self.offset += RECORD_LENGTH.size + len(frame)
+        self.previous = state
+        self.count += 1
+        return RECORD_LENGTH.size + len(frame)
+
+    def flush(self) -> None:
+        self.data.flush()
+        self.index.flush()
+
+    def close(self) -> None:
+        self.data.close()
+        self.index.close()
+
+class ReplayRecorder:
+    """
+    Records the frames of every match to a replay file of its own, named by
+    a replay id: the group id and a random suffix, since the same two
+    players can meet again under the same group id.
+
+    record() only appends to an in-memory queue, so the tick path never
+    touches the disk. A writer task drains the queue every FLUSH_INTERVAL
+    and hands the batch to a thread that encodes and writes it.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, enabled: bool = REPLAY_CONFIG['ENABLED']):
+        self.directory = Path(directory or Path(settings.BASE_DIR) / REPLAY_CONFIG['DIRECTORY'])
+        self.enabled = enabled
+        self.queue: deque = deque()
+        self.writers: Dict[str, ReplayWriter] = {}
+        # Replay id of the match each group is playing, on the event loop side
+        self.replays: Dict[str, str] = {}
+        self.recorded = 0
+        self.dropped = 0
+        self.bytes_written = 0
+        self.flushes = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def path(self, replay_id: str) -> Path:
+        return self.directory / f"{replay_id}.replay"
+
+    def replay_id(self, group_id: str) -> Optional[str]:
+        """Replay id of the match group_id is playing, if it is being recorded"""
+        return self.replays.get(group_id)
+
+    def record(self, group_id: str, packed: bytes) -> None:
+        if not self.enabled:
+            return
+        replay_id = self.replays.get(group_id)
+        if replay_id is None:
+            replay_id = self.replays[group_id] = f"{group_id}_{uuid.uuid4().hex[:12]}"
+        if len(self.queue) >= REPLAY_CONFIG['QUEUE_SIZE']:
+            self.dropped += 1
+            return
+        self.queue.append((replay_id, packed))
+        if not self._task or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    def finish(self, group_id: str) -> Optional[str]:
+        """Close the replay of group_id once its queued frames are written. Returns its replay id"""
+        replay_id = self.replays.pop(group_id, None)
+        if replay_id:
+            self.queue.append((replay_id, None))
+        return replay_id
+
+    async def run(self) -> None:
+        while self.queue or self.writers:
+            await asyncio.sleep(REPLAY_CONFIG['FLUSH_INTERVAL'])
+            batch = list(self.queue)
+            self.queue.clear()
+            try:
+                await asyncio.to_thread(self.write_batch, batch)
+            except Exception:
+                logger.exception("Replay write failed")
+
+    def write_batch(self, batch: List[Tuple[str, Optional[bytes]]]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        touched = set()
+        for replay_id, packed in batch:
+            writer = self.writers.get(replay_id)
+            if packed is None:
+                if writer:
+                    writer.close()
+                    del self.writers[replay_id]
+                    touched.discard(replay_id)
+                continue
+            if not writer:
+                writer = self.writers[replay_id] = ReplayWriter(self.path(replay_id))
+            self.bytes_written += writer.append(packed)
+            self.recorded += 1
+            touched.add(replay_id)
+
+        for replay_id in touched:
+            self.writers[replay_id].flush()
+        self.flushes += 1
+
+    def seek(self, replay_id: str, from_seq: int = 0) -> int:
+        """Offset of the last keyframe at or before from_seq, by binary search over the index"""
+        index_path = self.path(replay_id).with_suffix('.index')
+        if not index_path.exists():
+            return 0
+
+        with open(index_path, 'rb') as index:
+            low, high = 0, index_path.stat().st_size // INDEX_ENTRY.size
+            offset = 0
+            while low < high:
+                middle = (low + high) // 2
+                index.seek(middle * INDEX_ENTRY.size)
+                seq, entry_offset = INDEX_ENTRY.unpack(index.read(INDEX_ENTRY.size))
+                if seq <= from_seq:
+                    offset = entry_offset
+                    low = middle + 1
+                else:
+                    high = middle
+        return offset
+
+    async def stream(self, replay_id: str, from_seq: int = 0) -> AsyncIterator[bytes]:
+        """
+        The replay file in CHUNK_SIZE pieces, starting at the keyframe for
+        from_seq. Every read runs in a thread, and an async iterator lets
+        an ASGI server send each chunk as it is read.
+        """
+        offset = await asyncio.to_thread(self.seek, replay_id, from_seq)
+        data = await asyncio.to_thread(open, self.path(replay_id), 'rb')
+        try:
+            await asyncio.to_thread(data.seek, offset)
+            while True:
+                chunk = await asyncio.to_thread(data.read, REPLAY_CONFIG['CHUNK_SIZE'])
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            data.close()
+
+    def get_metrics(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "recording": len(self.writers),
+            "queued": len(self.queue),
+            "recorded_frames": self.recorded,
+            "dropped_frames": self.dropped,
+            "bytes_written": self.bytes_written,
+            "flushes": self.flushes
+        }
+
+replay_recorder = ReplayRecorder()
@@ -0,0 +1,83 @@
+from django.db import transaction
+from django.db.models import F
+from core.apps.authentication.models import Player, Match
+from core.apps.authentication.cache import player_cache
+from core.batch_writer import BatchWriter
+from .config import RESULTS_CONFIG
+from dataclasses import dataclass
+from typing import Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+STAT_FIELDS = ('wins', 'losses', 't_games', 'goals_f', 'goals_a', 't_points')
+
+@dataclass(slots=True)
+class MatchResult:
+    player1: str
+    player2: str
+    winner: str
+    score_player1: int
+    score_player2: int
+
+def stat_deltas(results: List[MatchResult]) -> Dict[str, Dict[str, int]]:
+    """Sum the leaderboard changes of a batch of results per player"""
+    deltas: Dict[str, Dict[str, int]] = {}
+    for result in results:
+        for player, scored, conceded in (
+            (result.player1, result.score_player1, result.score_player2),
+            (result.player2, result.score_player2, result.score_player1)
+        ):
+            won = player == result.winner
+            delta = deltas.setdefault(player, dict.fromkeys(STAT_FIELDS, 0))
+            delta['wins'] += won
+            delta['losses'] += not won
+            delta['t_games'] += 1
+            delta['goals_f'] += scored
+            delta['goals_a'] += conceded
+            delta['t_points'] += 3 if won else -1
+    return deltas
+
+class MatchResultWriter(BatchWriter):
+    """
+    Persists finished matches off the game loop. Results are queued and
+    written in batches, in one transaction: a bulk insert of the Match rows
+    and a single F() update per player, so concurrent results never
+    overwrite each other's counters.
+    """
+
+    config = RESULTS_CONFIG
+    logger = logger
+
+    def submit(self, player1: str, player2: str, winner: str, score_player1: int, score_player2: int) -> None:
+        self.enqueue(MatchResult(player1, player2, winner, score_player1, score_player2))
+
+    def write(self, batch: List[MatchResult]) -> None:
+        usernames = {username for result in batch for username in (result.player1, result.player2)}
+        with transaction.atomic():
+            players = Player.objects.in_bulk(list(usernames), field_name='username')
+            batch = [result for result in batch if result.player1 in players and result.player2 in players]
+            Match.objects.bulk_create([
+                Match(
+                    player1=players[result.player1],
+                    player2=players[result.player2],
+                    winner=players[result.winner],
+                    loser=players[result.player2 if result.winner == result.player1 else result.player1],
+                    score_player1=result.score_player1,
+                    score_player2=result.score_player2
+                )
+                for result in batch
+            ])
+            for username, delta in stat_deltas(batch).items():
+                Player.objects.filter(pk=players[username].pk).update(
+                    **{field: F(field) + value for field, value in delta.items()}
+                )
+        player_cache.invalidate(usernames)
+
+    def describe(self, result: MatchResult) -> str:
+        return (
+            f"match result {result.player1} vs {result.player2} winner={result.winner} "
+            f"score={result.score_player1}-{result.score_player2}"
+        )
+
+result_writer = MatchResultWriter()
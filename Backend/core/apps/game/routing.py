@@ -2,6 +2,7 @@ from django.urls import re_path
 from . import consumers
 
 websocket_urlpatterns = [
+    re_path(r'ws/game/spectate/(?P<group_id>[\w.@+-]+)/$', consumers.SpectatorConsumer.as_asgi()),
     re_path(r'ws/game/', consumers.GameConsumer.as_asgi()),
     re_path(r'ws/tournament/', consumers.TournamentConsumer.as_asgi()),
 ]
@@ -0,0 +1,171 @@
+from .game_models import *
+from .managers import GameManager
+from .batch_physics import BatchPhysicsEngine, np
+from .config import GAME_CONSTANTS, SCHEDULER_CONFIG
+from collections import deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+import asyncio
+import logging
+import random
+import threading
+
+logger = logging.getLogger(__name__)
+
+class GameScheduler:
+    """
+    Owns every live GameState of this process and advances all of them
+    from a single fixed-timestep loop.
+
+    The host registered with a match must provide broadcast_game_state()
+    and check_win_condition(), like GameConsumer does. clock and rng can be
+    replaced to drive the scheduler deterministically (see simulation.py).
+    """
+
+    def __init__(self, tick: float = GAME_CONSTANTS['FRAME_TIME'], clock=time.perf_counter,
+                 rng=random, batch: bool = SCHEDULER_CONFIG['BATCH_PHYSICS']):
+        self.tick = tick
+        self.clock = clock
+        self.rng = rng
+        self.games: Dict[str, GameState] = {}
+        self.hosts: Dict[str, Any] = {}
+        self.tick_durations = deque(maxlen=SCHEDULER_CONFIG['METRICS_WINDOW'])
+        # get_metrics() runs in a sync view thread while the loop appends
+        self.metrics_lock = threading.Lock()
+        self.finishing: Set[asyncio.Task] = set()
+        self.ticks = 0
+        self.catchup_ticks = 0
+        self.dropped_ticks = 0
+        self._task: Optional[asyncio.Task] = None
+        self.engine = BatchPhysicsEngine() if batch and np is not None else None
+
+    def add_match(self, group_id: str, host) -> None:
+        game = self.games.get(group_id)
+        if not game:
+            return
+        self.hosts[group_id] = host
+        if not self._task or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    def remove_match(self, group_id: str) -> None:
+        self.hosts.pop(group_id, None)
+
+    async def run(self) -> None:
+        C = SCHEDULER_CONFIG
+        next_tick = self.clock()
+
+        while self.hosts:
+            now = self.clock()
+            if now < next_tick:
+                await asyncio.sleep(next_tick - now)
+                continue
+
+            # Late wakeups are caught up with extra simulation steps, but never
+            # more than MAX_CATCHUP_TICKS: anything beyond that is dropped so an
+            # overloaded worker degrades instead of spiralling.
+            behind = int((now - next_tick) / self.tick) + 1
+            steps = min(behind, C['MAX_CATCHUP_TICKS'])
+            self.catchup_ticks += steps - 1
+            self.dropped_ticks += behind - steps
+
+            started = self.clock()
+            try:
+                await self.tick_all(steps)
+            except Exception:
+                logger.exception("Game scheduler tick failed")
+            with self.metrics_lock:
+                self.tick_durations.append(self.clock() - started)
+            self.ticks += 1
+
+            next_tick += behind * self.tick
+
+    async def tick_all(self, steps: int) -> None:
+        running: List[Tuple[str, GameState]] = []
+        for group_id in list(self.hosts):
+            game = self.games.get(group_id)
+            if not game or not game.is_running:
+                self.remove_match(group_id)
+                continue
+            running.append((group_id, game))
+
+        if self.engine:
+            finished = self.step_batch(running, steps)
+        else:
+            finished = self.step_each(running, steps)
+
+        broadcasts = []
+        for group_id, game in running:
+            host = self.hosts[group_id]
+            if group_id in finished:
+                self.remove_match(group_id)
+                task = asyncio.create_task(host.check_win_condition(game, group_id))
+                self.finishing.add(task)
+                task.add_done_callback(self.finished_match)
+            else:
+                broadcasts.append(host.broadcast_game_state(group_id, game))
+
+        if broadcasts:
+            await asyncio.gather(*broadcasts)
+
+    def step_each(self, running: List[Tuple[str, GameState]], steps: int) -> Set[str]:
+        finished = set()
+        for group_id, game in running:
+            GameManager.apply_inputs(game)
+            for _ in range(steps):
+                GameManager.update_paddle_positions(game, self.tick)
+                if GameManager.step_ball(game, self.tick, self.rng) and GameManager.has_winner(game):
+                    finished.add(group_id)
+                    break
+        return finished
+
+    def step_batch(self, running: List[Tuple[str, GameState]], steps: int) -> Set[str]:
+        games = [game for _, game in running]
+        for game in games:
+            GameManager.apply_inputs(game)
+
+        self.engine.load(games)
+        finished = set()
+        for _ in range(steps):
+            for i in self.engine.step(self.tick, rng=self.rng):
+                if self.engine.has_winner(i):
+                    self.engine.active[i] = False
+                    finished.add(running[i][0])
+        self.engine.store(games)
+        return finished
+
+    def finished_match(self, task: asyncio.Task) -> None:
+        self.finishing.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error("Finishing a match failed", exc_info=task.exception())
+
+    def get_metrics(self) -> dict:
+        with self.metrics_lock:
+            durations = list(self.tick_durations)
+        durations.sort()
+        budget = self.tick * 1000
+        matches = len(self.hosts)
+
+        if durations:
+            avg = sum(durations) / len(durations) * 1000
+            p99 = durations[min(len(durations) - 1, int(len(durations) * 0.99))] * 1000
+            worst = durations[-1] * 1000
+        else:
+            avg = p99 = worst = 0.0
+
+        return {
+            "matches": matches,
+            "tick_rate": round(1 / self.tick),
+            "physics": "batch" if self.engine else "object",
+            "tick_budget_ms": budget,
+            "tick_ms": {
+                "avg": round(avg, 3),
+                "p99": round(p99, 3),
+                "max": round(worst, 3)
+            },
+            "load": round(avg / budget, 3),
+            "estimated_capacity": int(matches * budget / avg) if matches and avg else None,
+            "ticks": self.ticks,
+            "catchup_ticks": self.catchup_ticks,
+            "dropped_ticks": self.dropped_ticks
+        }
+
+game_scheduler = GameScheduler()
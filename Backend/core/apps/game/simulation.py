@@ -0,0 +1,113 @@
+from .game_models import *
+from .managers import GameManager
+from .scheduler import GameScheduler
+from .protocol import pack_state
+from .config import GAME_CONSTANTS
+from typing import Dict, List, Tuple
+import hashlib
+import random
+
+class SimulationClock:
+    """Clock that only moves when advanced, in seconds"""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+class PaddleBot:
+    """
+    Scripted player. Every REACTION ticks it aims at the ball with a random
+    error of up to AIM_ERROR, which is enough to miss now and then so that
+    matches end.
+    """
+
+    REACTION = 8
+    AIM_ERROR = 900
+
+    def __init__(self, player: str, rng: random.Random):
+        self.player = player
+        self.rng = rng
+        self.target = 0.0
+        self.direction = Direction.NONE
+        self.seq = 0
+
+    def think(self, game: GameState, tick: int, now: float) -> None:
+        if tick % self.REACTION == 0:
+            self.target = game.ball_position.y + self.rng.uniform(-self.AIM_ERROR, self.AIM_ERROR)
+
+        offset = self.target - game.paddle_positions[self.player].y
+        step = GAME_CONSTANTS['PADDLE_SPEED'] * GAME_CONSTANTS['FRAME_TIME']
+        direction = Direction.NONE if abs(offset) < step else (Direction.DOWN if offset > 0 else Direction.UP)
+        if direction is not self.direction:
+            self.direction = direction
+            self.seq += 1
+            GameManager.queue_input(game, self.player, direction, self.seq, received_at=now)
+
+class Simulation:
+    """
+    Headless run of many matches through the scheduler's tick logic, with a
+    SimulationClock and a seeded RNG instead of wall-clock time and the
+    global random module. Runs as fast as the CPU allows and gives the same
+    result for the same seed.
+    """
+
+    def __init__(self, matches: int, seed: int = 0, batch: bool = False):
+        self.rng = random.Random(seed)
+        self.clock = SimulationClock()
+        self.scheduler = GameScheduler(clock=self.clock, rng=self.rng, batch=batch)
+        self.running: List[Tuple[str, GameState]] = []
+        self.bots: Dict[str, Tuple[PaddleBot, PaddleBot]] = {}
+        self.finished: Dict[str, int] = {}
+        self.tick_count = 0
+
+        for i in range(matches):
+            group_id = f"sim{i}a_sim{i}b"
+            game = GameManager.create_initial_state(f"sim{i}a", f"sim{i}b", self.rng)
+            game.is_running = True
+            self.scheduler.games[group_id] = game
+            self.running.append((group_id, game))
+            self.bots[group_id] = (PaddleBot(f"sim{i}a", self.rng), PaddleBot(f"sim{i}b", self.rng))
+
+    def step(self) -> None:
+        """One tick: bot inputs, the scheduler step, and a frame pack per match"""
+        now = self.clock()
+        for group_id, game in self.running:
+            for bot in self.bots[group_id]:
+                bot.think(game, self.tick_count, now)
+
+        if self.scheduler.engine:
+            finished = self.scheduler.step_batch(self.running, 1)
+        else:
+            finished = self.scheduler.step_each(self.running, 1)
+
+        for group_id, game in self.running:
+            game.frame_seq += 1
+            pack_state(game, game.frame_seq)
+
+        if finished:
+            for group_id in finished:
+                self.scheduler.games[group_id].is_running = False
+                self.finished[group_id] = self.tick_count
+            self.running = [(g, game) for g, game in self.running if g not in finished]
+
+        self.tick_count += 1
+        self.clock.advance(self.scheduler.tick)
+
+    def run(self, max_ticks: int) -> int:
+        """Step until every match has a winner or max_ticks. Returns the ticks run"""
+        start = self.tick_count
+        while self.running and self.tick_count - start < max_ticks:
+            self.step()
+        return self.tick_count - start
+
+    def digest(self) -> str:
+        """Hash of every match's current state, to compare runs"""
+        h = hashlib.sha256()
+        for group_id in sorted(self.scheduler.games):
+            h.update(pack_state(self.scheduler.games[group_id], 0))
+        return h.hexdigest()[:16]
@@ -0,0 +1,169 @@
+from django.conf import settings
+from django.core.cache import cache
+from .game_models import *
+from .managers import GameManager
+from .protocol import pack_state, unpack_state
+from .registry import match_registry
+from .scheduler import game_scheduler
+from .config import GAME_CONSTANTS, SNAPSHOT_CONFIG
+from pathlib import Path
+from typing import Dict, List, Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+def snapshot_game(group_id: str, game: GameState) -> dict:
+    """Compact copy of a live match: players, packed state and tournament data"""
+    p1, p2 = sorted(game.player_labels, key=game.player_labels.__getitem__)
+    return {
+        'group': group_id,
+        'players': [p1, p2],
+        'state': pack_state(game, game.frame_seq).hex(),
+        'tournament_data': dict(game.tournament_data) if game.tournament_data else None,
+        'taken_at': time.time()
+    }
+
+def restore_game(snapshot: dict) -> GameState:
+    """Rebuild a paused GameState from snapshot_game() output"""
+    C = GAME_CONSTANTS
+    p1, p2 = snapshot['players']
+    (seq, _, y1, _, y2, _, _, bx, by, bdx, bdy,
+     score_left, score_right, input1, input2) = unpack_state(bytes.fromhex(snapshot['state']))
+
+    game = GameManager.create_initial_state(p1, p2)
+    for player, y in ((p1, y1), (p2, y2)):
+        game.paddle_positions[player].y = y
+        game.paddle_boxes[player]["min"].y = y - C['PADDLE_HEIGHT']
+        game.paddle_boxes[player]["max"].y = y + C['PADDLE_HEIGHT']
+    game.ball_position.set(bx, by, 0)
+    game.ball_direction.set(bdx, bdy, 0)
+    game.score_left = score_left
+    game.score_right = score_right
+    game.last_input_seq = {p1: input1, p2: input2}
+    game.frame_seq = seq
+    game.tournament_data = snapshot['tournament_data']
+    game.is_running = False
+    game.restored = True
+    return game
+
+class CacheSnapshotStore:
+    """Snapshots in the Django cache (Redis), readable from every worker"""
+
+    def save_many(self, snapshots: List[dict]) -> None:
+        values = {}
+        for snapshot in snapshots:
+            values[f"game:snapshot:{snapshot['group']}"] = snapshot
+            for player in snapshot['players']:
+                values[f"game:snapshot:player:{player}"] = snapshot['group']
+        cache.set_many(values, SNAPSHOT_CONFIG['RESUME_WINDOW'])
+
+    def load_for_player(self, username: str) -> Optional[dict]:
+        group_id = cache.get(f"game:snapshot:player:{username}")
+        return cache.get(f"game:snapshot:{group_id}") if group_id else None
+
+    def delete(self, group_id: str, players: List[str]) -> None:
+        cache.delete_many([f"game:snapshot:{group_id}"] + [f"game:snapshot:player:{p}" for p in players])
+
+class FileSnapshotStore:
+    """
+    Snapshots as JSON files on local disk, for deployments without a shared
+    cache. Only a worker on the same host can resume from them.
+    """
+
+    def __init__(self, directory: Optional[Path] = None):
+        self.directory = Path(directory or Path(settings.BASE_DIR) / SNAPSHOT_CONFIG['DIRECTORY'])
+
+    def save_many(self, snapshots: List[dict]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for snapshot in snapshots:
+            path = self.directory / f"{snapshot['group']}.json"
+            temporary = path.with_suffix('.tmp')
+            temporary.write_text(json.dumps(snapshot))
+            temporary.replace(path)
+            for player in snapshot['players']:
+                (self.directory / f"player-{player}").write_text(snapshot['group'])
+
+    def load_for_player(self, username: str) -> Optional[dict]:
+        try:
+            group_id = (self.directory / f"player-{username}").read_text()
+            snapshot = json.loads((self.directory / f"{group_id}.json").read_text())
+        except (OSError, ValueError):
+            return None
+        if time.time() - snapshot['taken_at'] > SNAPSHOT_CONFIG['RESUME_WINDOW']:
+            return None
+        return snapshot
+
+    def delete(self, group_id: str, players: List[str]) -> None:
+        for path in [self.directory / f"{group_id}.json"] + [self.directory / f"player-{p}" for p in players]:
+            path.unlink(missing_ok=True)
+
+class SnapshotWriter:
+    """
+    Every SNAPSHOT_CONFIG['INTERVAL'] seconds, copies the live matches owned
+    by this worker and writes them from a thread, so the tick never waits on
+    Redis or the disk. A snapshot lives for RESUME_WINDOW seconds: a match
+    can be resumed on any worker within that window after its host died.
+    """
+
+    def __init__(self, registry, games: Dict[str, GameState], store=None):
+        if store is None:
+            store = FileSnapshotStore() if SNAPSHOT_CONFIG['BACKEND'] == 'disk' else CacheSnapshotStore()
+        self.registry = registry
+        self.games = games
+        self.store = store
+        self.ended: Dict[str, List[str]] = {}
+        self.written = 0
+        self.resumed = 0
+        self.last_write_ms = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if not self._task or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(SNAPSHOT_CONFIG['INTERVAL'])
+            ended, self.ended = self.ended, {}
+            snapshots = []
+            for group_id in list(self.registry.hosts):
+                game = self.games.get(group_id)
+                if game and (game.is_running or game.restored or game.disconnected) and group_id not in ended:
+                    snapshots.append(snapshot_game(group_id, game))
+            if not snapshots and not ended:
+                continue
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(self.write, snapshots, ended)
+                self.written += len(snapshots)
+            except Exception:
+                logger.exception("Game snapshot failed")
+            self.last_write_ms = (time.perf_counter() - started) * 1000
+
+    def write(self, snapshots: List[dict], ended: Dict[str, List[str]]) -> None:
+        if snapshots:
+            self.store.save_many(snapshots)
+        for group_id, players in ended.items():
+            self.store.delete(group_id, players)
+
+    async def load_for_player(self, username: str) -> Optional[dict]:
+        return await asyncio.to_thread(self.store.load_for_player, username)
+
+    def discard(self, group_id: str, game: GameState) -> None:
+        """
+        Forget the snapshot of a match that ended. The delete goes through the
+        writer so it cannot race with a write of the same match.
+        """
+        self.ended[group_id] = list(game.player_labels)
+        self.start()
+
+    def get_metrics(self) -> dict:
+        return {
+            "backend": type(self.store).__name__,
+            "written": self.written,
+            "resumed": self.resumed,
+            "last_write_ms": round(self.last_write_ms, 3)
+        }
+
+snapshot_writer = SnapshotWriter(match_registry, game_scheduler.games)
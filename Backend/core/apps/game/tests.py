@@ -1,3 +1,394 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from unittest import mock, skipUnless
+from pathlib import Path
+import asyncio
+import copy
+import random
+import tempfile
 
-# Create your tests here.
+from .batch_physics import BatchPhysicsEngine, np
+from .brackets import BYE, Bracket, DoubleElimination, SingleElimination, Swiss
+from .config import GAME_CONSTANTS, RESULTS_CONFIG
+from .consumers import FrameStreamConsumer
+from .game_models import Direction
+from .managers import GameManager
+from .matchmaking import LocalQueueStore, MatchmakingService, QueueEntry
+from .replay import ReplayRecorder
+from .results import MatchResult, MatchResultWriter
+from .protocol import MAX_INPUT_SEQ, input_seq, pack_state, unpack_state
+from .simulation import Simulation
+from .throttle import FrameThrottle
+from core.batch_writer import Pending
+
+class SimulationTests(TestCase):
+    MATCHES = 20
+    TICKS = 2000
+
+    def run_simulation(self, seed, batch=False):
+        sim = Simulation(self.MATCHES, seed, batch)
+        sim.run(self.TICKS)
+        return sim
+
+    def test_same_seed_same_digest(self):
+        first = self.run_simulation(7)
+        second = self.run_simulation(7)
+        self.assertEqual(first.tick_count, second.tick_count)
+        self.assertEqual(first.finished, second.finished)
+        self.assertEqual(first.digest(), second.digest())
+
+    def test_different_seed_different_digest(self):
+        self.assertNotEqual(self.run_simulation(7).digest(), self.run_simulation(8).digest())
+
+    @skipUnless(np, "numpy is not installed")
+    def test_batch_engine_matches_object_engine(self):
+        objects = self.run_simulation(7)
+        batch = self.run_simulation(7, batch=True)
+        self.assertIsNotNone(batch.scheduler.engine)
+        self.assertEqual(objects.finished, batch.finished)
+        self.assertEqual(objects.digest(), batch.digest())
+
+class ProtocolTests(TestCase):
+    def test_input_seq_range(self):
+        self.assertEqual(input_seq("12"), 12)
+        self.assertEqual(input_seq(MAX_INPUT_SEQ), MAX_INPUT_SEQ)
+        for seq in (-1, MAX_INPUT_SEQ + 1, 2 ** 64):
+            with self.assertRaises(ValueError):
+                input_seq(seq)
+
+    def test_largest_input_seq_packs(self):
+        game = GameManager.create_initial_state("a", "b")
+        GameManager.queue_input(game, "a", Direction.UP, input_seq(MAX_INPUT_SEQ))
+        GameManager.apply_inputs(game)
+        self.assertEqual(unpack_state(pack_state(game, 1))[-2], MAX_INPUT_SEQ)
+
+class FrameThrottleTests(TestCase):
+    TICK = GAME_CONSTANTS['FRAME_TIME']
+
+    def arrivals(self, throttle, frames):
+        """is_stale for each (arrival time, seq)"""
+        stale = []
+        with mock.patch('core.apps.game.throttle.time.monotonic') as monotonic:
+            for arrived, seq in frames:
+                monotonic.return_value = arrived
+                stale.append(throttle.is_stale(seq))
+        return stale
+
+    def test_frames_on_time_are_not_stale(self):
+        frames = [(1000 + seq * self.TICK, seq) for seq in range(1, 100)]
+        self.assertFalse(any(self.arrivals(FrameThrottle(), frames)))
+
+    def test_backlog_is_stale(self):
+        on_time = [(1000 + seq * self.TICK, seq) for seq in range(1, 10)]
+        # Half a second of frames delivered at once
+        backlog = [(1000 + 40 * self.TICK + seq * 0.0001, seq) for seq in range(10, 40)]
+        throttle = FrameThrottle()
+        stale = self.arrivals(throttle, on_time + backlog)
+        # The first frame of the backlog could start a steady delay, and the
+        # last one is the freshest frame there is
+        self.assertFalse(any(stale[:10]))
+        self.assertTrue(all(stale[10:30]))
+        self.assertFalse(stale[-1])
+        self.assertGreater(throttle.skipped, 0)
+
+    def test_steady_delay_and_new_stream_are_not_stale(self):
+        throttle = FrameThrottle()
+        frames = [(1000 + seq * self.TICK, seq) for seq in range(1, 10)]
+        frames += [(1001 + seq * self.TICK, seq) for seq in range(10, 20)]
+        frames += [(1002 + seq * self.TICK, seq) for seq in range(1, 10)]
+        self.assertFalse(any(self.arrivals(throttle, frames)))
+
+@skipUnless(np, "numpy is not installed")
+class FrameCoalescingTests(TestCase):
+    class Consumer(FrameStreamConsumer):
+        def __init__(self):
+            super().__init__()
+            self.sent = []
+            self.release = asyncio.Event()
+
+        async def send_frame(self, frame):
+            await self.release.wait()
+            self.sent.append(frame.state[0])
+
+    def test_frames_dispatched_one_at_a_time_are_coalesced(self):
+        async def run():
+            consumer = self.Consumer()
+            game = GameManager.create_initial_state("a", "b")
+            with mock.patch.object(FrameThrottle, 'is_stale', return_value=False):
+                # Like channel layer dispatch: each handler call is awaited before the next
+                for seq in range(1, 5):
+                    await consumer.game_frame({'frame': pack_state(game, seq)})
+                    await asyncio.sleep(0)
+            consumer.release.set()
+            await consumer.frame_task
+            return consumer
+
+        consumer = asyncio.run(run())
+        self.assertEqual(consumer.sent, [1, 4])
+        self.assertEqual(consumer.throttle.coalesced, 2)
+
+class BatchPhysicsTests(TestCase):
+    MATCHES = 50
+    TICKS = 1500
+
+    def choose_direction(self, rng, game, player):
+        """Chase the ball half of the time so that paddles get hit, random otherwise"""
+        if rng.random() < 0.5:
+            offset = game.ball_position.y - game.paddle_positions[player].y
+            return Direction.DOWN if offset > 0 else Direction.UP
+        return rng.choice(list(Direction))
+
+    def test_paddle_inputs_match_object_engine(self):
+        C = GAME_CONSTANTS
+        dt = C['FRAME_TIME']
+        max_y = C['COURT_HEIGHT'] - C['PADDLE_HEIGHT']
+        inputs = random.Random(3)
+        games = [GameManager.create_initial_state(f"p{i}a", f"p{i}b", inputs) for i in range(self.MATCHES)]
+        for game in games:
+            game.is_running = True
+        batch_games = copy.deepcopy(games)
+        engine = BatchPhysicsEngine(self.MATCHES)
+        object_rng, batch_rng = random.Random(5), random.Random(5)
+        hits = clamped = 0
+
+        for tick in range(self.TICKS):
+            for game, batch_game in zip(games, batch_games):
+                for player in game.paddle_directions:
+                    direction = self.choose_direction(inputs, game, player)
+                    game.paddle_directions[player] = direction
+                    batch_game.paddle_directions[player] = direction
+
+            for game in games:
+                score = (game.score_left, game.score_right)
+                moving_right = game.ball_direction.x > 0
+                GameManager.update_paddle_positions(game, dt)
+                scored = GameManager.step_ball(game, dt, object_rng)
+                if not scored and (game.ball_direction.x > 0) != moving_right:
+                    hits += 1
+                clamped += sum(abs(p.y) == max_y for p in game.paddle_positions.values())
+
+            engine.load(batch_games)
+            engine.step(dt, rng=batch_rng)
+            engine.store(batch_games)
+
+            for game, batch_game in zip(games, batch_games):
+                self.assertEqual((game.score_left, game.score_right),
+                                 (batch_game.score_left, batch_game.score_right), f"tick {tick}")
+                self.assertAlmostEqual(game.ball_position.x, batch_game.ball_position.x, places=6)
+                self.assertAlmostEqual(game.ball_position.y, batch_game.ball_position.y, places=6)
+                self.assertAlmostEqual(game.ball_direction.x, batch_game.ball_direction.x, places=6)
+                self.assertAlmostEqual(game.ball_direction.y, batch_game.ball_direction.y, places=6)
+                for player, position in game.paddle_positions.items():
+                    self.assertAlmostEqual(position.y, batch_game.paddle_positions[player].y, places=6)
+                    self.assertAlmostEqual(game.paddle_boxes[player]["min"].y,
+                                           batch_game.paddle_boxes[player]["min"].y, places=6)
+
+        self.assertGreater(hits, 0)
+        self.assertGreater(clamped, 0)
+
+class BracketTests(TestCase):
+    def players(self, count):
+        return [f"p{i}" for i in range(count)]
+
+    def match(self, bracket, label):
+        return next(match for match in bracket.matches if match.label == label)
+
+    def report(self, bracket, label, winner):
+        return [match.label for match in bracket.report(self.match(bracket, label).index, winner)]
+
+    def test_bracket_is_abstract(self):
+        with self.assertRaises(TypeError):
+            Bracket(self.players(2))
+
+    def test_single_elimination_byes_go_to_top_seeds(self):
+        bracket = SingleElimination(self.players(5))
+        ready = bracket.start()
+        self.assertEqual([match.players for match in ready], [["p3", "p4"], ["p1", "p2"]])
+        self.assertEqual([match.winner for match in bracket.matches[:4]], ["p0", None, "p1", "p2"])
+        self.assertEqual(self.match(bracket, "semi1").players, ["p0", None])
+        self.assertIn(BYE, bracket.matches[0].players)
+
+    def test_single_elimination_to_champion(self):
+        bracket = SingleElimination(self.players(3))
+        self.assertEqual([match.label for match in bracket.start()], ["semi2"])
+        self.assertEqual(self.report(bracket, "semi2", "p2"), ["finals"])
+        self.assertEqual(self.match(bracket, "finals").players, ["p0", "p2"])
+        self.assertEqual(self.report(bracket, "finals", "p2"), [])
+        self.assertTrue(bracket.finished)
+        self.assertEqual(bracket.champion, "p2")
+
+    def test_single_elimination_rejects_unknown_results(self):
+        bracket = SingleElimination(self.players(4))
+        bracket.start()
+        with self.assertRaises(ValueError):
+            self.report(bracket, "semi1", "p1")
+        with self.assertRaises(ValueError):
+            self.report(bracket, "finals", "p0")
+
+    def start_double_elimination(self):
+        bracket = DoubleElimination(self.players(4))
+        self.assertEqual([match.players for match in bracket.start()], [["p0", "p3"], ["p1", "p2"]])
+        self.assertEqual(self.report(bracket, "w1m1", "p0"), [])
+        self.assertEqual(sorted(self.report(bracket, "w1m2", "p1")), ["l1m1", "w2m1"])
+        self.assertEqual(self.match(bracket, "l1m1").players, ["p3", "p2"])
+        return bracket
+
+    def test_double_elimination_losers_drop_in(self):
+        bracket = self.start_double_elimination()
+        self.assertEqual(self.report(bracket, "l1m1", "p2"), [])
+        self.assertEqual(self.report(bracket, "w2m1", "p0"), ["l2m1"])
+        self.assertEqual(self.match(bracket, "l2m1").players, ["p2", "p1"])
+        self.assertEqual(self.report(bracket, "l2m1", "p1"), ["finals"])
+        self.assertEqual(self.match(bracket, "finals").players, ["p0", "p1"])
+
+    def test_double_elimination_grand_final_without_reset(self):
+        bracket = self.start_double_elimination()
+        for label, winner in (("l1m1", "p2"), ("w2m1", "p0"), ("l2m1", "p1")):
+            self.report(bracket, label, winner)
+        self.assertEqual(self.report(bracket, "finals", "p0"), [])
+        self.assertEqual(bracket.champion, "p0")
+        self.assertEqual(self.match(bracket, "reset").players, [None, None])
+
+    def test_double_elimination_grand_final_reset(self):
+        bracket = self.start_double_elimination()
+        for label, winner in (("l1m1", "p2"), ("w2m1", "p0"), ("l2m1", "p1")):
+            self.report(bracket, label, winner)
+        self.assertEqual(self.report(bracket, "finals", "p1"), ["reset"])
+        self.assertFalse(bracket.finished)
+        self.assertEqual(self.match(bracket, "reset").players, ["p0", "p1"])
+        self.assertEqual(self.report(bracket, "reset", "p1"), [])
+        self.assertEqual(bracket.champion, "p1")
+
+    def play_swiss(self, bracket):
+        """Plays every round with the better seed winning. Returns the pairings of each round"""
+        rounds = []
+        ready = bracket.start()
+        while ready:
+            rounds.append([tuple(match.players) for match in ready])
+            next_round = []
+            for match in ready:
+                next_round += bracket.report(match.index, min(match.players, key=bracket.seed.get))
+            ready = next_round
+        return rounds
+
+    def test_swiss_pairs_without_rematches(self):
+        bracket = Swiss(self.players(8))
+        rounds = self.play_swiss(bracket)
+        self.assertEqual(len(rounds), 3)
+        pairs = [frozenset(pair) for pairings in rounds for pair in pairings]
+        self.assertEqual(len(pairs), len(set(pairs)))
+        for pairings in rounds:
+            self.assertEqual(sorted(p for pair in pairings for p in pair), self.players(8))
+        self.assertEqual(bracket.champion, "p0")
+        self.assertEqual(bracket.champion, bracket.standings()[0])
+
+    def test_swiss_gives_each_bye_once(self):
+        bracket = Swiss(self.players(5))
+        rounds = self.play_swiss(bracket)
+        self.assertEqual(len(rounds), 3)
+        self.assertEqual(len(bracket.byes), 3)
+        for pairings in rounds:
+            seated = {p for pair in pairings for p in pair}
+            self.assertEqual(len(seated), 4)
+        pairs = [frozenset(pair) for pairings in rounds for pair in pairings]
+        self.assertEqual(len(pairs), len(set(pairs)))
+        self.assertTrue(bracket.finished)
+
+class MatchmakingTests(TestCase):
+    class Layer:
+        def __init__(self):
+            self.sent = []
+
+        async def send(self, channel, message):
+            self.sent.append((channel, message))
+
+    def test_prunes_entries_of_dead_workers_before_pairing(self):
+        store = LocalQueueStore()
+        store.alive = lambda workers: [worker for worker in workers if worker != 'dead']
+        layer = self.Layer()
+        service = MatchmakingService(store=store, clock=lambda: 0.0, channel_layer=layer)
+        store.add(QueueEntry('alice', 'a', 0, 0.0, 'dead'))
+        store.add(QueueEntry('bob', 'b', 0, 0.0, 'live'))
+        store.add(QueueEntry('carol', 'c', 0, 0.0, 'live'))
+
+        self.assertEqual(asyncio.run(service.pair_round()), 1)
+        self.assertEqual(store.count(), 0)
+        self.assertEqual(service.get_metrics()['pruned'], 1)
+        self.assertEqual(layer.sent[0][1]['players'], ['bob', 'carol'])
+
+class MetricsViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('game_metrics')
+
+    def test_requires_staff(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        player = get_user_model().objects.create_user(username='player', password='x')
+        self.client.force_authenticate(player)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_staff_gets_metrics(self):
+        admin = get_user_model().objects.create_user(username='admin', password='x', is_staff=True)
+        self.client.force_authenticate(admin)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('tick_ms', response.json()['scheduler'])
+
+class MatchResultWriterTests(TestCase):
+    def test_drops_after_max_attempts(self):
+        writer = MatchResultWriter()
+        writer.queue.append(Pending(MatchResult('alice', 'bob', 'alice', 5, 3)))
+        with mock.patch.object(MatchResultWriter, 'write', side_effect=RuntimeError('database is down')):
+            with self.assertLogs('core.apps.game.results', level='WARNING') as logs:
+                for _ in range(RESULTS_CONFIG['MAX_ATTEMPTS'] + 1):
+                    self.assertEqual(asyncio.run(writer.flush()), 0)
+
+        self.assertEqual(len(writer.queue), 0)
+        self.assertEqual(writer.get_metrics()['dropped'], 1)
+        self.assertIn('database is down', logs.output[0])
+        self.assertIn('alice vs bob winner=alice score=5-3', logs.output[-1])
+
+class ReplayTests(TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.recorder = ReplayRecorder(self.directory, enabled=True)
+
+    async def record_match(self, frames):
+        game = GameManager.create_initial_state("alice", "bob", random.Random(1))
+        for seq in range(1, frames + 1):
+            GameManager.step_ball(game, GAME_CONSTANTS['FRAME_TIME'])
+            self.recorder.record("alice_bob", pack_state(game, seq))
+        replay_id = self.recorder.finish("alice_bob")
+        await self.recorder._task
+        return replay_id
+
+    async def read(self, replay_id, from_seq=0):
+        return b"".join([chunk async for chunk in self.recorder.stream(replay_id, from_seq)])
+
+    def test_rematch_gets_its_own_replay(self):
+        async def play_twice():
+            first = await self.record_match(200)
+            second = await self.record_match(100)
+            return first, second, await self.read(first), await self.read(second)
+
+        first, second, first_data, second_data = asyncio.run(play_twice())
+        self.assertNotEqual(first, second)
+        self.assertTrue(first.startswith("alice_bob_"))
+        self.assertEqual(first_data, self.recorder.path(first).read_bytes())
+        self.assertEqual(second_data, self.recorder.path(second).read_bytes())
+        self.assertGreater(len(first_data), len(second_data))
+        # The second match's index starts over, so seeking stays inside its own file
+        self.assertLess(self.recorder.seek(second, 150), len(second_data))
+
+    def test_stream_starts_at_keyframe(self):
+        async def play():
+            replay_id = await self.record_match(200)
+            return replay_id, await self.read(replay_id, 150)
+
+        replay_id, tail = asyncio.run(play())
+        data = self.recorder.path(replay_id).read_bytes()
+        offset = self.recorder.seek(replay_id, 150)
+        self.assertGreater(offset, 0)
+        self.assertEqual(tail, data[offset:])
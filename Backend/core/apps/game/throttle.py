@@ -0,0 +1,93 @@
+from .config import GAME_CONSTANTS, BROADCAST_CONFIG
+from typing import Optional
+import time
+
+class FrameThrottle:
+    """
+    Per-connection send-rate control for game frames.
+
+    Frames from a backlog are skipped, only every interval-th frame is
+    sent, and the interval backs off while the client stops acking (it is
+    not keeping up) and recovers once acks flow again.
+    """
+
+    def __init__(self, min_interval: int = 1):
+        self.min_interval = min_interval
+        self.interval = min_interval
+        self.last_ack = time.monotonic()
+        self.last_adapt = self.last_ack
+        self.skipped = 0
+        self.coalesced = 0
+        self.last_arrival = 0.0
+        self.last_seq: Optional[int] = None
+        self.base_offset = 0.0
+        self.delayed = False
+
+    @classmethod
+    def for_rate(cls, snapshot_rate) -> 'FrameThrottle':
+        tick_rate = 1 / GAME_CONSTANTS['FRAME_TIME']
+        try:
+            interval = round(tick_rate / float(snapshot_rate))
+        except (TypeError, ValueError, ZeroDivisionError):
+            interval = 1
+        return cls(min(max(interval, 1), BROADCAST_CONFIG['MAX_SEND_INTERVAL']))
+
+    def is_stale(self, seq: int) -> bool:
+        """
+        Whether a frame comes out of a backlog, judged on this worker alone
+        since the host's clock is not comparable. Frames are one tick apart,
+        so arrival time minus seq ticks stays level while they flow. A frame
+        more than STALE_FRAME_AGE behind the best level seen, arriving
+        faster than the ticks between it and the previous one, is stale.
+        Two late frames in a row at the normal pace mean a steady delay and
+        set a new level; a seq that goes back starts a new stream.
+        """
+        now = time.monotonic()
+        offset = now - seq * GAME_CONSTANTS['FRAME_TIME']
+        previous_arrival, previous_seq = self.last_arrival, self.last_seq
+        self.last_arrival, self.last_seq = now, seq
+
+        if previous_seq is None or seq <= previous_seq:
+            self.base_offset = offset
+            self.delayed = False
+            return False
+        if offset - self.base_offset <= BROADCAST_CONFIG['STALE_FRAME_AGE']:
+            self.base_offset = min(self.base_offset, offset)
+            self.delayed = False
+            return False
+        if now - previous_arrival < (seq - previous_seq) * GAME_CONSTANTS['FRAME_TIME'] / 2:
+            self.skipped += 1
+            return True
+        if self.delayed:
+            self.base_offset = offset
+        self.delayed = True
+        return False
+
+    def should_send(self, seq: int) -> bool:
+        return seq % self.interval == 0
+
+    def on_ack(self) -> None:
+        self.last_ack = time.monotonic()
+
+    def adapt(self) -> bool:
+        """Re-evaluate the interval at most once per ADAPT_PERIOD. Returns True if it changed"""
+        C = BROADCAST_CONFIG
+        now = time.monotonic()
+        if now - self.last_adapt < C['ADAPT_PERIOD']:
+            return False
+        self.last_adapt = now
+
+        ack_age = now - self.last_ack
+        interval = self.interval
+        if ack_age > C['ACK_TIMEOUT'] * self.interval:
+            interval = min(self.interval * 2, C['MAX_SEND_INTERVAL'])
+        elif ack_age < C['ACK_TIMEOUT'] * self.interval / 2:
+            interval = max(self.interval // 2, self.min_interval)
+
+        changed = interval != self.interval
+        self.interval = interval
+        return changed
+
+    @property
+    def interval_ms(self) -> float:
+        return round(self.interval * GAME_CONSTANTS['FRAME_TIME'] * 1000, 1)
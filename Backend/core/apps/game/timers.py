@@ -0,0 +1,94 @@
+from .config import RECONNECT_CONFIG
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+Callback = Callable[[], Awaitable[None]]
+
+class TimerWheel:
+    """
+    Hashed timing wheel: every pending timeout lives in one of SLOTS
+    buckets, and a single task advances the wheel every RESOLUTION seconds
+    and fires the callbacks whose deadline has passed. Scheduling and
+    cancelling are O(1) and cost no task per timeout; a timeout fires at
+    most RESOLUTION seconds late.
+    """
+
+    def __init__(self, resolution: float = RECONNECT_CONFIG['TIMER_RESOLUTION'],
+                 slots: int = RECONNECT_CONFIG['TIMER_SLOTS'], clock=time.monotonic):
+        self.resolution = resolution
+        self.clock = clock
+        self.slots: List[Dict[Hashable, Tuple[float, Callback]]] = [{} for _ in range(slots)]
+        self.timers: Dict[Hashable, int] = {}
+        self.position = 0
+        self.started_at = clock()
+        self.fired = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def _slot(self, deadline: float) -> int:
+        tick = int((deadline - self.started_at) / self.resolution) + 1
+        return max(tick, self.position + 1) % len(self.slots)
+
+    def schedule(self, key: Hashable, delay: float, callback: Callback) -> None:
+        """Call callback() after delay seconds, replacing any timer with the same key"""
+        self.cancel(key)
+        now = self.clock()
+        if not self._task or self._task.done():
+            # The wheel stood still while idle: catch up without walking the slots
+            self.position = int((now - self.started_at) / self.resolution)
+            self._task = asyncio.create_task(self.run())
+        slot = self._slot(now + delay)
+        self.slots[slot][key] = (now + delay, callback)
+        self.timers[key] = slot
+
+    def cancel(self, key: Hashable) -> bool:
+        slot = self.timers.pop(key, None)
+        if slot is None:
+            return False
+        del self.slots[slot][key]
+        return True
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.timers
+
+    def __len__(self) -> int:
+        return len(self.timers)
+
+    async def run(self) -> None:
+        while self.timers:
+            await asyncio.sleep(self.resolution)
+            target = int((self.clock() - self.started_at) / self.resolution)
+            while self.position < target:
+                self.position += 1
+                self.advance(self.position % len(self.slots))
+
+    def advance(self, slot: int) -> None:
+        # Timers further away than one turn of the wheel share the slot
+        # with nearer ones and stay put until their deadline comes round.
+        now = self.clock()
+        bucket = self.slots[slot]
+        due = [key for key, (deadline, _) in bucket.items() if deadline <= now]
+        for key in due:
+            _, callback = bucket.pop(key)
+            del self.timers[key]
+            self.fired += 1
+            asyncio.create_task(self.fire(key, callback))
+
+    async def fire(self, key: Hashable, callback: Callback) -> None:
+        try:
+            await callback()
+        except Exception:
+            logger.exception("Timer %s failed", key)
+
+    def get_metrics(self) -> dict:
+        return {
+            "pending": len(self.timers),
+            "fired": self.fired,
+            "slots": len(self.slots),
+            "resolution": self.resolution
+        }
+
+reconnect_timers = TimerWheel()
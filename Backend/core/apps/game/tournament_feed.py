@@ -0,0 +1,165 @@
+from .game_models import *
+from core.apps.authentication.groups import user_group_name
+from typing import Dict, Iterable, Optional
+
+LOBBY_GROUP = 'tournament_lobby'
+
+def tournament_group(tournament_id: str) -> str:
+    return f"tournament_{tournament_id}"
+
+def player_group(username: str) -> str:
+    return user_group_name("tournament_player_", username)
+
+def match_type(match_id: str) -> str:
+    label = match_id.rsplit('_', 1)[-1]
+    if label == 'reset':
+        return 'finals'
+    return label if label in ('semi1', 'semi2', 'finals') else 'round'
+
+def match_entry(match_id: str, match: TournamentMatch, details: Dict[str, dict]) -> dict:
+    def player(username: Optional[str]) -> Optional[dict]:
+        return details.get(username, {}) if username else None
+
+    return {
+        'player1': player(match.player1),
+        'player2': player(match.player2),
+        'winner': player(match.winner),
+        'completed': match.game_completed,
+        'match_type': match_type(match_id)
+    }
+
+def tournament_entry(tournament: Tournament, details: Dict[str, dict], match_ids: Optional[Iterable[str]] = None) -> dict:
+    """
+    The view of one tournament sent to its players. Given match_ids, only
+    those matches and the small fields are included, as a diff.
+    """
+    winners = {match_type(match_id): match.winner for match_id, match in tournament.matches.items()}
+    entry = {
+        'matches': {
+            match_id: match_entry(match_id, tournament.matches[match_id], details)
+            for match_id in (tournament.matches if match_ids is None else match_ids)
+        },
+        'semifinal_winners': {
+            'semi1': details.get(winners['semi1'], {}) if winners.get('semi1') else None,
+            'semi2': details.get(winners['semi2'], {}) if winners.get('semi2') else None
+        },
+        'state': tournament.state.value
+    }
+    if match_ids is None:
+        entry['players'] = [details.get(username, {}) for username in tournament.players]
+    return entry
+
+def apply_changes(state: dict, changes: dict) -> None:
+    """
+    Apply one lobby diff. Must stay in step with the client's copy
+    (#applyLobbyDiff in Frontend/js/Game.js).
+    """
+    for key, added, removed in (
+        ('waiting_players', 'waiting_add', 'waiting_remove'),
+        ('all_connected_players', 'connected_add', 'connected_remove')
+    ):
+        if removed in changes:
+            gone = set(changes[removed])
+            state[key] = [player for player in state[key] if player.get('username') not in gone]
+        if added in changes:
+            present = {player.get('username') for player in state[key]}
+            state[key] += [player for player in changes[added] if player.get('username') not in present]
+
+    for tournament_id, tournament_state in changes.get('tournament_states', {}).items():
+        if tournament_state is None:
+            state['tournament_states'].pop(tournament_id, None)
+        else:
+            state['tournament_states'][tournament_id] = tournament_state
+
+def apply_tournament_changes(entry: dict, changes: dict) -> None:
+    """Apply one tournament diff; mirrored by #applyTournamentDiff in Game.js"""
+    entry['matches'].update(changes.get('matches', {}))
+    entry.update({key: value for key, value in changes.items() if key != 'matches'})
+
+class TournamentFeed:
+    """
+    Versioned tournament state of this process, split in two kinds of
+    streams so each client only receives what it displays:
+
+    - the lobby (LOBBY_GROUP): waiting and connected players and the state
+      of every tournament, for everyone;
+    - one stream per tournament (tournament_group()), with its matches,
+      for its players only.
+
+    Each change is published as a small diff that bumps the version of its
+    stream. A subscriber gets a snapshot once and then only diffs; a client
+    that sees a gap in versions asks for a fresh snapshot.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.state = {
+            'waiting_players': [],
+            'all_connected_players': [],
+            'tournament_states': {}
+        }
+        self.tournaments: Dict[str, dict] = {}
+        self.versions: Dict[str, int] = {}
+        self.diffs_sent = 0
+        self.snapshots_sent = 0
+
+    def diff(self, event: str, **changes) -> dict:
+        """Record a lobby change and return the message to broadcast"""
+        apply_changes(self.state, changes)
+        self.version += 1
+        self.diffs_sent += 1
+        return {
+            'type': 'lobby_diff',
+            'version': self.version,
+            'event': event,
+            'changes': changes
+        }
+
+    def snapshot(self) -> dict:
+        self.snapshots_sent += 1
+        return {
+            'type': 'players_update',
+            'version': self.version,
+            'data': self.state
+        }
+
+    def tournament_diff(self, tournament_id: str, event: str, changes: dict) -> dict:
+        """Record a change of one tournament and return the message for its group"""
+        if tournament_id in self.tournaments:
+            apply_tournament_changes(self.tournaments[tournament_id], changes)
+        else:
+            self.tournaments[tournament_id] = {**changes, 'matches': dict(changes['matches'])}
+        self.versions[tournament_id] = self.versions.get(tournament_id, 0) + 1
+        self.diffs_sent += 1
+        return {
+            'type': 'tournament_diff',
+            'tournament_id': tournament_id,
+            'version': self.versions[tournament_id],
+            'event': event,
+            'changes': changes
+        }
+
+    def tournament_snapshot(self, tournament_id: str) -> Optional[dict]:
+        if tournament_id not in self.tournaments:
+            return None
+        self.snapshots_sent += 1
+        return {
+            'type': 'tournament_snapshot',
+            'tournament_id': tournament_id,
+            'version': self.versions[tournament_id],
+            'tournament': self.tournaments[tournament_id]
+        }
+
+    def remove_tournament(self, tournament_id: str) -> None:
+        self.tournaments.pop(tournament_id, None)
+        self.versions.pop(tournament_id, None)
+
+    def get_metrics(self) -> dict:
+        return {
+            "version": self.version,
+            "tournaments": len(self.tournaments),
+            "diffs_sent": self.diffs_sent,
+            "snapshots_sent": self.snapshots_sent
+        }
+
+tournament_feed = TournamentFeed()
@@ -0,0 +1,82 @@
+from .timers import Callback, TimerWheel
+from .config import TOURNAMENT_CONFIG
+from typing import Dict, Iterable, Optional, Set
+
+class TournamentScheduler:
+    """
+    Enforces TOURNAMENT_CONFIG's timeouts for every tournament of this
+    process on one timer wheel:
+
+    - a tournament none of whose games started within WAITING_TIMEOUT of
+      its creation expires;
+    - a match that has not started MATCH_TIMEOUT after it became ready is
+      forfeited.
+
+    What expiring or forfeiting means is up to the callbacks. Tournaments
+    are tracked from track() until finish(), which drops their timers.
+    """
+
+    def __init__(self, timers: Optional[TimerWheel] = None):
+        self.timers = timers or TimerWheel(TOURNAMENT_CONFIG['TIMER_RESOLUTION'], TOURNAMENT_CONFIG['TIMER_SLOTS'])
+        self.matches: Dict[str, Set[str]] = {}
+        self.started = 0
+        self.completed = 0
+        self.expired = 0
+        self.forfeited = 0
+
+    def track(self, tournament_id: str, on_expire: Callback) -> None:
+        self.matches[tournament_id] = set()
+        self.started += 1
+        self.timers.schedule(('waiting', tournament_id), TOURNAMENT_CONFIG['WAITING_TIMEOUT'], on_expire)
+
+    def watch_matches(self, tournament_id: str, match_ids: Iterable[str], on_timeout) -> None:
+        """Start the MATCH_TIMEOUT of each match; on_timeout(match_id) forfeits it"""
+        pending = self.matches.get(tournament_id)
+        if pending is None:
+            return
+        for match_id in match_ids:
+            pending.add(match_id)
+            self.timers.schedule(('match', match_id), TOURNAMENT_CONFIG['MATCH_TIMEOUT'],
+                                 lambda match_id=match_id: on_timeout(match_id))
+
+    def match_started(self, tournament_id: str, match_id: str) -> None:
+        """A match is being played: the tournament is under way and the match cannot time out"""
+        self.timers.cancel(('waiting', tournament_id))
+        self.drop_match(tournament_id, match_id)
+
+    def match_done(self, tournament_id: str, match_id: str) -> None:
+        """A result came in, which also means the tournament got under way"""
+        self.match_started(tournament_id, match_id)
+
+    def match_forfeited(self, tournament_id: str, match_id: str) -> None:
+        self.forfeited += 1
+        self.drop_match(tournament_id, match_id)
+
+    def drop_match(self, tournament_id: str, match_id: str) -> None:
+        self.matches.get(tournament_id, set()).discard(match_id)
+        self.timers.cancel(('match', match_id))
+
+    def finish(self, tournament_id: str, expired: bool = False) -> None:
+        """Forget a tournament that completed or expired, with all its timers"""
+        pending = self.matches.pop(tournament_id, None)
+        if pending is None:
+            return
+        self.timers.cancel(('waiting', tournament_id))
+        for match_id in pending:
+            self.timers.cancel(('match', match_id))
+        if expired:
+            self.expired += 1
+        else:
+            self.completed += 1
+
+    def get_metrics(self) -> dict:
+        return {
+            "live": len(self.matches),
+            "started": self.started,
+            "completed": self.completed,
+            "expired": self.expired,
+            "forfeited_matches": self.forfeited,
+            "timers": self.timers.get_metrics()
+        }
+
+tournament_scheduler = TournamentScheduler()
@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('metrics/', views.MetricsView.as_view(), name='game_metrics'),
+    path('replays/<str:replay_id>/', views.ReplayView.as_view(), name='game_replay'),
+]
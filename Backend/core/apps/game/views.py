@@ -1,3 +1,53 @@
-from django.shortcuts import render
+from django.http import StreamingHttpResponse
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from .scheduler import game_scheduler
+from .fanout import local_fanout
+from .replay import replay_recorder
+from .registry import match_registry
+from .matchmaking import matchmaking_service
+from .snapshots import snapshot_writer
+from .timers import reconnect_timers
+from .results import result_writer
+from .tournament_feed import tournament_feed
+from .tournament_scheduler import tournament_scheduler
+from core.apps.authentication.cache import player_cache
 
-# Create your views here.
+class MetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'scheduler': game_scheduler.get_metrics(),
+            'fanout': local_fanout.get_metrics(),
+            'replay': replay_recorder.get_metrics(),
+            'registry': match_registry.get_metrics(),
+            'matchmaking': matchmaking_service.get_metrics(),
+            'snapshots': snapshot_writer.get_metrics(),
+            'reconnect_timers': reconnect_timers.get_metrics(),
+            'results': result_writer.get_metrics(),
+            'tournament_feed': tournament_feed.get_metrics(),
+            'tournaments': tournament_scheduler.get_metrics(),
+            'player_cache': player_cache.get_metrics(),
+        })
+
+class ReplayView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, replay_id):
+        if not replay_recorder.path(replay_id).exists():
+            return Response({'error': 'Replay not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            from_tick = int(request.GET.get('from_tick', 0))
+        except ValueError:
+            return Response({'error': 'from_tick must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            replay_recorder.stream(replay_id, from_tick),
+            content_type='application/octet-stream'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{replay_id}.replay"'
+        return response
@@ -0,0 +1,101 @@
+from channels.db import database_sync_to_async
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, List, Optional
+import asyncio
+import logging
+import time
+
+@dataclass(slots=True)
+class Pending:
+    item: Any
+    attempts: int = 0
+
+class BatchWriter:
+    """
+    Saves queued items behind the event loop. Items are written every
+    FLUSH_INTERVAL seconds of config, at most BATCH_SIZE at a time, by
+    write() in a database thread. A batch that fails is retried up to
+    MAX_ATTEMPTS times; after that its items are dropped, each one logged at
+    error level with describe() and counted in the metrics.
+
+    Subclasses set config and logger and implement write() and describe().
+    """
+
+    config: dict
+    logger = logging.getLogger(__name__)
+
+    def __init__(self):
+        self.queue: Deque[Pending] = deque()
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.max_queued = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def enqueue(self, item) -> None:
+        self.queue.append(Pending(item))
+        self.max_queued = max(self.max_queued, len(self.queue))
+        if not self._task or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def run(self) -> None:
+        while self.queue:
+            await asyncio.sleep(self.config['FLUSH_INTERVAL'])
+            # Drain full batches back to back; after a failure, wait for the next interval
+            while await self.flush():
+                pass
+
+    async def flush(self) -> int:
+        """Write one batch. Returns the number of items written"""
+        batch = [self.queue.popleft() for _ in range(min(len(self.queue), self.config['BATCH_SIZE']))]
+        if not batch:
+            return 0
+
+        started = time.perf_counter()
+        try:
+            await database_sync_to_async(self.write)([pending.item for pending in batch])
+        except Exception:
+            self.logger.warning("Flush of %d items failed", len(batch), exc_info=True)
+            retry = []
+            for pending in batch:
+                if pending.attempts < self.config['MAX_ATTEMPTS']:
+                    retry.append(pending)
+                else:
+                    self.dropped += 1
+                    self.logger.error("Dropped after %d attempts: %s", pending.attempts + 1, self.describe(pending.item))
+            for pending in reversed(retry):
+                pending.attempts += 1
+                self.retry(pending.item)
+                self.queue.appendleft(pending)
+            return 0
+        finally:
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+            self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+
+        self.batches += 1
+        self.written += len(batch)
+        return len(batch)
+
+    def write(self, items: List[Any]) -> None:
+        raise NotImplementedError
+
+    def describe(self, item) -> str:
+        """What is lost when item is dropped, for the error log"""
+        return repr(item)
+
+    def retry(self, item) -> None:
+        """Prepare item to be written again after a failed batch"""
+
+    def get_metrics(self) -> dict:
+        return {
+            "queued": len(self.queue),
+            "max_queued": self.max_queued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3)
+        }
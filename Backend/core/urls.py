@@ -13,6 +13,7 @@ urlpatterns = [
     path('api/', include('core.apps.authentication.urls')),
     path('api/auth/', include('core.apps.remote_auth.urls')),
     path('api/manage/', include('core.apps.friends.urls')),
+    path('api/game/', include('core.apps.game.urls')),
 ]
 
 # # new for avatar'
@@ -27,6 +27,87 @@ const GAME_CONSTANTS = {
 	PADDLE_HEIGHT: 280,
 	COURT_HEIGHT: 785,
 	BALL_RADIUS: 60,
+	PADDLE_X: 1300,
+	SERVER_PADDLE_SPEED: 1200,
 };
 
-export { Vector3, GAME_CONSTANTS };
+const FRAME_STATE = 1;
+const FIELD_PADDLES = 1;
+const FIELD_BALL = 2;
+const FIELD_SCORE = 4;
+const FIELD_INPUTS = 8;
+const FRAME_HISTORY = 64;
+const ACK_INTERVAL = 10;
+
+class GameFrameDecoder {
+	#frames = new Map();
+	#received = 0;
+
+	decode(buffer) {
+		const view = new DataView(buffer);
+		if (view.getUint8(0) !== FRAME_STATE) return null;
+
+		const seq = view.getUint32(1, true);
+		const baseSeq = view.getUint32(5, true);
+		const mask = view.getUint8(9);
+		const base = baseSeq ? this.#frames.get(baseSeq) : null;
+		if (baseSeq && !base) return null;
+
+		const state = base ? { ...base } : {};
+		let offset = 10;
+		if (mask & FIELD_PADDLES) {
+			state.y1 = view.getFloat32(offset, true);
+			state.y2 = view.getFloat32(offset + 4, true);
+			state.d1 = view.getInt8(offset + 8);
+			state.d2 = view.getInt8(offset + 9);
+			offset += 10;
+		}
+		if (mask & FIELD_BALL) {
+			state.bx = view.getFloat32(offset, true);
+			state.by = view.getFloat32(offset + 4, true);
+			state.bdx = view.getFloat32(offset + 8, true);
+			state.bdy = view.getFloat32(offset + 12, true);
+			offset += 16;
+		}
+		if (mask & FIELD_SCORE) {
+			state.scoreL = view.getUint8(offset);
+			state.scoreR = view.getUint8(offset + 1);
+			offset += 2;
+		}
+		if (mask & FIELD_INPUTS) {
+			state.input1 = view.getUint32(offset, true);
+			state.input2 = view.getUint32(offset + 4, true);
+		}
+
+		this.#frames.set(seq, state);
+		if (this.#frames.size > FRAME_HISTORY) {
+			this.#frames.delete(this.#frames.keys().next().value);
+		}
+		this.#received++;
+
+		return {
+			type: 'update',
+			seq,
+			ack: this.#received % ACK_INTERVAL === 1,
+			paddlePositions: [
+				{
+					playerId: 'player1',
+					position: { x: -GAME_CONSTANTS.PADDLE_X, y: state.y1, z: 0 },
+					direction: state.d1,
+				},
+				{
+					playerId: 'player2',
+					position: { x: GAME_CONSTANTS.PADDLE_X, y: state.y2, z: 0 },
+					direction: state.d2,
+				},
+			],
+			ballPosition: { x: state.bx, y: state.by, z: 0 },
+			ballDirection: { x: state.bdx, y: state.bdy, z: 0 },
+			scoreL: state.scoreL,
+			scoreR: state.scoreR,
+			lastInput: { player1: state.input1, player2: state.input2 },
+		};
+	}
+}
+
+export { Vector3, GAME_CONSTANTS, GameFrameDecoder };
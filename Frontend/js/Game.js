@@ -34,7 +34,7 @@ import {
 } from './Sbook';
 import { CHOICES, MATCHMAKING, OFFLINE, START, TOURNAMENT, WIN } from './Start';
 
-import { GAME_CONSTANTS, Vector3 } from './Game-managers';
+import { GAME_CONSTANTS, GameFrameDecoder, Vector3 } from './Game-managers';
 
 import { OrbitControls } from 'three/examples/jsm/controls/OrbitControls.js';
 import { GLTFLoader } from 'three/examples/jsm/loaders/GLTFLoader.js';
@@ -89,8 +89,15 @@ class Game {
 	#frameRate = 60;
 
 	#chatuser;
+	#chatBefore = null;
+	#chatLoading = false;
 	#gameWebSocket;
+	#frameDecoder;
+	#inputSeq = 0;
+	#prediction = { label: null, y: 0, direction: 0, time: 0 };
+	#snapshotInterval = 0;
 	#tournamentWebSocket;
+	#tournamentState = null;
 	#currentMatch;
 	#onlineSocket;
 	#onlineUsers = [];
@@ -1592,19 +1599,9 @@ class Game {
 				this.#css2DObject.chat.element.querySelector('.recived-parent');
 			recived.innerHTML = '';
 
-			const response = await fetch(
-				`api/chat/room/${this.#loggedUser}/${user}/`,
-				{
-					method: 'GET',
-					headers: {
-						Authorization: `Bearer ${localStorage.getItem(
-							'accessToken'
-						)}`,
-					},
-				}
-			);
-			const data = await response.json();
-			if (response.ok) {
+			this.#chatBefore = null;
+			const data = await this.#fetchChatPage(user);
+			if (data) {
 				data.messages.forEach(message => {
 					if (message.sender === user)
 						this.#addRecivedMessage(message.content);
@@ -1614,11 +1611,63 @@ class Game {
 				});
 			}
 			this.#chatuser = user;
+			fetch(`api/chat/inbox/${user}/read/`, {
+				method: 'POST',
+				headers: {
+					Authorization: `Bearer ${localStorage.getItem(
+						'accessToken'
+					)}`,
+				},
+			});
+			recived.onscroll = () => {
+				if (recived.scrollTop === 0) this.#loadOlderMessages(user);
+			};
 		} catch (error) {
 			alert(error);
 		}
 	}
 
+	async #fetchChatPage(user, before = null) {
+		const query = before ? `?before=${before}` : '';
+		const response = await fetch(
+			`api/chat/room/${this.#loggedUser}/${user}/${query}`,
+			{
+				method: 'GET',
+				headers: {
+					Authorization: `Bearer ${localStorage.getItem(
+						'accessToken'
+					)}`,
+				},
+			}
+		);
+		if (!response.ok) return null;
+		const data = await response.json();
+		this.#chatBefore = data.has_more ? data.before : null;
+		return data;
+	}
+
+	async #loadOlderMessages(user) {
+		if (!this.#chatBefore || this.#chatLoading) return;
+		this.#chatLoading = true;
+		try {
+			const recived =
+				this.#css2DObject.chat.element.querySelector('.recived-parent');
+			const height = recived.scrollHeight;
+			const data = await this.#fetchChatPage(user, this.#chatBefore);
+			if (!data || this.#chatuser !== user) return;
+			[...data.messages].reverse().forEach(message => {
+				if (message.sender === user)
+					this.#addRecivedMessage(message.content, true);
+				else this.#addSentMessage(message.content, true);
+			});
+			recived.scrollTop = recived.scrollHeight - height;
+		} catch (error) {
+			console.error('Error loading older messages:', error);
+		} finally {
+			this.#chatLoading = false;
+		}
+	}
+
 	#addChatUsers(users) {
 		for (const key in this.#chatWebSocket)
 			this.#chatWebSocket[key].sock.close();
@@ -1698,12 +1747,31 @@ class Game {
 			const data = await response.json();
 			if (response.ok) {
 				this.#addChatUsers(data.users);
+				await this.#showUnread();
 			}
 		} catch (error) {
 			alert(error);
 		}
 	}
 
+	async #showUnread() {
+		const response = await fetch(`api/chat/inbox/`, {
+			method: 'GET',
+			headers: {
+				Authorization: `Bearer ${localStorage.getItem('accessToken')}`,
+			},
+		});
+		if (!response.ok) return;
+		const data = await response.json();
+		data.conversations.forEach(conversation => {
+			const chat = this.#chatWebSocket[conversation.username];
+			if (chat && conversation.unread > 0)
+				chat.elem.querySelector(
+					'#message'
+				).src = `/textures/svg/Indicator message.svg`;
+		});
+	}
+
 	#setMatchHistory(matches) {
 		this.#css2DObject.usersprofile.element.querySelector(
 			'.matches-score-parent'
@@ -1820,24 +1888,26 @@ class Game {
 		}
 	}
 
-	#addSentMessage(message) {
+	#addSentMessage(message, prepend = false) {
 		const sentMessage = document.createElement('template');
 		sentMessage.innerHTML = SENT.trim();
 		sentMessage.content.firstChild.querySelector('.you').textContent =
 			message;
-		this.#css2DObject.chat.element
-			.querySelector('.recived-parent')
-			.appendChild(sentMessage.content.firstChild);
+		const parent =
+			this.#css2DObject.chat.element.querySelector('.recived-parent');
+		if (prepend) parent.prepend(sentMessage.content.firstChild);
+		else parent.appendChild(sentMessage.content.firstChild);
 	}
 
-	#addRecivedMessage(message) {
+	#addRecivedMessage(message, prepend = false) {
 		const sentMessage = document.createElement('template');
 		sentMessage.innerHTML = RECIVED.trim();
 		sentMessage.content.firstChild.querySelector('.you').textContent =
 			message;
-		this.#css2DObject.chat.element
-			.querySelector('.recived-parent')
-			.appendChild(sentMessage.content.firstChild);
+		const parent =
+			this.#css2DObject.chat.element.querySelector('.recived-parent');
+		if (prepend) parent.prepend(sentMessage.content.firstChild);
+		else parent.appendChild(sentMessage.content.firstChild);
 	}
 
 	#createControls() {
@@ -2562,17 +2632,26 @@ class Game {
 
 			this.#ball.rotation.x += game_data.ballDirection.x;
 			this.#ball.rotation.y += game_data.ballDirection.y;
+
+			// With a reduced snapshot rate, move the ball along the server
+			// velocity between snapshots instead of freezing it.
+			const extrapolate = this.#snapshotInterval > 1000 / this.#frameRate;
+			this.#ballDirection = new THREE.Vector3(
+				extrapolate ? game_data.ballDirection.x / this.#frameRate : 0,
+				extrapolate ? game_data.ballDirection.y / this.#frameRate : 0,
+				0
+			);
 		}
 
 		game_data.paddlePositions.forEach(paddle => {
 			const paddleMesh =
 				paddle.playerId === 'player1' ? this.#player : this.#player2;
 			if (paddleMesh) {
-				paddleMesh.position.set(
-					paddle.position.x,
-					paddle.position.y,
-					paddle.position.z
+				const position = this.#predictPaddle(
+					paddle,
+					game_data.lastInput
 				);
+				paddleMesh.position.set(position.x, position.y, position.z);
 			}
 		});
 
@@ -2611,9 +2690,7 @@ class Game {
 		this.#resetGameState();
 
 		try {
-			this.#gameWebSocket = new WebSocket(
-				`wss://${window.location.host}/api/ws/game/`
-			);
+			this.#gameWebSocket = this.#openGameSocket();
 
 			if (!this.#gameWebSocket) {
 				throw new Error('Failed to create WebSocket');
@@ -2623,6 +2700,7 @@ class Game {
 				try {
 					const initData = {
 						username: this.#loggedUser,
+						protocol: 'binary',
 					};
 					if (
 						this.#gameWebSocket &&
@@ -2641,7 +2719,7 @@ class Game {
 				try {
 					if (!this.#gameWebSocket) return;
 
-					const data = JSON.parse(e.data);
+					const data = this.#parseGameMessage(e.data);
 					switch (data.type) {
 						case 'game_start':
 							this.#matchmaking(data.players);
@@ -2677,6 +2755,77 @@ class Game {
 		}
 	}
 
+	#openGameSocket() {
+		const socket = new WebSocket(
+			`wss://${window.location.host}/api/ws/game/`
+		);
+		socket.binaryType = 'arraybuffer';
+		this.#frameDecoder = new GameFrameDecoder();
+		this.#snapshotInterval = 0;
+		return socket;
+	}
+
+	#parseGameMessage(raw) {
+		let data;
+		if (typeof raw === 'string') {
+			data = JSON.parse(raw);
+		} else {
+			data = this.#frameDecoder.decode(raw) ?? {};
+			if (data.ack) {
+				this.#gameWebSocket?.send(
+					JSON.stringify({ action: 'ack', seq: data.seq })
+				);
+			}
+		}
+
+		if (data.type === 'game_start') this.#resetPrediction(data.players);
+		if (data.type === 'rate') this.#snapshotInterval = data.interval_ms;
+		return data;
+	}
+
+	#resetPrediction(players) {
+		let label = null;
+		if (players?.player1?.usr === this.#loggedUser) label = 'player1';
+		else if (players?.player2?.usr === this.#loggedUser) label = 'player2';
+
+		this.#inputSeq = 0;
+		this.#prediction = {
+			label,
+			y: 0,
+			direction: 0,
+			time: performance.now(),
+		};
+	}
+
+	#predictPaddle(paddle, lastInput) {
+		const prediction = this.#prediction;
+		if (paddle.playerId !== prediction.label || !lastInput) {
+			return paddle.position;
+		}
+
+		const now = performance.now();
+		const elapsed = (now - prediction.time) / 1000;
+		prediction.time = now;
+
+		if (lastInput[prediction.label] >= this.#inputSeq) {
+			prediction.y = paddle.position.y;
+		} else {
+			const maxY =
+				GAME_CONSTANTS.COURT_HEIGHT - GAME_CONSTANTS.PADDLE_HEIGHT;
+			prediction.y = Math.max(
+				-maxY,
+				Math.min(
+					maxY,
+					prediction.y +
+						prediction.direction *
+							GAME_CONSTANTS.SERVER_PADDLE_SPEED *
+							elapsed
+				)
+			);
+		}
+		return { ...paddle.position, y: prediction.y };
+	}
+
 	#handleWebSocketError() {
 		if (this.#gameWebSocket) {
 			this.#gameWebSocket.close();
@@ -2794,9 +2943,7 @@ class Game {
 				this.#gameWebSocket = null;
 			}
 
-			this.#gameWebSocket = new WebSocket(
-				`wss://${window.location.host}/api/ws/game/`
-			);
+			this.#gameWebSocket = this.#openGameSocket();
 
 			this.#gameWebSocket.onopen = () => {
 				if (this.#gameWebSocket?.readyState === WebSocket.OPEN) {
@@ -2812,7 +2959,7 @@ class Game {
 
 			this.#gameWebSocket.onmessage = e => {
 				try {
-					const data = JSON.parse(e.data);
+					const data = this.#parseGameMessage(e.data);
 					this.#handleTournamentGameMessage(data);
 				} catch (error) {
 					console.error('Error handling game message:', error);
@@ -2841,6 +2988,7 @@ class Game {
 			this.#gameWebSocket.send(
 				JSON.stringify({
 					username: this.#loggedUser,
+					protocol: 'binary',
 					tournament_data: {
 						player1: matchData.player1,
 						player2: matchData.player2,
@@ -2940,6 +3088,8 @@ class Game {
 					winnerAvatar.src = data.winner.avatar;
 					winnerName.textContent = data.winner.username;
 				}
+			}
+			if (data.winner || data.reason === 'expired') {
 				if (this.#tournamentWebSocket) {
 					this.#tournamentWebSocket.close();
 					this.#tournamentWebSocket = null;
@@ -3024,6 +3174,7 @@ class Game {
 
 		this.#tournamentWebSocket.onclose = () => {
 			this.#started = false;
+			this.#tournamentState = null;
 			this.#tournamentWebSocket = null;
 		};
 	}
@@ -3036,7 +3187,26 @@ class Game {
 				this.#handleMatchReady(data);
 				break;
 			case 'players_update':
-				this.#updateTournamentUI(data.data);
+				this.#tournamentState = {
+					...data.data,
+					tournaments: this.#tournamentState?.tournaments ?? {},
+					version: data.version,
+				};
+				this.#updateTournamentUI(this.#tournamentState);
+				break;
+			case 'lobby_diff':
+				this.#applyLobbyDiff(data);
+				break;
+			case 'tournament_snapshot':
+				if (!this.#tournamentState) return;
+				this.#tournamentState.tournaments[data.tournament_id] = {
+					...data.tournament,
+					version: data.version,
+				};
+				this.#updateTournamentUI(this.#tournamentState);
+				break;
+			case 'tournament_diff':
+				this.#applyTournamentDiff(data);
 				break;
 			case 'tournament_complete':
 				this.#updateFinale(data);
@@ -3046,6 +3216,60 @@ class Game {
 		}
 	}
 
+	// Mirrors apply_changes in Backend/core/apps/game/tournament_feed.py
+	#applyLobbyDiff(diff) {
+		const state = this.#tournamentState;
+		if (!state || diff.version <= state.version) return;
+		if (diff.version !== state.version + 1) {
+			this.#tournamentWebSocket?.send(JSON.stringify({ type: 'sync' }));
+			return;
+		}
+
+		const changes = diff.changes;
+		[
+			['waiting_players', 'waiting_add', 'waiting_remove'],
+			['all_connected_players', 'connected_add', 'connected_remove'],
+		].forEach(([key, added, removed]) => {
+			if (changes[removed]) {
+				const gone = new Set(changes[removed]);
+				state[key] = state[key].filter(player => !gone.has(player.username));
+			}
+			if (changes[added]) {
+				const present = new Set(state[key].map(player => player.username));
+				state[key].push(
+					...changes[added].filter(player => !present.has(player.username))
+				);
+			}
+		});
+
+		Object.entries(changes.tournament_states ?? {}).forEach(([id, tournamentState]) => {
+			if (tournamentState === null) delete state.tournament_states[id];
+			else state.tournament_states[id] = tournamentState;
+		});
+
+		state.version = diff.version;
+		this.#updateTournamentUI(state);
+	}
+
+	// Mirrors apply_tournament_changes in Backend/core/apps/game/tournament_feed.py.
+	// Only our own tournament is tracked; its snapshot arrives when we are seated.
+	#applyTournamentDiff(diff) {
+		const entry = this.#tournamentState?.tournaments[diff.tournament_id];
+		if (!entry || diff.version <= entry.version) return;
+		if (diff.version !== entry.version + 1) {
+			this.#tournamentWebSocket?.send(
+				JSON.stringify({ type: 'sync', tournament_id: diff.tournament_id })
+			);
+			return;
+		}
+
+		const { matches, ...rest } = diff.changes;
+		Object.assign(entry.matches, matches ?? {});
+		Object.assign(entry, rest);
+		entry.version = diff.version;
+		this.#updateTournamentUI(this.#tournamentState);
+	}
+
 	#handleMatchReady(data) {
 		if (!this.#isPlayerInMatch(data)) return;
 
@@ -3307,15 +3531,14 @@ class Game {
 		this.#resetGameState();
 
 		try {
-			this.#gameWebSocket = new WebSocket(
-				`wss://${window.location.host}/api/ws/game/`
-			);
+			this.#gameWebSocket = this.#openGameSocket();
 
 			this.#gameWebSocket.onopen = () => {
 				const initData = {
 					username: this.#loggedUser,
 					invite_game: true,
 					opponent: opponent,
+					protocol: 'binary',
 				};
 
 				if (this.#gameWebSocket?.readyState === WebSocket.OPEN) {
@@ -3326,7 +3549,7 @@ class Game {
 
 			this.#gameWebSocket.onmessage = e => {
 				try {
-					const data = JSON.parse(e.data);
+					const data = this.#parseGameMessage(e.data);
 
 					switch (data.type) {
 						case 'game_start':
@@ -3631,18 +3854,22 @@ class Game {
 	}
 
 	#sendMovement(direction) {
+		this.#prediction.direction = direction === 'moveUp' ? -1 : 1;
 		this.#gameWebSocket?.send(
 			JSON.stringify({
 				action: 'move',
 				direction: direction,
+				seq: ++this.#inputSeq,
 			})
 		);
 	}
 
 	#stopMovement() {
+		this.#prediction.direction = 0;
 		this.#gameWebSocket?.send(
 			JSON.stringify({
 				action: 'stop_move',
+				seq: ++this.#inputSeq,
 			})
 		);
 	}